@@ -0,0 +1,40 @@
+"""room inventory.
+
+Revision ID: 5d2c8a41f7e3
+Revises: 3b19c108c191
+Create Date: 2026-10-18 10:12:37.208411
+"""
+from typing import Sequence, Union
+
+import sqlalchemy as sa
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision: str = "5d2c8a41f7e3"
+down_revision: Union[str, None] = "3b19c108c191"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.create_table(
+        "room_inventory",
+        sa.Column("room_id", sa.Integer(), nullable=False),
+        sa.Column("day", sa.Date(), nullable=False),
+        sa.Column("booked", sa.Integer(), server_default="0", nullable=False),
+        sa.ForeignKeyConstraint(["room_id"], ["room.id"], ondelete="CASCADE"),
+        sa.PrimaryKeyConstraint("room_id", "day"),
+    )
+    op.execute(
+        """
+        INSERT INTO room_inventory (room_id, day, booked)
+        SELECT b.room_id, nights.day::date, count(*)
+        FROM booking b
+        CROSS JOIN LATERAL generate_series(b.date_from, b.date_to - 1, interval '1 day') AS nights(day)
+        GROUP BY b.room_id, nights.day::date
+        """,
+    )
+
+
+def downgrade() -> None:
+    op.drop_table("room_inventory")
@@ -0,0 +1,38 @@
+"""booking stay range.
+
+Revision ID: a07e3c9b2d18
+Revises: 5d2c8a41f7e3
+Create Date: 2026-10-18 11:46:02.915730
+"""
+from typing import Sequence, Union
+
+import sqlalchemy as sa
+from alembic import op
+from sqlalchemy.dialects import postgresql
+
+# revision identifiers, used by Alembic.
+revision: str = "a07e3c9b2d18"
+down_revision: Union[str, None] = "5d2c8a41f7e3"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.execute("CREATE EXTENSION IF NOT EXISTS btree_gist")
+    op.add_column(
+        "booking",
+        sa.Column(
+            "stay",
+            postgresql.DATERANGE(),
+            sa.Computed("daterange(date_from, date_to)"),
+            nullable=False,
+        ),
+    )
+    op.create_index(
+        "ix_booking_room_id_stay", "booking", ["room_id", "stay"], unique=False, postgresql_using="gist",
+    )
+
+
+def downgrade() -> None:
+    op.drop_index("ix_booking_room_id_stay", table_name="booking", postgresql_using="gist")
+    op.drop_column("booking", "stay")
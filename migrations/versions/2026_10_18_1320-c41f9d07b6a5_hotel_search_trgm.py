@@ -0,0 +1,32 @@
+"""hotel search trgm.
+
+Revision ID: c41f9d07b6a5
+Revises: a07e3c9b2d18
+Create Date: 2026-10-18 13:20:44.508193
+"""
+from typing import Sequence, Union
+
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision: str = "c41f9d07b6a5"
+down_revision: Union[str, None] = "a07e3c9b2d18"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.execute("CREATE EXTENSION IF NOT EXISTS pg_trgm")
+    op.create_index(
+        "ix_hotel_name_trgm", "hotel", ["name"], unique=False,
+        postgresql_using="gin", postgresql_ops={"name": "gin_trgm_ops"},
+    )
+    op.create_index(
+        "ix_hotel_location_trgm", "hotel", ["location"], unique=False,
+        postgresql_using="gin", postgresql_ops={"location": "gin_trgm_ops"},
+    )
+
+
+def downgrade() -> None:
+    op.drop_index("ix_hotel_location_trgm", table_name="hotel", postgresql_using="gin")
+    op.drop_index("ix_hotel_name_trgm", table_name="hotel", postgresql_using="gin")
@@ -0,0 +1,24 @@
+"""user username lower.
+
+Revision ID: e2b7c95d1f40
+Revises: c41f9d07b6a5
+Create Date: 2026-10-18 15:05:12.734905
+"""
+from typing import Sequence, Union
+
+import sqlalchemy as sa
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision: str = "e2b7c95d1f40"
+down_revision: Union[str, None] = "c41f9d07b6a5"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.create_index("ix_user_username_lower", "user", [sa.text("lower(username)")], unique=True)
+
+
+def downgrade() -> None:
+    op.drop_index("ix_user_username_lower", table_name="user")
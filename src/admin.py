@@ -5,11 +5,12 @@ from src.bookings.admin import BookingAdminView
 from src.database import engine
 from src.hotels.admin import HotelAdminView, RoomAdminView
 from src.middlewares import AdminAuthJWTMiddleware
+from src.monitoring.admin import CacheMetricsAdminView
 from src.users.admin import UserAdminView
 
 admin = Admin(app, engine, authentication_backend=AdminAuthJWTMiddleware('None'))
 
-views = [UserAdminView, BookingAdminView, RoomAdminView, HotelAdminView]
+views = [UserAdminView, BookingAdminView, RoomAdminView, HotelAdminView, CacheMetricsAdminView]
 
 for view in views:
     admin.add_view(view)
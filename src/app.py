@@ -3,18 +3,28 @@ from fastapi.middleware.cors import CORSMiddleware
 from fastapi.responses import RedirectResponse
 from fastapi.staticfiles import StaticFiles
 from fastapi_cache import FastAPICache
-from fastapi_cache.backends.redis import RedisBackend
 
 from migrations import __models__  # noqa
+from src.auth.hashing import password_hasher
 from src.auth.routers import auth_router
 from src.bookings.routers import bookings_router
-from src.cache import KeyBuilderCache, redis
-from src.config import BASE_DIR, CORS_ALLOW_ORIGINS, app_settings
-from src.database import context_db_session
+from src.cache import (
+    CODERS,
+    KeyBuilderCache,
+    TaggedRedisBackend,
+    TieredRedisBackend,
+    cache_redis,
+    namespace_metrics,
+)
+from src.config import BASE_DIR, CORS_ALLOW_ORIGINS, app_settings, cache_settings
+from src.database import close_mongo_client, context_db_session, get_mongo_client
+from src.hotels.availability import start_availability_engine, stop_availability_engine
 from src.hotels.routers.hotels import hotels_router
 from src.hotels.routers.rooms import rooms_router
 from src.images.routers import image_router
 from src.logging import init_loggers
+from src.middlewares import ResponseCacheMiddleware
+from src.monitoring.routers import monitoring_router
 from src.pages.auth import front_auth_router
 from src.pages.bookings import front_bookings_router
 from src.pages.hotels import front_hotels_router
@@ -53,6 +63,12 @@ app.include_router(
     tags=['Images'],
 )
 
+app.include_router(
+    monitoring_router,
+    prefix='/api/v1',
+    tags=['Monitoring'],
+)
+
 app.include_router(
     front_auth_router,
     prefix='',
@@ -66,6 +82,11 @@ app.include_router(
     prefix='',
 )
 
+app.add_middleware(
+    ResponseCacheMiddleware,
+    router=app.router,
+    paths=('/api/v1/hotels', '/api/v1/rooms'),
+)
 app.add_middleware(
     CORSMiddleware,
     allow_origins=CORS_ALLOW_ORIGINS,
@@ -86,13 +107,25 @@ async def startup_event():
     init_loggers()
     from src.admin import admin  # noqa
 
+    if cache_settings.CACHE_LOCAL_ENABLED:
+        cache_backend = TieredRedisBackend(
+            cache_redis,
+            local_size=cache_settings.CACHE_LOCAL_SIZE,
+            local_ttl=cache_settings.CACHE_LOCAL_TTL,
+            channel=cache_settings.CACHE_INVALIDATION_CHANNEL,
+        )
+        await cache_backend.start()
+    else:
+        cache_backend = TaggedRedisBackend(cache_redis)
     FastAPICache.init(
-        backend=RedisBackend(
-            redis,
-        ),
+        backend=cache_backend,
         prefix='fastapi-cache',
+        coder=CODERS[cache_settings.CACHE_CODER],
         key_builder=KeyBuilderCache.key_builder,
     )
+    await namespace_metrics.start()
+    get_mongo_client()
+    await start_availability_engine()
     if app_settings.DEBUG:
         async with context_db_session() as session:
             service = await get_user_service(session)
@@ -108,3 +141,14 @@ async def startup_event():
                 user.is_superuser = True
                 await session.merge(user)
                 await session.commit()
+
+
+@app.on_event('shutdown')
+async def shutdown_event():
+    cache_backend = FastAPICache.get_backend()
+    if isinstance(cache_backend, TieredRedisBackend):
+        await cache_backend.stop()
+    await namespace_metrics.stop()
+    await stop_availability_engine()
+    close_mongo_client()
+    password_hasher.shutdown()
@@ -1,3 +1,5 @@
+from typing import Literal
+
 from fastapi.security import OAuth2PasswordBearer
 from passlib.context import CryptContext
 from pydantic import Field
@@ -16,12 +18,25 @@ class AuthSettings(BaseSettings):
 
     EMAIL_CODE_SEND_RATE_LIMIT: int = Field(default=60)  # 60 seconds
     EMAIL_CODE_EXPIRE_MINUTES: int = Field(default=60 * 30)   # 30 minutes
+    EMAIL_CODE_STORAGE: Literal['redis', 'mongo'] = Field(default='redis')
+    # stored: random codes kept in EMAIL_CODE_STORAGE, signed: self-contained expiring tokens
+    EMAIL_CODE_MODE: Literal['stored', 'signed'] = Field(default='stored')
+    EMAIL_CODE_SECRET: str = Field(default=app_settings.SECRET_KEY + '_email_code')
 
     ACCESS_TOKEN_SECRET: str = Field(default=app_settings.SECRET_KEY + '_access')
     REFRESH_TOKEN_SECRET: str = Field(default=app_settings.SECRET_KEY + '_refresh')
 
     DISABLE_PASSWORD_VALIDATOR: bool = Field(default=False)
 
+    PASSWORD_HASH_WORKERS: int = Field(default=4)  # concurrent bcrypt operations per worker
+    PASSWORD_HASH_QUEUE_TIMEOUT: float = Field(default=5.0)  # seconds to wait for a free hashing slot
+
+    USER_CACHE_TTL: int = Field(default=60)  # seconds
+    USER_CACHE_LOCAL_TTL: float = Field(default=5.0)  # seconds
+    USER_CACHE_LOCAL_SIZE: int = Field(default=1024)
+
+    TOKEN_CACHE_SIZE: int = Field(default=4096)  # verified tokens kept per worker
+
 
 auth_config = AuthSettings()
 auth_config.DISABLE_PASSWORD_VALIDATOR = True
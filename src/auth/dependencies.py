@@ -2,14 +2,19 @@ from typing import Annotated
 
 from fastapi import Depends
 from jose import JWTError
-from pymongo import MongoClient
 
-from src.auth.config import oauth2_scheme
+from src.auth.config import auth_config, oauth2_scheme
 from src.auth.jwt import TokenType
-from src.auth.repositories import EmailCodeSentRepository, VerificationCodeRepository
+from src.auth.repositories import (
+    EmailCodeSentRepository,
+    RedisEmailCodeSentRepository,
+    RedisVerificationCodeRepository,
+    VerificationCodeRepository,
+)
 from src.auth.services import AuthService
-from src.base.exceptions import Unauthorized
-from src.config import mongo_settings
+from src.base.exceptions import Forbidden, Unauthorized
+from src.cache import redis
+from src.database import get_mongo_database
 from src.users.dependencies import get_user_service
 from src.users.models import User
 from src.users.services import UserService
@@ -18,9 +23,13 @@ from src.users.services import UserService
 async def get_auth_service(
         user_service: Annotated[UserService, Depends(get_user_service)],
 ) -> AuthService:
-    mongo_session = MongoClient(**mongo_settings.MONGODB_AUTHPARAMS).get_database(mongo_settings.MONGODB_DB)
-    verification_code_repository = VerificationCodeRepository(database=mongo_session)
-    email_code_repository = EmailCodeSentRepository(database=mongo_session)
+    if auth_config.EMAIL_CODE_STORAGE == 'redis':
+        verification_code_repository = RedisVerificationCodeRepository(redis=redis)
+        email_code_repository = RedisEmailCodeSentRepository(redis=redis)
+    else:
+        mongo_database = get_mongo_database()
+        verification_code_repository = VerificationCodeRepository(database=mongo_database)
+        email_code_repository = EmailCodeSentRepository(database=mongo_database)
     return AuthService(user_service, verification_code_repository, email_code_repository)
 
 
@@ -32,3 +41,9 @@ async def get_current_user(
         return await auth_service.get_user_from_token(access_token, TokenType.ACCESS)
     except JWTError as exc:
         raise Unauthorized('Token expired') from exc
+
+
+async def get_staff_user(user: Annotated[User, Depends(get_current_user)]) -> User:
+    if not (user.is_staff or user.is_superuser):
+        raise Forbidden
+    return user
@@ -0,0 +1,58 @@
+import asyncio
+from collections.abc import Callable
+from concurrent.futures import ThreadPoolExecutor
+from typing import Optional, TypeVar
+
+from src.auth.config import auth_config, pwd_context
+from src.base.exceptions import ServiceUnavailable
+
+R = TypeVar('R')
+
+
+class PasswordHasher:
+    """Run bcrypt hashing and verification off the event loop.
+
+    bcrypt takes ~100 ms of CPU per call and releases the GIL, so the calls
+    run on a small thread pool. At most ``workers`` calls run at once, the
+    rest wait up to ``queue_timeout`` seconds for a slot and then fail with
+    503, so a login storm can't pile up unbounded work on the worker.
+    """
+
+    def __init__(self, workers: int, queue_timeout: float):
+        self.workers = workers
+        self.queue_timeout = queue_timeout
+        self._executor: Optional[ThreadPoolExecutor] = None
+        self._semaphore = asyncio.Semaphore(workers)
+
+    def get_executor(self) -> ThreadPoolExecutor:
+        if self._executor is None:
+            self._executor = ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix='password-hasher')
+        return self._executor
+
+    async def _run(self, func: Callable[..., R], *args) -> R:
+        try:
+            await asyncio.wait_for(self._semaphore.acquire(), timeout=self.queue_timeout)
+        except asyncio.TimeoutError as exc:
+            raise ServiceUnavailable('Too many authentication requests, try again later') from exc
+
+        try:
+            return await asyncio.get_running_loop().run_in_executor(self.get_executor(), func, *args)
+        finally:
+            self._semaphore.release()
+
+    async def hash(self, password: str) -> str:  # noqa: A003
+        return await self._run(pwd_context.hash, password)
+
+    async def verify(self, plain_password: str, hashed_password: str) -> bool:
+        return await self._run(pwd_context.verify, plain_password, hashed_password)
+
+    def shutdown(self) -> None:
+        if self._executor is not None:
+            self._executor.shutdown(wait=False)
+            self._executor = None
+
+
+password_hasher = PasswordHasher(
+    workers=auth_config.PASSWORD_HASH_WORKERS,
+    queue_timeout=auth_config.PASSWORD_HASH_QUEUE_TIMEOUT,
+)
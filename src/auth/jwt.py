@@ -1,9 +1,12 @@
+import hashlib
+import hmac
 from datetime import timedelta
 from enum import Enum
 
-from jose import jwt
+from jose import JWTError, jwt
 
 from src.auth.config import auth_config
+from src.auth.models import CodeTypes, VerificationCode
 from src.base.utils import get_utcnow
 from src.users.models import User
 
@@ -47,3 +50,54 @@ def create_tokens(user: User) -> dict[str, str]:
         TokenType.ACCESS.value: access,
         TokenType.REFRESH.value: refresh,
     }
+
+
+def get_user_fingerprint(user: User) -> str:
+    """Keyed digest of the user state a signed email code is bound to.
+
+    Activating the user or changing the password changes the fingerprint,
+    which makes the code single use without storing it.
+    """
+    state = f'{user.id}:{user.password}:{user.is_active}'.encode()
+    return hmac.new(auth_config.EMAIL_CODE_SECRET.encode(), state, hashlib.sha256).hexdigest()[:32]
+
+
+def create_email_code(user: User, code_type: CodeTypes) -> VerificationCode:
+    expires = int((get_utcnow() + timedelta(seconds=auth_config.EMAIL_CODE_EXPIRE_MINUTES)).timestamp())
+    data = {
+        'user_id': user.id,
+        'code_type': code_type.value,
+        'fingerprint': get_user_fingerprint(user),
+        'expires': expires,
+    }
+
+    return VerificationCode(
+        user_id=user.id,
+        code=jwt.encode(data, key=auth_config.EMAIL_CODE_SECRET, algorithm='HS256'),
+        code_type=code_type,
+        expires=expires,
+    )
+
+
+def parse_email_code(code: str) -> tuple[VerificationCode, str]:
+    """Verify a signed email code.
+
+    :return: The code and the user fingerprint it was issued for.
+    :raises JWTError: If the code is malformed, forged or expired.
+    """
+    payload = jwt.decode(code, key=auth_config.EMAIL_CODE_SECRET, algorithms=['HS256'])
+
+    try:
+        verification_code = VerificationCode(
+            user_id=payload['user_id'],
+            code=code,
+            code_type=payload['code_type'],
+            expires=payload['expires'],
+        )
+        fingerprint = payload['fingerprint']
+    except (KeyError, ValueError) as exc:
+        raise JWTError from exc
+
+    if verification_code.is_expired():
+        raise JWTError
+    return verification_code, fingerprint
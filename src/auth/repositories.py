@@ -1,25 +1,28 @@
 import datetime
 import hashlib
+from dataclasses import dataclass
+
+from redis.asyncio import Redis
 
 from src.auth.config import auth_config
 from src.auth.models import CodeTypes, EmailCodeSent, VerificationCode
-from src.base.repositories import AbstractMongoRepository
+from src.base.repositories import AbstractAsyncMongoRepository
 from src.base.utils import get_utcnow
 
 
-class VerificationCodeRepository(AbstractMongoRepository[VerificationCode]):
+class VerificationCodeRepository(AbstractAsyncMongoRepository[VerificationCode]):
 
     class Meta:
         bind_model = VerificationCode
 
     async def check_code_exists(self, user_id: int, code_type: CodeTypes) -> VerificationCode | None:
-        code = self.find_one(
+        code = await self.find_one(
             user_id=user_id,
             code_type=code_type.value,
         )
 
         if code and code.is_expired():
-            self.delete(code)
+            await self.delete(code)
             code = None
 
         return code
@@ -36,27 +39,27 @@ class VerificationCodeRepository(AbstractMongoRepository[VerificationCode]):
                 )).timestamp(),
             ),
         )
-        self.save(verification_code)
+        await self.save(verification_code)
         return verification_code
 
     async def get_valid_code(self, code: str) -> VerificationCode | None:
-        code = self.find_one(
+        code = await self.find_one(
             code=code,
         )
 
         if code and code.is_expired():
-            self.delete(code)
+            await self.delete(code)
             code = None
         return code
 
 
-class EmailCodeSentRepository(AbstractMongoRepository[EmailCodeSent]):
+class EmailCodeSentRepository(AbstractAsyncMongoRepository[EmailCodeSent]):
 
     class Meta:
         bind_model = EmailCodeSent
 
     async def get_email_rate_limit_model(self, email: str, code_type: CodeTypes) -> EmailCodeSent:
-        instance = self.find_one(
+        instance = await self.find_one(
             email=email,
             code_type=code_type.value,
         )
@@ -68,10 +71,99 @@ class EmailCodeSentRepository(AbstractMongoRepository[EmailCodeSent]):
                 last_sent=0,
             )
 
-            self.save(instance)
+            await self.save(instance)
 
         return instance
 
     async def update_last_sent(self, instance: EmailCodeSent) -> None:
         instance.last_sent = int(get_utcnow().timestamp())
-        self.save(instance)
+        await self.save(instance)
+
+    async def acquire_send_slot(self, email: str, code_type: CodeTypes, rate_limit: int) -> bool:
+        """Register a sent email unless one was sent within ``rate_limit`` seconds."""
+        instance = await self.get_email_rate_limit_model(email, code_type)
+        if not instance.can_send_new_code(rate_limit):
+            return False
+
+        await self.update_last_sent(instance)
+        return True
+
+
+@dataclass
+class RedisVerificationCodeRepository:
+    """Verification codes stored in Redis with a native TTL.
+
+    Every code is stored twice, under the code itself and under its user and
+    type, so both lookups are a single GET.
+    """
+    redis: Redis
+
+    @staticmethod
+    def get_code_key(code: str) -> str:
+        return f'auth:code:{code}'
+
+    @staticmethod
+    def get_user_code_key(user_id: int, code_type: CodeTypes) -> str:
+        return f'auth:user-code:{user_id}:{code_type.value}'
+
+    async def _get_valid(self, key: str) -> VerificationCode | None:
+        cached = await self.redis.get(key)
+        if cached is None:
+            return None
+
+        code = VerificationCode.model_validate_json(cached)
+        if code.is_expired():
+            await self.delete(code)
+            return None
+        return code
+
+    async def check_code_exists(self, user_id: int, code_type: CodeTypes) -> VerificationCode | None:
+        return await self._get_valid(self.get_user_code_key(user_id, code_type))
+
+    async def generate_verification_code(self, user_id, code_type: CodeTypes) -> VerificationCode:
+        now = get_utcnow()
+        code_hash = hashlib.sha256(str(user_id + now.timestamp()).encode()).hexdigest()
+        expire_seconds = auth_config.EMAIL_CODE_EXPIRE_MINUTES
+        verification_code = VerificationCode(
+            user_id=user_id,
+            code=code_hash,
+            code_type=code_type,
+            expires=int((now + datetime.timedelta(seconds=expire_seconds)).timestamp()),
+        )
+
+        value = verification_code.model_dump_json()
+        async with self.redis.pipeline(transaction=True) as pipe:
+            pipe.set(self.get_code_key(verification_code.code), value, ex=expire_seconds)
+            pipe.set(self.get_user_code_key(user_id, code_type), value, ex=expire_seconds)
+            await pipe.execute()
+        return verification_code
+
+    async def get_valid_code(self, code: str) -> VerificationCode | None:
+        return await self._get_valid(self.get_code_key(code))
+
+    async def delete(self, code: VerificationCode) -> None:
+        await self.redis.delete(
+            self.get_code_key(code.code),
+            self.get_user_code_key(code.user_id, code.code_type),
+        )
+
+
+@dataclass
+class RedisEmailCodeSentRepository:
+    """Email rate limits as Redis keys living for the rate limit period."""
+    redis: Redis
+
+    @staticmethod
+    def get_key(email: str, code_type: CodeTypes) -> str:
+        return f'auth:email-sent:{code_type.value}:{email}'
+
+    async def acquire_send_slot(self, email: str, code_type: CodeTypes, rate_limit: int) -> bool:
+        """Register a sent email unless one was sent within ``rate_limit`` seconds.
+
+        A single ``SET NX EX``, so concurrent requests can't both pass.
+        """
+        if rate_limit <= 0:
+            return True
+
+        last_sent = int(get_utcnow().timestamp())
+        return bool(await self.redis.set(self.get_key(email, code_type), last_sent, nx=True, ex=rate_limit))
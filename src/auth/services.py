@@ -1,4 +1,5 @@
 import datetime
+import hashlib
 import logging
 from dataclasses import dataclass
 from typing import Any
@@ -14,12 +15,20 @@ from src.auth.exceptions import (
     UserForEmailCodeNotFound,
     UserNotActiveException,
 )
-from src.auth.jwt import TokenType, create_tokens
+from src.auth.jwt import TokenType, create_email_code, create_tokens, get_user_fingerprint, parse_email_code
 from src.auth.models import CodeTypes, VerificationCode
-from src.auth.repositories import EmailCodeSentRepository, VerificationCodeRepository
+from src.auth.repositories import (
+    EmailCodeSentRepository,
+    RedisEmailCodeSentRepository,
+    RedisVerificationCodeRepository,
+    VerificationCodeRepository,
+)
 from src.auth.schemas import ActivateUserData, RecoveryUserData
+from src.base.lru import TTLCache
 from src.base.utils import get_utcnow
 from src.celery_conf.tasks.emails import send_activation_email, send_recovery_email
+from src.metrics import metrics
+from src.users.cache import user_cache
 from src.users.exceptions import PasswordValidationError
 from src.users.models import User
 from src.users.schemas import UserCreate
@@ -27,17 +36,34 @@ from src.users.services import RegisterService, UserService
 
 debugger = logging.getLogger('debugger')
 
+# Digests of verified tokens mapped to their claims and expiry, kept until the token expires
+verified_tokens: TTLCache[tuple[bytes, TokenType], tuple[dict, datetime.datetime]] = TTLCache(
+    maxsize=auth_config.TOKEN_CACHE_SIZE,
+    ttl=auth_config.ACCESS_TOKEN_EXPIRE_MINUTES * 60,
+)
+
 
 @dataclass
 class AuthService:
     user_service: UserService
-    verification_code_repository: VerificationCodeRepository
-    email_code_repository: EmailCodeSentRepository
+    verification_code_repository: VerificationCodeRepository | RedisVerificationCodeRepository
+    email_code_repository: EmailCodeSentRepository | RedisEmailCodeSentRepository
 
     @staticmethod
     def _parse_token(  # noqa: FNE008
             token: str, token_type: TokenType,
     ) -> dict:
+        digest = hashlib.blake2b(token.encode(), digest_size=16).digest()
+        cached = verified_tokens.get((digest, token_type))
+        if cached is not None:
+            claims, expires_at = cached
+            if expires_at < get_utcnow():
+                debugger.debug(f'expired=True expires={claims["expires"]}')
+                raise JWTError
+            metrics.incr('token_cache.hit')
+            return claims
+        metrics.incr('token_cache.miss')
+
         secret = auth_config.ACCESS_TOKEN_SECRET if token_type == TokenType.ACCESS else auth_config.REFRESH_TOKEN_SECRET
 
         payload = jwt.decode(
@@ -56,24 +82,28 @@ class AuthService:
             raise JWTError
 
         correct = token_type_payload == token_type.value
-        expired = datetime.datetime.fromisoformat(expires) < get_utcnow()
+        expires_at = datetime.datetime.fromisoformat(expires)
+        now = get_utcnow()
+        expired = expires_at < now
 
         if not correct or expired:
             debugger.debug(f'{correct=} {expired=} {expires=}')
             raise JWTError
 
-        return {
+        claims = {
             'user_id': user_id,
             'username': username,
             'expires': expires,
             'token_type': token_type,
         }
+        verified_tokens.set((digest, token_type), (claims, expires_at), ttl=(expires_at - now).total_seconds())
+        return claims
 
     async def get_user_from_token(
             self, token: str, token_type: TokenType,
     ) -> User:
         data = self._parse_token(token=token, token_type=token_type)
-        return await self.user_service.get_user_by_id(user_id=data['user_id'])
+        return await self.user_service.get_authenticated_user(user_id=data['user_id'])
 
     async def authenticate_user(
         self, username: str, password: str,
@@ -120,12 +150,13 @@ class AuthService:
         if not user:
             raise UserForEmailCodeNotFound
 
-        email_code_instance = await self.email_code_repository.get_email_rate_limit_model(email, code_type)
-
-        if not email_code_instance.can_send_new_code(auth_config.EMAIL_CODE_SEND_RATE_LIMIT):
+        if not await self.email_code_repository.acquire_send_slot(
+                email, code_type, auth_config.EMAIL_CODE_SEND_RATE_LIMIT,
+        ):
             raise EmailRateLimit
 
-        await self.email_code_repository.update_last_sent(email_code_instance)
+        if auth_config.EMAIL_CODE_MODE == 'signed':
+            return create_email_code(user, code_type)
 
         code = await self.verification_code_repository.check_code_exists(user.id, code_type)
         if not code:
@@ -141,12 +172,36 @@ class AuthService:
         code = await self._find_or_create_code(email, CodeTypes.ACTIVATION)
         send_activation_email.delay(email=email, code=code.code)
 
-    async def recovery_user(self, recovery_data: RecoveryUserData):
-        code = await self.verification_code_repository.get_valid_code(recovery_data.code)
+    async def _get_code_user(self, code: str, code_type: CodeTypes) -> tuple[VerificationCode, User]:
+        """Get a valid email code of the given type and its user.
+
+        :raises InvalidEmailCode: If the code is unknown, expired, of another
+            type or was already used.
+        """
+        if auth_config.EMAIL_CODE_MODE == 'signed':
+            try:
+                verification_code, fingerprint = parse_email_code(code)
+            except JWTError as exc:
+                raise InvalidEmailCode from exc
+        else:
+            verification_code = await self.verification_code_repository.get_valid_code(code)
+            fingerprint = None
+
+        if not verification_code or verification_code.code_type != code_type:
+            raise InvalidEmailCode
 
-        if not code or code.code_type != CodeTypes.RECOVERY:
+        user = await self.user_service.get_user_by_id(verification_code.user_id)
+        if not user or (fingerprint is not None and fingerprint != get_user_fingerprint(user)):
             raise InvalidEmailCode
-        user = await self.user_service.get_user_by_id(code.user_id)
+
+        return verification_code, user
+
+    async def _use_code(self, code: VerificationCode) -> None:
+        if auth_config.EMAIL_CODE_MODE == 'stored':
+            await self.verification_code_repository.delete(code)
+
+    async def recovery_user(self, recovery_data: RecoveryUserData):
+        code, user = await self._get_code_user(recovery_data.code, CodeTypes.RECOVERY)
 
         if await RegisterService.check_password_hash(recovery_data.new_password, user.password):
             raise PasswordValidationError('You cannot use your current password as the new password')
@@ -155,17 +210,15 @@ class AuthService:
 
         user.password = await RegisterService.make_password_hash(recovery_data.new_password)
         await self.user_service.repository.update(user, commit=True)
+        await user_cache.invalidate(user.id)
 
-        self.verification_code_repository.delete(code)
+        await self._use_code(code)
 
     async def activate_user(self, activate_data: ActivateUserData):
-        code = await self.verification_code_repository.get_valid_code(activate_data.code)
-
-        if not code or code.code_type != CodeTypes.ACTIVATION:
-            raise InvalidEmailCode
+        code, user = await self._get_code_user(activate_data.code, CodeTypes.ACTIVATION)
 
-        user = await self.user_service.get_user_by_id(code.user_id)
         user.is_active = True
         await self.user_service.repository.update(user, commit=True)
+        await user_cache.invalidate(user.id)
 
-        self.verification_code_repository.delete(code)
+        await self._use_code(code)
@@ -94,3 +94,16 @@ class InternalServerError(HTTPException):
             detail=detail or self.detail,
             headers=self.headers,
         )
+
+
+class ServiceUnavailable(HTTPException):
+    status_code = status.HTTP_503_SERVICE_UNAVAILABLE
+    detail = 'Service temporarily unavailable'
+    headers = None
+
+    def __init__(self, detail: Optional[str] = None):
+        super().__init__(
+            status_code=self.status_code,
+            detail=detail or self.detail,
+            headers=self.headers,
+        )
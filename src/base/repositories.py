@@ -1,21 +1,33 @@
+import asyncio
+import logging
+import random
 from abc import ABC
-from collections.abc import Sequence
+from collections.abc import Awaitable, Callable, Sequence
 from dataclasses import dataclass
-from typing import Generic, Iterable, Literal, Optional, Tuple, Type, TypeVar
+from typing import AsyncIterator, Generic, Iterable, Literal, Optional, Tuple, Type, TypeVar
 
 from bson import ObjectId
+from motor.motor_asyncio import AsyncIOMotorCollection, AsyncIOMotorDatabase
 from pymongo.collection import Collection
 from pymongo.database import Database
 from pymongo.results import DeleteResult, InsertOneResult, UpdateResult
-from sqlalchemy.exc import InvalidRequestError
+from sqlalchemy.exc import DBAPIError, InvalidRequestError
 from sqlalchemy.ext.asyncio import AsyncSession
 
 from src.base.exceptions import HTTP_EXC, InternalServerError
 from src.base.models import MongoModel
+from src.config import db_settings
 from src.database import DEFAULT_ISOLATION_LEVEL, DatabaseModel
+from src.metrics import metrics
 
 T = TypeVar('T', bound=DatabaseModel)
 MT = TypeVar('MT', bound=MongoModel)
+R = TypeVar('R')
+
+logger = logging.getLogger('all')
+
+# serialization_failure and deadlock_detected, the transaction can succeed when replayed
+RETRYABLE_SQLSTATES = frozenset({'40001', '40P01'})
 
 Sort = Sequence[Tuple[str, int]]
 
@@ -96,6 +108,46 @@ class Transaction:
 
         await self.session.commit()
 
+    @staticmethod
+    def is_retryable(exc: DBAPIError) -> bool:
+        return getattr(exc.orig, 'sqlstate', None) in RETRYABLE_SQLSTATES
+
+    async def run(self, unit_of_work: Callable[[], Awaitable[R]], max_retries: Optional[int] = None) -> R:
+        """Run ``unit_of_work`` in the transaction, replaying it after
+        serialization failures and deadlocks.
+
+        Every attempt starts from a rolled back session, so the unit of work
+        has to do all of its reads itself and must not rely on instances
+        loaded before, they are expired by the rollback.
+
+        :param unit_of_work: Coroutine function performing the transaction.
+        :param max_retries: Number of replays, ``TRANSACTION_MAX_RETRIES`` by default.
+        :return: The result of the successful attempt.
+        """
+        if max_retries is None:
+            max_retries = db_settings.TRANSACTION_MAX_RETRIES
+
+        attempt = 0
+        while True:
+            try:
+                async with self:
+                    return await unit_of_work()
+            except DBAPIError as exc:
+                if not self.is_retryable(exc):
+                    raise
+                # a failed commit leaves the session inactive until rolled back
+                await self.session.rollback()
+
+                if attempt >= max_retries:
+                    metrics.incr('transaction.give_up')
+                    logger.warning(f'Transaction failed after {attempt} retries: {exc.orig}')
+                    raise
+
+                attempt += 1
+                metrics.incr('transaction.retry')
+                # full jitter, so the conflicting transactions don't collide again
+                await asyncio.sleep(random.uniform(0, db_settings.TRANSACTION_RETRY_DELAY * 2 ** attempt))
+
 
 @dataclass
 class AbstractMongoRepository(ABC, Generic[MT]):
@@ -183,3 +235,97 @@ class AbstractMongoRepository(ABC, Generic[MT]):
             cursor.sort(sort)
 
         return map(lambda x: self.Meta.bind_model.model_validate(x), cursor)
+
+
+@dataclass
+class AbstractAsyncMongoRepository(ABC, Generic[MT]):
+    """Counterpart of ``AbstractMongoRepository`` on the asyncio driver.
+
+    Same API, but every method is a coroutine and ``find_all`` returns an
+    async iterator, so lookups no longer block the event loop.
+    """
+    database: AsyncIOMotorDatabase
+
+    class Meta:
+        bind_model: Type[MT]
+
+    def get_collection(self) -> AsyncIOMotorCollection:
+        if self.database is None:
+            raise RuntimeError('Database is not initialized')
+        if self.Meta.bind_model is None:
+            raise RuntimeError('Model is not binded to repository in Meta class')
+        if self.Meta.bind_model.Meta.__collection__ is None:
+            raise RuntimeError(f'Collection is not defined in Meta class in model {self.Meta.bind_model.__name__}')
+        return self.database.get_collection(self.Meta.bind_model.Meta.__collection__)
+
+    @staticmethod
+    def _check_object_id(_id: ObjectId | str) -> ObjectId:
+        if not isinstance(_id, ObjectId) and not ObjectId.is_valid(_id):
+            raise ValueError(f'Invalid ObjectId: {_id}')
+        return ObjectId(_id)
+
+    @staticmethod
+    def __map_only(seq: list) -> dict[str, bool]:
+        only = {'_id': False}
+        for value in seq:
+            only[value] = True
+        return only
+
+    async def save(self, model: MT) -> InsertOneResult | UpdateResult:  # noqa
+        """Save entity to database.
+
+        It will update the entity if it has id, otherwise it will insert
+        it.
+        """
+        document = model.to_document()
+
+        if model.id:
+            mongo_id = document.pop('_id')
+            return await self.get_collection().update_one(
+                {'_id': mongo_id}, {'$set': document},
+            )
+
+        result = await self.get_collection().insert_one(document)
+        model.id = result.inserted_id
+        return result
+
+    async def delete(self, model: MT) -> DeleteResult | None:
+        """Delete entity from database."""
+        if not model.id:
+            return None
+        return await self.get_collection().delete_one({'_id': model.id})
+
+    async def find_one_by_id(self, _id: ObjectId | str) -> MT | None:
+        _id = self._check_object_id(_id)
+
+        return await self.find_one(_id=_id)
+
+    async def find_one(self, **kwargs) -> MT | None:
+        result = await self.get_collection().find_one(kwargs)
+        if not result:
+            return
+        validated = self.Meta.bind_model.model_validate(result)
+        return validated
+
+    async def find_all(
+            self,
+            query: dict,
+            skip: Optional[int] = None,
+            limit: Optional[int] = None,
+            sort: Optional[Sort] = None,
+            only: Optional[list[str]] = None,
+    ) -> AsyncIterator[MT]:
+        if only is not None:
+            only = self.__map_only(only)
+
+        cursor = self.get_collection().find(query, only)
+
+        if limit:
+            cursor.limit(limit)
+        if skip:
+            cursor.skip(skip)
+        if sort:
+            cursor.sort(sort)
+
+        async for document in cursor:
+            yield self.Meta.bind_model.model_validate(document)
@@ -2,10 +2,12 @@ from fastapi import Depends
 from sqlalchemy.ext.asyncio import AsyncSession
 
 from src.base.repositories import Transaction
+from src.bookings.holds import hold_store
 from src.bookings.models import Booking
 from src.bookings.repositories import BookingRepository
 from src.bookings.services import BookingService
 from src.database import get_db_session
+from src.hotels.availability import get_availability_engine
 from src.hotels.repositories import HotelRepository
 from src.hotels.services import HotelService
 
@@ -17,6 +19,8 @@ async def get_booking_service(
     transaction = Transaction(session=session)
 
     hotel_repository = HotelRepository(session=session)
-    hotel_service = HotelService(repository=hotel_repository, transaction=transaction)
+    hotel_service = HotelService(
+        repository=hotel_repository, transaction=transaction, availability=get_availability_engine(), holds=hold_store,
+    )
 
     return BookingService(repository=repository, transaction=transaction, hotels_service=hotel_service)
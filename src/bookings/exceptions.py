@@ -1,5 +1,9 @@
-from src.base.exceptions import DataConflict
+from src.base.exceptions import DataConflict, NotFound
 
 
 class NoRoomsAvailable(DataConflict):
     detail = 'No rooms available for chosen dates'
+
+
+class HoldNotFound(NotFound):
+    detail = 'Room hold not found or expired'
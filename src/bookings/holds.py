@@ -0,0 +1,221 @@
+import datetime
+import json
+import time
+import uuid
+from collections import defaultdict
+from collections.abc import Iterable, Sequence
+from typing import Callable, Optional
+
+from redis.asyncio import Redis
+
+from src.bookings.exceptions import HoldNotFound
+from src.bookings.models import get_booking_nights
+from src.bookings.schemas import RoomHold
+from src.cache import redis
+from src.config import booking_hold_settings
+
+# Adds a hold to the holds of its room and hotel if every night of it stays
+# within the room quantity, counting the booked units passed in ARGV and the
+# other live holds of the room. Expired holds of the room are dropped on the way.
+ADD_HOLD_SCRIPT = """
+local now = tonumber(ARGV[1])
+local hold = cjson.decode(ARGV[2])
+local quantity = tonumber(ARGV[3])
+local ttl = tonumber(ARGV[4])
+
+local taken = {}
+for night = hold.date_from, hold.date_to - 1 do
+    taken[night] = tonumber(ARGV[5 + night - hold.date_from]) + hold.units
+end
+
+local holds = redis.call('HGETALL', KEYS[1])
+for i = 1, #holds, 2 do
+    local other = cjson.decode(holds[i + 1])
+    if other.expires_at <= now then
+        redis.call('HDEL', KEYS[1], holds[i])
+        redis.call('HDEL', KEYS[2], holds[i])
+    else
+        for night = math.max(other.date_from, hold.date_from), math.min(other.date_to, hold.date_to) - 1 do
+            taken[night] = taken[night] + other.units
+        end
+    end
+end
+
+for _, units in pairs(taken) do
+    if units > quantity then
+        return 0
+    end
+end
+
+for _, key in ipairs(KEYS) do
+    redis.call('HSET', key, hold.id, ARGV[2])
+    redis.call('EXPIRE', key, ttl, 'NX')
+    redis.call('EXPIRE', key, ttl, 'GT')
+end
+return 1
+"""
+
+# Takes one unit of a hold, dropping the hold with its last unit
+CONSUME_HOLD_SCRIPT = """
+local raw = redis.call('HGET', KEYS[1], ARGV[1])
+if not raw then
+    return 0
+end
+
+local hold = cjson.decode(raw)
+if hold.units <= 1 then
+    for _, key in ipairs(KEYS) do
+        redis.call('HDEL', key, ARGV[1])
+    end
+    return 1
+end
+
+hold.units = hold.units - 1
+raw = cjson.encode(hold)
+for _, key in ipairs(KEYS) do
+    if redis.call('HEXISTS', key, ARGV[1]) == 1 then
+        redis.call('HSET', key, ARGV[1], raw)
+    end
+end
+return 1
+"""
+
+
+class HoldStore:
+    """Short-lived holds of room units, kept in Redis only.
+
+    Every hold is stored in a hash of its room, which serializes hold
+    checks of the room, and in a hash of its hotel, which serves the hotel
+    listings with one read per hotel. Holds carry their expiry time and are
+    skipped once it passes, the hashes expire with their last hold, so
+    expired holds never need a cleanup in the database.
+    """
+
+    def __init__(self, redis_client: Redis, ttl: int, timer: Callable[[], float] = time.time):
+        self.redis = redis_client
+        self.ttl = ttl
+        self.timer = timer
+        self._add_hold = redis_client.register_script(ADD_HOLD_SCRIPT)
+        self._consume_hold = redis_client.register_script(CONSUME_HOLD_SCRIPT)
+
+    @staticmethod
+    def get_room_key(room_id: int) -> str:
+        return f'holds:room:{room_id}'
+
+    @staticmethod
+    def get_hotel_key(hotel_id: int) -> str:
+        return f'holds:hotel:{hotel_id}'
+
+    @staticmethod
+    def dump_hold(hold: RoomHold) -> str:
+        # nights are stored as day ordinals, so the scripts can compare them
+        data = hold.model_dump()
+        data['date_from'] = hold.date_from.toordinal()
+        data['date_to'] = hold.date_to.toordinal()
+        return json.dumps(data)
+
+    @staticmethod
+    def load_hold(raw: str) -> RoomHold:
+        data = json.loads(raw)
+        data['date_from'] = datetime.date.fromordinal(data['date_from'])
+        data['date_to'] = datetime.date.fromordinal(data['date_to'])
+        return RoomHold(**data)
+
+    def _live_holds(self, raw_holds: Iterable[str]) -> list[RoomHold]:
+        now = self.timer()
+        holds = [self.load_hold(raw) for raw in raw_holds]
+        return [hold for hold in holds if hold.expires_at > now]
+
+    async def add(
+            self, user_id: int, room_id: int, hotel_id: int, quantity: int,
+            date_from: datetime.date, date_to: datetime.date, units: int, booked: dict[datetime.date, int],
+    ) -> Optional[RoomHold]:
+        """Hold units of a room if they are available.
+
+        :param quantity: The room quantity.
+        :param booked: Booked units of the room per night of the range.
+        :return: The hold, or None if the nights are taken by bookings and other holds.
+        """
+        now = int(self.timer())
+        hold = RoomHold(
+            id=uuid.uuid4().hex,
+            user_id=user_id,
+            room_id=room_id,
+            hotel_id=hotel_id,
+            date_from=date_from,
+            date_to=date_to,
+            units=units,
+            expires_at=now + self.ttl,
+        )
+        nights_booked = [booked.get(night, 0) for night in get_booking_nights(date_from, date_to)]
+
+        added = await self._add_hold(
+            keys=[self.get_room_key(room_id), self.get_hotel_key(hotel_id)],
+            args=[now, self.dump_hold(hold), quantity, self.ttl, *nights_booked],
+        )
+        return hold if added else None
+
+    async def get_room_holds(self, room_id: int) -> list[RoomHold]:
+        return self._live_holds((await self.redis.hgetall(self.get_room_key(room_id))).values())
+
+    async def get_held_nights(
+            self, room_id: int, date_from: datetime.date, date_to: datetime.date,
+            user_id: int, hold_id: Optional[str] = None,
+    ) -> dict[datetime.date, int]:
+        """Get the units of a room held per night of the range.
+
+        :param hold_id: A hold of the user being converted into a booking,
+            one of its units is not counted.
+        :raises HoldNotFound: If the hold is not a live hold of the user
+            covering the range.
+        """
+        holds = await self.get_room_holds(room_id)
+        held = defaultdict(int)
+        found = hold_id is None
+
+        for hold in holds:
+            units = hold.units
+            if hold.id == hold_id:
+                if hold.user_id != user_id or not (hold.date_from <= date_from and date_to <= hold.date_to):
+                    raise HoldNotFound
+                found = True
+                units -= 1
+            if not units or not hold.overlaps(date_from, date_to):
+                continue
+            for night in get_booking_nights(max(hold.date_from, date_from), min(hold.date_to, date_to)):
+                held[night] += units
+
+        if not found:
+            raise HoldNotFound
+        return dict(held)
+
+    async def get_held_rooms(
+            self, hotel_ids: Sequence[int], date_from: datetime.date, date_to: datetime.date,
+    ) -> tuple[dict[int, dict[int, int]], Optional[int]]:
+        """Get the peak number of held units over the nights of the range per
+        hotel and room, e.g. ``{hotel_id: {room_id: units}}``, and the earliest
+        expiry time of the counted holds, ``None`` if there are none."""
+        async with self.redis.pipeline(transaction=False) as pipe:
+            for hotel_id in hotel_ids:
+                pipe.hvals(self.get_hotel_key(hotel_id))
+            results = await pipe.execute()
+
+        held_rooms, expires_at = {}, None
+        for hotel_id, raw_holds in zip(hotel_ids, results, strict=True):
+            held_nights: defaultdict[int, defaultdict[datetime.date, int]] = defaultdict(lambda: defaultdict(int))
+            for hold in self._live_holds(raw_holds):
+                if not hold.overlaps(date_from, date_to):
+                    continue
+                for night in get_booking_nights(max(hold.date_from, date_from), min(hold.date_to, date_to)):
+                    held_nights[hold.room_id][night] += hold.units
+                expires_at = hold.expires_at if expires_at is None else min(expires_at, hold.expires_at)
+            if held_nights:
+                held_rooms[hotel_id] = {room_id: max(nights.values()) for room_id, nights in held_nights.items()}
+        return held_rooms, expires_at
+
+    async def consume(self, hold_id: str, room_id: int, hotel_id: int) -> None:
+        """Take one unit of a hold converted into a booking."""
+        await self._consume_hold(keys=[self.get_room_key(room_id), self.get_hotel_key(hotel_id)], args=[hold_id])
+
+
+hold_store = HoldStore(redis, ttl=booking_hold_settings.BOOKING_HOLD_TTL)
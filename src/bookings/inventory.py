@@ -0,0 +1,61 @@
+"""Consistency checker for ``room_inventory``.
+
+Usage::
+
+    python -m src.bookings.inventory            # report mismatches
+    python -m src.bookings.inventory --days 30  # check the upcoming 30 nights only
+    python -m src.bookings.inventory --repair   # recount inventory from bookings
+"""
+import argparse
+import asyncio
+import datetime
+import logging
+from typing import Optional
+
+from src.base.repositories import Transaction
+from src.base.utils import get_utcnow
+from src.bookings.models import Booking
+from src.bookings.repositories import BookingRepository
+from src.database import context_db_session
+
+logger = logging.getLogger('all')
+
+
+async def check_room_inventory(repair: bool = False, days: Optional[int] = None) -> int:
+    """Compare ``room_inventory`` with the bookings.
+
+    :param repair: Recount the inventory if any mismatch was found.
+    :param days: Check only this many nights starting from today.
+    :return: The number of mismatched nights.
+    """
+    date_from = date_to = None
+    if days:
+        date_from = get_utcnow().date()
+        date_to = date_from + datetime.timedelta(days=days)
+
+    async with context_db_session() as session:
+        repository = BookingRepository(session=session, bind_model=Booking)
+        mismatches = await repository.find_inventory_mismatches(date_from, date_to)
+
+        for row in mismatches:
+            logger.warning(
+                f'room_inventory mismatch: room {row.room_id}, day {row.day}, '
+                f'booked {row.booked}, expected {row.expected}',
+            )
+
+        if mismatches and repair:
+            async with Transaction(session=session):
+                await repository.rebuild_inventory()
+            logger.info(f'room_inventory rebuilt, {len(mismatches)} nights fixed')
+
+    return len(mismatches)
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Check room_inventory against bookings')
+    parser.add_argument('--repair', action='store_true', help='recount inventory from bookings')
+    parser.add_argument('--days', type=int, default=None, help='check only the upcoming nights')
+    cli_args = parser.parse_args()
+
+    found = asyncio.run(check_room_inventory(repair=cli_args.repair, days=cli_args.days))
+    print(f'Mismatched nights: {found}')
@@ -1,6 +1,9 @@
 import datetime
 
-from sqlalchemy import Computed, Date, ForeignKey, Integer
+from sqlalchemy import Computed, Date, ForeignKey, Index, Integer, inspect
+from sqlalchemy.dialects.postgresql import DATERANGE, Range, insert
+from sqlalchemy.engine import Connection
+from sqlalchemy.event import listens_for
 from sqlalchemy.ext.asyncio import AsyncAttrs
 from sqlalchemy.orm import Mapped, mapped_column, relationship
 
@@ -12,6 +15,10 @@ from src.users.models import User
 class Booking(AsyncAttrs, DatabaseModel):
     __tablename__ = 'booking'
     __allow_unmapped__ = True
+    __table_args__ = (
+        # requires btree_gist extension for the integer column
+        Index('ix_booking_room_id_stay', 'room_id', 'stay', postgresql_using='gist'),
+    )
 
     id: Mapped[int] = mapped_column(  # noqa
         Integer, primary_key=True, index=True, autoincrement=True,
@@ -37,6 +44,9 @@ class Booking(AsyncAttrs, DatabaseModel):
     total_days: Mapped[int] = mapped_column(
         Integer, Computed('date_to - date_from'),
     )
+    stay: Mapped[Range[datetime.date]] = mapped_column(
+        DATERANGE, Computed('daterange(date_from, date_to)'),
+    )
 
     room: Room = relationship(
         'Room', lazy='joined',
@@ -44,3 +54,71 @@ class Booking(AsyncAttrs, DatabaseModel):
     user: User = relationship(
         'User', lazy='joined', back_populates='bookings',
     )
+
+
+class RoomInventory(DatabaseModel):
+    """Number of booked units of a room per night.
+
+    A booking occupies the nights from ``date_from`` up to, but not
+    including, ``date_to``. Rows are maintained together with bookings, in
+    the same transaction, so availability checks only read the nights of the
+    requested range.
+    """
+
+    __tablename__ = 'room_inventory'
+
+    room_id: Mapped[int] = mapped_column(
+        Integer, ForeignKey('room.id', ondelete='CASCADE'), primary_key=True,
+    )
+    day: Mapped[datetime.date] = mapped_column(
+        Date, primary_key=True,
+    )
+    booked: Mapped[int] = mapped_column(
+        Integer, nullable=False, default=0, server_default='0',
+    )
+
+
+def get_booking_nights(date_from: datetime.date, date_to: datetime.date) -> list[datetime.date]:
+    return [date_from + datetime.timedelta(days=i) for i in range((date_to - date_from).days)]
+
+
+def change_room_inventory(
+        connection: Connection, room_id: int, date_from: datetime.date, date_to: datetime.date, delta: int,
+) -> None:
+    nights = get_booking_nights(date_from, date_to)
+    if not nights:
+        return
+
+    stmt = insert(RoomInventory).values([
+        {'room_id': room_id, 'day': day, 'booked': delta} for day in nights
+    ])
+    stmt = stmt.on_conflict_do_update(
+        index_elements=[RoomInventory.room_id, RoomInventory.day],
+        set_={'booked': RoomInventory.booked + stmt.excluded.booked},
+    )
+    connection.execute(stmt)
+
+
+@listens_for(Booking, 'after_insert')
+def add_booking_to_inventory(mapper, connection: Connection, target: Booking):
+    change_room_inventory(connection, target.room_id, target.date_from, target.date_to, 1)
+
+
+@listens_for(Booking, 'after_delete')
+def remove_booking_from_inventory(mapper, connection: Connection, target: Booking):
+    change_room_inventory(connection, target.room_id, target.date_from, target.date_to, -1)
+
+
+@listens_for(Booking, 'after_update')
+def move_booking_in_inventory(mapper, connection: Connection, target: Booking):
+    state = inspect(target)
+    previous = {}
+    for attr in ('room_id', 'date_from', 'date_to'):
+        history = state.attrs[attr].history
+        previous[attr] = history.deleted[0] if history.deleted else getattr(target, attr)
+
+    if previous == {'room_id': target.room_id, 'date_from': target.date_from, 'date_to': target.date_to}:
+        return
+
+    change_room_inventory(connection, previous['room_id'], previous['date_from'], previous['date_to'], -1)
+    change_room_inventory(connection, target.room_id, target.date_from, target.date_to, 1)
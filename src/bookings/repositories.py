@@ -1,60 +1,154 @@
 import datetime
-import logging
 from collections.abc import Sequence
 from dataclasses import dataclass
 from typing import Optional
 
-from sqlalchemy import and_, func, or_, select
+from sqlalchemy import (
+    ColumnElement,
+    Date,
+    Integer,
+    Row,
+    RowMapping,
+    Select,
+    and_,
+    cast,
+    column,
+    delete,
+    func,
+    insert,
+    literal,
+    literal_column,
+    select,
+    text,
+    update,
+    values,
+)
+from sqlalchemy.dialects.postgresql import DATERANGE
+from sqlalchemy.dialects.postgresql import insert as pg_insert
+from sqlalchemy.orm import aliased, raiseload
 
 from src.base.exceptions import NotFound
 from src.base.repositories import BaseRepository
-from src.bookings.exceptions import NoRoomsAvailable
-from src.bookings.models import Booking
+from src.bookings.models import Booking, RoomInventory, get_booking_nights
 from src.hotels.models import Room
 
-logger = logging.getLogger('all')
-
 
 @dataclass
 class BookingRepository(BaseRepository[Booking]):
 
     @staticmethod
-    async def get_booked_rooms_clauses(date_from: datetime.date, date_to: datetime.date) -> list:
-        return [
-            and_(Booking.date_from <= date_from, Booking.date_to >= date_to),
-            and_(Booking.date_from > date_from, Booking.date_to < date_to),
-            and_(Booking.date_from <= date_from, Booking.date_to >= date_from, Booking.date_to < date_to),
-            and_(Booking.date_from > date_from, Booking.date_from <= date_to, Booking.date_to >= date_to),
-        ]
+    def get_booked_rooms_clause(date_from: datetime.date, date_to: datetime.date) -> ColumnElement[bool]:
+        """Match bookings sharing at least one night with the given range.
+
+        Served by the GiST index on ``(room_id, stay)``.
+        """
+        return Booking.stay.overlaps(func.daterange(date_from, date_to, type_=DATERANGE))
+
+    @staticmethod
+    def get_booked_rooms_query(date_from: datetime.date, date_to: datetime.date) -> Select:
+        """Get the peak number of booked units per room over the nights of
+        the given range."""
+        return select(
+            RoomInventory.room_id.label('room_id'),
+            func.max(RoomInventory.booked).label('rooms_booked'),
+        ).where(
+            RoomInventory.day >= date_from,
+            RoomInventory.day < date_to,
+        ).group_by(RoomInventory.room_id)
 
     async def get_booking_or_404(self, booking_id: int) -> Booking:
         return await self._get_or_exception(booking_id, NotFound, 'Booking with this id not found')
 
-    async def add_booking(self, booking: Booking) -> Booking:
-        return await self.create(booking)
+    async def book_room(
+            self, user_id: int, room_id: int, date_from: datetime.date, date_to: datetime.date,
+            held: Optional[dict[datetime.date, int]] = None,
+    ) -> tuple[Booking, int] | None:
+        """Book a room in a single statement.
+
+        Every night of the range is taken in ``room_inventory`` only while
+        fewer units than the room quantity are booked, the booking is inserted
+        only if all of the nights were taken. The conflict clause of the
+        upsert sees the latest committed inventory rows, so concurrent
+        bookings of the same night can't overbook it. They wait for each other
+        on the inventory row of the night, the room row itself is not locked.
+
+        Nights taken by a failed attempt stay incremented, the caller has to
+        roll the transaction back when None is returned.
+
+        :param held: Units of the room held by others per night, they are not available.
+        :return: The booking and the hotel id of the room, or None if the room
+            does not exist or is not available.
+        """
+        held = held or {}
+        booking_nights = get_booking_nights(date_from, date_to)
 
-    async def check_room_available(
+        room = select(Room.id, Room.hotel_id, Room.price, Room.quantity).where(Room.id == room_id).cte('booked_room')
+        nights = select(values(
+            column('day', Date), column('held', Integer), name='held_nights',
+        ).data([(night, held.get(night, 0)) for night in booking_nights])).cte('nights')
+
+        taken_nights = pg_insert(RoomInventory).from_select(
+            ['room_id', 'day', 'booked'],
+            select(room.c.id, nights.c.day, literal(1)).where(room.c.quantity > nights.c.held),
+        )
+        # rendered as a plain reference, a correlated excluded.day would drag
+        # the excluded alias into the FROM list of the subquery
+        night_held = select(nights.c.held).where(nights.c.day == literal_column('excluded.day')).scalar_subquery()
+        taken_nights = taken_nights.on_conflict_do_update(
+            index_elements=[RoomInventory.room_id, RoomInventory.day],
+            set_={'booked': RoomInventory.booked + 1},
+            where=RoomInventory.booked < select(room.c.quantity).scalar_subquery() - night_held,
+        ).returning(RoomInventory.day).cte('taken_nights')
+
+        all_nights_taken = select(func.count()).select_from(taken_nights).scalar_subquery() == len(booking_nights)
+        inserted = insert(Booking).from_select(
+            ['user_id', 'room_id', 'date_from', 'date_to', 'price'],
+            select(
+                literal(user_id), room.c.id, literal(date_from, Date), literal(date_to, Date), room.c.price,
+            ).where(all_nights_taken),
+        ).returning(*Booking.__table__.c).cte('inserted_booking')
+
+        booking = aliased(Booking, inserted)
+        stmt = select(booking, room.c.hotel_id).join(room, room.c.id == booking.room_id).options(raiseload('*'))
+
+        result = await self.session.execute(stmt)
+        return result.tuples().one_or_none()
+
+    async def get_room_nights_booked(
             self, room_id: int, date_from: datetime.date, date_to: datetime.date,
-    ) -> None:
-        clauses = await self.get_booked_rooms_clauses(date_from, date_to)
-        booked_rooms = select(Booking.room_id).where(
-            and_(
-                Booking.room_id == room_id,
-                or_(*clauses),
+    ) -> dict[datetime.date, int]:
+        result = await self.session.execute(
+            select(RoomInventory.day, RoomInventory.booked).where(
+                RoomInventory.room_id == room_id,
+                RoomInventory.day >= date_from,
+                RoomInventory.day < date_to,
             ),
-        ).cte('booked_rooms')
+        )
+        return dict(result.tuples().all())
+
+    async def cancel_booking(self, booking_id: int, user_id: int) -> Row | None:
+        """Delete a booking of the user and release its nights in ``room_inventory``
+        in a single statement.
 
-        rooms_left = select(
-            (Room.quantity - func.count(booked_rooms.c.room_id)).label('rooms_left'),
-        ).select_from(Room).join(
-            booked_rooms, Room.id == booked_rooms.c.room_id, isouter=True,
-        ).where(Room.id == room_id).group_by(Room.quantity, booked_rooms.c.room_id)
+        :return: A row with ``room_id``, ``hotel_id``, ``date_from`` and ``date_to``
+            of the deleted booking, or None if the user has no such booking.
+        """
+        deleted = delete(Booking).where(
+            Booking.id == booking_id, Booking.user_id == user_id,
+        ).returning(Booking.room_id, Booking.date_from, Booking.date_to).cte('deleted_booking')
 
-        result = await self.session.scalar(rooms_left)
-        if result <= 0:
-            if result < 0:
-                logger.warning(f'Rooms has less than 0 available, {result}')
-            raise NoRoomsAvailable
+        released = update(RoomInventory).where(
+            RoomInventory.room_id == deleted.c.room_id,
+            RoomInventory.day >= deleted.c.date_from,
+            RoomInventory.day < deleted.c.date_to,
+        ).values(booked=RoomInventory.booked - 1).cte('released_nights')
+
+        stmt = select(
+            deleted.c.room_id, Room.hotel_id, deleted.c.date_from, deleted.c.date_to,
+        ).join(Room, Room.id == deleted.c.room_id).add_cte(released)
+
+        result = await self.session.execute(stmt)
+        return result.one_or_none()
 
     async def get_my_bookings(
             self, user_id: int, booking_id: Optional[int] = None,
@@ -67,3 +161,76 @@ class BookingRepository(BaseRepository[Booking]):
 
         result = await self.session.scalars(stmt)
         return result.all()
+
+    @classmethod
+    def get_expected_inventory_query(
+            cls, date_from: Optional[datetime.date] = None, date_to: Optional[datetime.date] = None,
+    ) -> Select:
+        """Get the number of booked units per room and night counted from the
+        bookings themselves, optionally limited to the nights of a range."""
+        nights = select(
+            Booking.room_id.label('room_id'),
+            cast(
+                func.generate_series(Booking.date_from, Booking.date_to - 1, literal_column("interval '1 day'")),
+                Date,
+            ).label('day'),
+        )
+        if date_from and date_to:
+            nights = nights.where(cls.get_booked_rooms_clause(date_from, date_to))
+        nights = nights.subquery('nights')
+
+        stmt = select(
+            nights.c.room_id,
+            nights.c.day,
+            func.count().label('booked'),
+        ).group_by(nights.c.room_id, nights.c.day)
+
+        if date_from and date_to:
+            stmt = stmt.where(nights.c.day >= date_from, nights.c.day < date_to)
+        return stmt
+
+    async def find_inventory_mismatches(
+            self, date_from: Optional[datetime.date] = None, date_to: Optional[datetime.date] = None,
+    ) -> Sequence[RowMapping]:
+        """Find nights where ``room_inventory`` disagrees with the bookings.
+
+        :param date_from: The first night to check, all nights are checked if omitted.
+        :param date_to: The night after the last one to check.
+        :return: Rows with ``room_id``, ``day``, the stored ``booked`` value and
+            the ``expected`` one.
+        """
+        expected = self.get_expected_inventory_query(date_from, date_to).subquery('expected')
+
+        inventory = select(RoomInventory)
+        if date_from and date_to:
+            inventory = inventory.where(RoomInventory.day >= date_from, RoomInventory.day < date_to)
+        inventory = inventory.subquery('inventory')
+
+        booked = func.coalesce(inventory.c.booked, 0)
+        expected_booked = func.coalesce(expected.c.booked, 0)
+        stmt = select(
+            func.coalesce(inventory.c.room_id, expected.c.room_id).label('room_id'),
+            func.coalesce(inventory.c.day, expected.c.day).label('day'),
+            booked.label('booked'),
+            expected_booked.label('expected'),
+        ).select_from(inventory).join(
+            expected,
+            and_(inventory.c.room_id == expected.c.room_id, inventory.c.day == expected.c.day),
+            full=True,
+        ).where(booked != expected_booked).order_by('room_id', 'day')
+
+        result = await self.session.execute(stmt)
+        return result.mappings().all()
+
+    async def rebuild_inventory(self) -> None:
+        """Recount ``room_inventory`` from the bookings.
+
+        Bookings are locked against writes until the transaction ends, so
+        the recount can't miss a concurrent booking.
+        """
+        expected = self.get_expected_inventory_query()
+        await self.session.execute(text('LOCK TABLE booking IN SHARE MODE'))
+        await self.session.execute(delete(RoomInventory))
+        await self.session.execute(
+            insert(RoomInventory).from_select(['room_id', 'day', 'booked'], expected),
+        )
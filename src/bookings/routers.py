@@ -1,12 +1,12 @@
-from typing import Annotated, List
+from typing import Annotated, List, Optional
 
-from fastapi import APIRouter, Depends, status
+from fastapi import APIRouter, Depends, Header, Response, status
 
 from src.auth.dependencies import get_current_user
 from src.bookings.dependencies import get_booking_service
-from src.bookings.schemas import BookingCreateData, BookingDetail
+from src.bookings.schemas import BookingCreateData, BookingDetail, HoldCreateData, HoldDetail
 from src.bookings.services import BookingService
-from src.cache import KeyBuilderCache
+from src.idempotency import IdempotencyStore, idempotency_store
 from src.users.models import User
 
 bookings_router = APIRouter(
@@ -23,14 +23,39 @@ async def create_booking(
         booking_data: BookingCreateData,
         user: Annotated[User, Depends(get_current_user)],
         booking_service: Annotated[BookingService, Depends(get_booking_service)],
+        response: Response,
+        idempotency_key: Annotated[Optional[str], Header(max_length=255)] = None,
 ):
     booking_data.validate_date_to()
 
-    await KeyBuilderCache.clear_cache_for_func('get_room_info')
-    await KeyBuilderCache.clear_cache_for_func('get_rooms_for_hotel')
-    await KeyBuilderCache.clear_cache_for_func('get_hotel_info')
+    if idempotency_key is None:
+        return await booking_service.add_booking(user, booking_data)
 
-    return await booking_service.add_booking(user, booking_data)
+    # retried requests get the response of the first one instead of a second booking
+    result, replayed = await idempotency_store.run(
+        scope=f'bookings-create:{user.id}',
+        key=idempotency_key,
+        fingerprint=IdempotencyStore.get_fingerprint(booking_data),
+        func=lambda: booking_service.add_booking(user, booking_data),
+    )
+    if replayed:
+        response.headers['Idempotent-Replayed'] = 'true'
+    return result
+
+
+@bookings_router.post(
+    '/holds',
+    status_code=status.HTTP_201_CREATED,
+    response_model=HoldDetail,
+)
+async def create_hold(
+        hold_data: HoldCreateData,
+        user: Annotated[User, Depends(get_current_user)],
+        booking_service: Annotated[BookingService, Depends(get_booking_service)],
+):
+    hold_data.validate_date_to()
+
+    return await booking_service.add_hold(user, hold_data)
 
 
 @bookings_router.get(
@@ -1,13 +1,15 @@
 import datetime
+from typing import Optional
 
-from pydantic import field_validator
+from pydantic import BaseModel, Field, field_validator
 
 from src.base.schemas import BaseORMModel
 from src.base.utils import get_utcnow
+from src.config import booking_hold_settings
 from src.hotels.schemas import DateRangeModel, HotelRoomInfoWithHotel
 
 
-class BookingCreateData(DateRangeModel):
+class RoomDateRangeData(DateRangeModel):
     room_id: int
 
     @field_validator('date_from')
@@ -17,6 +19,37 @@ class BookingCreateData(DateRangeModel):
         return value
 
 
+class BookingCreateData(RoomDateRangeData):
+    hold_id: Optional[str] = Field(default=None)
+
+
+class HoldCreateData(RoomDateRangeData):
+    units: int = Field(default=1, ge=1, le=booking_hold_settings.BOOKING_HOLD_MAX_UNITS)
+
+
+class RoomHold(BaseModel):
+    id: str  # noqa
+    user_id: int
+    room_id: int
+    hotel_id: int
+    date_from: datetime.date
+    date_to: datetime.date
+    units: int
+    expires_at: int
+
+    def overlaps(self, date_from: datetime.date, date_to: datetime.date) -> bool:
+        return self.date_from < date_to and date_from < self.date_to
+
+
+class HoldDetail(BaseModel):
+    id: str  # noqa
+    room_id: int
+    date_from: datetime.date
+    date_to: datetime.date
+    units: int
+    expires_at: int
+
+
 class BookingDetail(BaseORMModel):
     id: int  # noqa
     room: HotelRoomInfoWithHotel
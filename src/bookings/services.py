@@ -1,15 +1,35 @@
-from collections.abc import Sequence
+import logging
+from collections.abc import Awaitable, Sequence
 from dataclasses import dataclass
 from typing import Optional
 
-from src.base.exceptions import Forbidden
+from redis.exceptions import RedisError
+from sqlalchemy import Row
+
+from src.base.exceptions import Forbidden, ServiceUnavailable
 from src.base.repositories import Transaction
+from src.bookings.exceptions import NoRoomsAvailable
 from src.bookings.models import Booking
 from src.bookings.repositories import BookingRepository
-from src.bookings.schemas import BookingCreateData
+from src.bookings.schemas import BookingCreateData, HoldCreateData, RoomHold
+from src.cache import KeyBuilderCache
 from src.hotels.services import HotelService
 from src.users.models import User
 
+logger = logging.getLogger('debugger')
+
+
+async def run_after_commit(action: str, side_effect: Awaitable) -> None:
+    """Run a Redis side effect of a committed change without failing the request.
+
+    A failed request with an ``Idempotency-Key`` releases the key, so its
+    retry would apply the committed change again.
+    """
+    try:
+        await side_effect
+    except RedisError as exc:
+        logger.warning(f'{action} failed after commit: {exc}')
+
 
 @dataclass
 class BookingService:
@@ -21,19 +41,58 @@ class BookingService:
             self, user: User, booking_data: BookingCreateData,
     ) -> Booking:
         room_id = booking_data.room_id
-        async with self.transaction:
-            room = await self.hotels_service.get_room_by_id(room_id)
-            await self.repository.check_room_available(room_id, booking_data.date_from, booking_data.date_to)
-            booking = Booking(
-                user_id=user.id,
-                room_id=room_id,
-                date_from=booking_data.date_from,
-                date_to=booking_data.date_to,
-                price=room.price,
+        user_id = user.id
+        holds = self.hotels_service.holds
+
+        held = None
+        if holds:
+            held = await holds.get_held_nights(
+                room_id, booking_data.date_from, booking_data.date_to, user_id=user_id, hold_id=booking_data.hold_id,
+            )
+
+        async def book() -> tuple[Booking, int]:
+            booked = await self.repository.book_room(
+                user_id, room_id, booking_data.date_from, booking_data.date_to, held=held,
             )
-            result = await self.repository.add_booking(booking)
+            if booked is None:
+                # only a failed booking pays for telling a missing room from a full one
+                await self.hotels_service.get_room_by_id(room_id)
+                raise NoRoomsAvailable
+            return booked
+
+        result, hotel_id = await self.transaction.run(book)
+
+        if holds and booking_data.hold_id:
+            await run_after_commit('Hold consumption', holds.consume(booking_data.hold_id, room_id, hotel_id))
+        if self.hotels_service.availability:
+            await run_after_commit('Availability publish', self.hotels_service.availability.publish(
+                result.id, room_id, booking_data.date_from, booking_data.date_to,
+            ))
+        await run_after_commit('Cache invalidation', KeyBuilderCache.clear_cache_for_room(room_id, hotel_id))
         return result
 
+    async def add_hold(self, user: User, hold_data: HoldCreateData) -> RoomHold:
+        """Hold units of a room for ``BOOKING_HOLD_TTL`` seconds.
+
+        The held units are not available to other users until the hold is
+        converted into bookings or expires.
+        """
+        holds = self.hotels_service.holds
+        if not holds:
+            raise ServiceUnavailable('Room holds are disabled')
+
+        room = await self.hotels_service.get_room_by_id(hold_data.room_id)
+        booked = await self.repository.get_room_nights_booked(room.id, hold_data.date_from, hold_data.date_to)
+
+        hold = await holds.add(
+            user.id, room.id, room.hotel_id, room.quantity,
+            hold_data.date_from, hold_data.date_to, hold_data.units, booked,
+        )
+        if hold is None:
+            raise NoRoomsAvailable
+        await KeyBuilderCache.clear_cache_for_room(room.id, room.hotel_id)
+        return hold
+
     async def get_my_bookings(
             self, user_id: int, booking_id: Optional[int] = None,
     ) -> Sequence[Booking] | Booking:
@@ -42,8 +101,17 @@ class BookingService:
     async def delete_booking(
             self, user_id: int, booking_id: int,
     ) -> None:
-        async with self.transaction:
-            booking = await self.repository.get_booking_or_404(booking_id)
-            if booking.user_id != user_id:
+        async def delete() -> Row:
+            cancelled = await self.repository.cancel_booking(booking_id, user_id)
+            if cancelled is None:
+                await self.repository.get_booking_or_404(booking_id)
                 raise Forbidden('You are not allowed to delete this booking')
-            await self.repository.delete(booking)
+            return cancelled
+
+        room_id, hotel_id, date_from, date_to = await self.transaction.run(delete)
+
+        if self.hotels_service.availability:
+            await run_after_commit('Availability publish', self.hotels_service.availability.publish(
+                booking_id, room_id, date_from, date_to, delta=-1,
+            ))
+        await run_after_commit('Cache invalidation', KeyBuilderCache.clear_cache_for_room(room_id, hotel_id))
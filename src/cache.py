@@ -1,62 +1,883 @@
+import asyncio
+import datetime
 import hashlib
+import inspect
+import json
 import logging
-from typing import Any, Callable, Optional
+import math
+import time
+import uuid
+import zlib
+from collections import defaultdict
+from collections.abc import Awaitable
+from contextlib import suppress
+from contextvars import ContextVar
+from enum import Enum
+from functools import wraps
+from typing import Any, Callable, Optional, TypeVar
 
-from fastapi import Request, Response
+import orjson
+from fastapi import BackgroundTasks, Request, Response
+from fastapi.encoders import jsonable_encoder
 from fastapi_cache import FastAPICache
+from fastapi_cache.backends import Backend
+from fastapi_cache.backends.redis import RedisBackend
+from fastapi_cache.coder import Coder, JsonCoder
+from pydantic import BaseModel
 from redis import asyncio as aioredis
+from redis.exceptions import RedisError
 
-from src.config import redis_settings
+from src.base.lru import TTLCache
+from src.config import cache_settings, redis_settings
+from src.metrics import metrics
 
 logger = logging.getLogger('debugger')
 redis = aioredis.from_url(redis_settings.REDIS_URL, encoding='utf8', decode_responses=True)
+# Client of the cache backend, the entries are text or bytes depending on the FastAPICache coder
+cache_redis = aioredis.from_url(redis_settings.REDIS_URL)
+
+EncodedValue = str | bytes
+
+KEY_PARAM_TYPES = (str, int, float, datetime.date, Enum)
+
+# Suffix of the key holding the rendered response of a cache entry, see ResponseCacheMiddleware
+RESPONSE_KEY_SUFFIX = ':response'
+
+# Suffix of the key locking the computation of a missing cache entry
+LOCK_KEY_SUFFIX = ':lock'
+
+# Header of responses built from a stale cache entry
+STALE_HEADER = 'X-Cache-Stale'
+
+# Parameters FastAPI injects into the cached endpoints, by annotation and default name
+INJECTED_PARAMS = ((Request, 'request'), (Response, 'response'), (BackgroundTasks, 'background_tasks'))
+
+T = TypeVar('T')
+
+# Tags of the cache entry being computed in the current request
+_entry_tags: ContextVar[Optional[set[str]]] = ContextVar('cache_entry_tags', default=None)
+
+# Unix times the cache entry being computed in the current request has to turn stale at
+_entry_deadlines: ContextVar[Optional[list[float]]] = ContextVar('cache_entry_deadlines', default=None)
+
+# Seconds to wait before subscribing again after the invalidation channel failed
+INVALIDATION_RETRY_DELAY = 1
+
+# Set of the namespaces with counters, and prefix of their hashes, e.g. ``cache-metrics:clearable-get_hotel_info``
+NAMESPACE_METRICS_KEY = 'cache-metrics'
+
+
+class NamespaceMetrics:
+    """Cache counters per namespace, summed over every worker in Redis hashes.
+
+    Events are counted in the worker and added to the hashes with HINCRBY
+    every ``flush_interval`` seconds and before the counters are read, so
+    requests don't wait for Redis. The counters of the other workers may
+    lag by up to ``flush_interval``, and are lost if Redis fails.
+    """
+
+    def __init__(self, redis_client: aioredis.Redis, flush_interval: float):
+        self.redis = redis_client
+        self.flush_interval = flush_interval
+        self._pending: defaultdict[tuple[str, str], int] = defaultdict(int)
+        self._flusher: Optional[asyncio.Task] = None
+
+    @staticmethod
+    def get_key(namespace: str) -> str:
+        return f'{NAMESPACE_METRICS_KEY}:{namespace}'
+
+    def incr(self, namespace: str, event: str, value: int = 1) -> None:
+        self._pending[namespace, event] += value
+
+    async def flush(self) -> None:
+        """Add the events counted in this worker since the last flush to the hashes."""
+        pending, self._pending = self._pending, defaultdict(int)
+        if not pending:
+            return
+        try:
+            async with self.redis.pipeline(transaction=False) as pipe:
+                pipe.sadd(NAMESPACE_METRICS_KEY, *{namespace for namespace, _ in pending})
+                for (namespace, event), value in pending.items():
+                    pipe.hincrby(self.get_key(namespace), event, value)
+                await pipe.execute()
+        except RedisError as exc:
+            logger.warning(f'Cache metrics flush failed: {exc}')
+
+    async def get_all(self) -> dict[str, dict[str, int]]:
+        """Get the counters of every worker per namespace, e.g. ``{namespace: {'hit': 10, 'miss': 2}}``."""
+        await self.flush()
+        namespaces = sorted(await self.redis.smembers(NAMESPACE_METRICS_KEY))
+        async with self.redis.pipeline(transaction=False) as pipe:
+            for namespace in namespaces:
+                pipe.hgetall(self.get_key(namespace))
+            results = await pipe.execute()
+        return {
+            namespace: {event: int(value) for event, value in counters.items()}
+            for namespace, counters in zip(namespaces, results, strict=True)
+        }
+
+    async def reset(self) -> None:
+        self._pending.clear()
+        namespaces = await self.redis.smembers(NAMESPACE_METRICS_KEY)
+        await self.redis.delete(NAMESPACE_METRICS_KEY, *map(self.get_key, namespaces))
+
+    async def _flush_periodically(self) -> None:
+        while True:
+            await asyncio.sleep(self.flush_interval)
+            await self.flush()
+
+    async def start(self) -> None:
+        if self._flusher is None:
+            self._flusher = asyncio.create_task(self._flush_periodically())
+
+    async def stop(self) -> None:
+        if self._flusher is not None:
+            self._flusher.cancel()
+            with suppress(asyncio.CancelledError):
+                await self._flusher
+            self._flusher = None
+        await self.flush()
+
+
+namespace_metrics = NamespaceMetrics(redis, flush_interval=cache_settings.CACHE_METRICS_FLUSH_INTERVAL)
+
+
+def incr_namespace(namespace: str, event: str, value: int = 1) -> None:
+    """Count a cache event (hit, miss, set, invalidation etc.) of a namespace."""
+    namespace_metrics.incr(namespace, event, value)
+
+
+async def get_namespace_metrics() -> dict[str, dict[str, int]]:
+    """Get the cache counters of every worker per namespace."""
+    return await namespace_metrics.get_all()
+
+
+# Deletes every key registered under the given tag sets, their rendered responses and the sets themselves.
+# Returns the deleted keys and every registered key, expired ones included.
+INVALIDATE_TAGS_SCRIPT = """
+local removed = {}
+local registered = {}
+for _, tag in ipairs(KEYS) do
+    local members = redis.call('SMEMBERS', tag)
+    for _, key in ipairs(members) do
+        if redis.call('DEL', key) == 1 then
+            table.insert(removed, key)
+        end
+        redis.call('DEL', key .. ARGV[1])
+        table.insert(registered, key)
+    end
+    redis.call('DEL', tag)
+end
+return {removed, registered}
+"""
+_invalidate_tags = redis.register_script(INVALIDATE_TAGS_SCRIPT)
+
+# Stores a rendered response until its cache entry expires or, with a stale TTL in ARGV[2], turns stale,
+# so a response never outlives an invalidation of the entry. Returns the TTL given to the response.
+STORE_RESPONSE_SCRIPT = """
+local ttl = redis.call('TTL', KEYS[1]) - tonumber(ARGV[2])
+if ttl <= 0 then
+    return 0
+end
+redis.call('SET', KEYS[2], ARGV[1], 'EX', ttl)
+return ttl
+"""
+_store_response = redis.register_script(STORE_RESPONSE_SCRIPT)
+
+# Deletes a lock if it is still held with the given token
+RELEASE_LOCK_SCRIPT = """
+if redis.call('GET', KEYS[1]) == ARGV[1] then
+    return redis.call('DEL', KEYS[1])
+end
+return 0
+"""
+_release_lock = redis.register_script(RELEASE_LOCK_SCRIPT)
+
+
+class SingleFlight:
+    """Runs one computation per key at a time in the worker.
+
+    Callers of a key being computed await the running computation and get
+    its result or its exception. If the computation is cancelled together
+    with its request, one of the waiting callers takes it over.
+    """
+
+    def __init__(self):
+        self._calls: dict[str, asyncio.Future] = {}
+
+    async def run(self, key: str, func: Callable[[], Awaitable[T]]) -> T:
+        while (call := self._calls.get(key)) is not None:
+            metrics.incr('cache.coalesced')
+            try:
+                return await asyncio.shield(call)
+            except asyncio.CancelledError:
+                if not call.cancelled():
+                    raise
+
+        call = asyncio.get_running_loop().create_future()
+        self._calls[key] = call
+        try:
+            result = await func()
+        except asyncio.CancelledError:
+            call.cancel()
+            raise
+        except Exception as exc:
+            call.set_exception(exc)
+            # mark the exception retrieved, the call may have no waiters
+            call.exception()
+            raise
+        else:
+            call.set_result(result)
+            return result
+        finally:
+            del self._calls[key]
+
+
+single_flight = SingleFlight()
+
+
+async def _wait_for_entry(key: str) -> Optional[EncodedValue]:
+    """Poll Redis for an entry computed by another worker for ``CACHE_LOCK_WAIT`` seconds."""
+    loop = asyncio.get_running_loop()
+    deadline = loop.time() + cache_settings.CACHE_LOCK_WAIT
+
+    while loop.time() < deadline:
+        metrics.incr('cache.lock_wait')
+        await asyncio.sleep(cache_settings.CACHE_LOCK_POLL_INTERVAL)
+        with metrics.timer('cache.redis.get'):
+            value = await cache_redis.get(key)
+        if value is not None:
+            return value
+    return None
+
+
+async def _lock_entry(key: str) -> Optional[str]:
+    """Take the computation lock of a cache entry.
+
+    :return: The lock token, or None if another worker holds the lock.
+    """
+    token = uuid.uuid4().hex
+    with metrics.timer('cache.redis.lock'):
+        locked = await redis.set(key + LOCK_KEY_SUFFIX, token, nx=True, px=int(cache_settings.CACHE_LOCK_TTL * 1000))
+    return token if locked else None
+
+
+async def _unlock_entry(key: str, token: str) -> None:
+    with suppress(RedisError), metrics.timer('cache.redis.unlock'):
+        await _release_lock(keys=[key + LOCK_KEY_SUFFIX], args=[token])
+
+
+async def compute_entry(key: str, func: Callable[[], Awaitable[EncodedValue]]) -> EncodedValue:
+    """Compute a missing cache entry in one worker at a time.
+
+    The worker taking the lock of the key runs ``func``, the others wait for
+    the entry to appear in Redis and run ``func`` themselves only if it
+    doesn't in time. Redis failures fall back to running ``func``.
+
+    :param key: The cache key.
+    :param func: Computes, stores and returns the encoded entry.
+    :return: The encoded entry.
+    """
+    try:
+        token = await _lock_entry(key)
+        if token is None and (value := await _wait_for_entry(key)) is not None:
+            return value
+    except RedisError as exc:
+        logger.warning(f'Cache lock failed: {exc}')
+        token = None
+
+    try:
+        return await func()
+    finally:
+        if token:
+            await _unlock_entry(key, token)
+
+
+async def refresh_entry(key: str, func: Callable[[], Awaitable[EncodedValue]], stale_ttl: int) -> None:
+    """Recompute a stale cache entry, unless another worker is refreshing it or already did.
+
+    Failures (e.g. database timeouts) are only logged, the stale entry keeps
+    being served until it expires.
+
+    :param key: The cache key.
+    :param func: Computes and stores the encoded entry.
+    :param stale_ttl: The TTL left to the entry when it turns stale.
+    """
+    try:
+        token = await _lock_entry(key)
+        if token is None:
+            return
+    except RedisError as exc:
+        logger.warning(f'Cache lock failed: {exc}')
+        return
+
+    try:
+        with metrics.timer('cache.redis.ttl'):
+            ttl = await redis.ttl(key)
+        if ttl > stale_ttl:
+            # another worker refreshed the entry, drop the stale copy of this one
+            backend = FastAPICache.get_backend()
+            if isinstance(backend, TieredRedisBackend):
+                backend.drop_local([key])
+            return
+        await func()
+        metrics.incr('cache.refresh')
+    except Exception:
+        logger.warning(f'Cache refresh of {key} failed', exc_info=True)
+        metrics.incr('cache.refresh_failed')
+    finally:
+        await _unlock_entry(key, token)
+
+
+def _get_entry_expire(expire: int, stale_ttl: int) -> int:
+    """Get the lifetime of the entry being computed, shortened so that it
+    turns stale at the earliest deadline set by ``KeyBuilderCache.expire_entry_at``."""
+    deadlines = _entry_deadlines.get()
+    if not deadlines:
+        return expire
+    fresh_for = max(math.ceil(min(deadlines) - time.time()), 1)
+    return min(expire, fresh_for + stale_ttl)
+
+
+def _inject_params(signature: inspect.Signature) -> tuple[inspect.Signature, dict[type, str], set[str]]:
+    """Add the parameters of ``INJECTED_PARAMS`` an endpoint doesn't declare to its signature.
+
+    :return: The new signature, the parameter names by annotation and the names of the added parameters.
+    """
+    parameters = [param for param in signature.parameters.values() if param.kind != param.VAR_KEYWORD]
+    variadic = [param for param in signature.parameters.values() if param.kind == param.VAR_KEYWORD]
+
+    injected_names = {}
+    extra_params = []
+    for annotation, name in INJECTED_PARAMS:
+        param = next((param for param in parameters if param.annotation is annotation), None)
+        if param is None:
+            param = inspect.Parameter(name, inspect.Parameter.KEYWORD_ONLY, annotation=annotation)
+            extra_params.append(param)
+        injected_names[annotation] = param.name
+
+    signature = signature.replace(parameters=[*parameters, *extra_params, *variadic])
+    return signature, injected_names, {param.name for param in extra_params}
+
+
+def _is_cacheable(request: Optional[Request]) -> bool:
+    if not FastAPICache.get_enable():
+        return False
+    if request is None:
+        return True
+    return request.method == 'GET' and request.headers.get('Cache-Control') not in ('no-store', 'no-cache')
+
+
+def _set_cache_headers(
+        request: Optional[Request], response: Response, value: EncodedValue, max_age: int, stale: bool,
+) -> bool:
+    """Set the caching headers of a response built from a cache entry.
+
+    :return: Whether the client has the entry already, the response is a 304 then.
+    """
+    if stale:
+        # keeps ResponseCacheMiddleware from storing the stale response
+        response.headers[STALE_HEADER] = '1'
+    response.headers['Cache-Control'] = f'max-age={max_age}'
+    etag = f'W/{hash(value)}'
+    if request and request.headers.get('if-none-match') == etag:
+        response.status_code = 304
+        return True
+    response.headers['ETag'] = etag
+    return False
+
+
+def cache(
+        expire: Optional[int] = None, namespace: str = '', stale_after: Optional[int] = None,
+) -> Callable[[Callable], Callable]:
+    """Cache the results of an endpoint in the ``FastAPICache`` backend.
+
+    Works like ``fastapi_cache.decorator.cache``, but misses are computed
+    once: concurrent misses of a key in a worker share one computation (see
+    ``SingleFlight``), and across workers a short Redis lock lets one worker
+    compute the entry while the others wait for it (see ``compute_entry``).
+    The endpoint is also marked for ``ResponseCacheMiddleware``.
+
+    With ``stale_after`` an entry older than that is still returned at once,
+    and refreshed in the background after the response is sent. ``expire``
+    then bounds how stale a returned entry can get.
+
+    :param expire: The entry lifetime in seconds, ``FastAPICache`` expire by default.
+    :param namespace: The namespace of the entry keys, prefixed with the ``FastAPICache`` prefix.
+    :param stale_after: The entry age in seconds after which it is refreshed in the background.
+    """
+    if stale_after is not None and (expire is None or stale_after >= expire):
+        raise ValueError('stale_after must be shorter than expire')
+    # TTL left to an entry when it turns stale
+    stale_ttl = expire - stale_after if stale_after is not None else 0
+
+    def wrapper(func: Callable) -> Callable:
+        signature, injected_names, added_names = _inject_params(inspect.signature(func))
+
+        @wraps(func)
+        async def inner(*args, **kwargs):
+            request: Optional[Request] = kwargs.get(injected_names[Request])
+            response: Optional[Response] = kwargs.get(injected_names[Response])
+            background_tasks: Optional[BackgroundTasks] = kwargs.get(injected_names[BackgroundTasks])
+            key_kwargs = {name: value for name, value in kwargs.items() if name not in injected_names.values()}
+            kwargs = {name: value for name, value in kwargs.items() if name not in added_names}
+
+            if not _is_cacheable(request):
+                return await func(*args, **kwargs)
+
+            coder = FastAPICache.get_coder()
+            backend: Backend = FastAPICache.get_backend()
+            entry_expire = expire or FastAPICache.get_expire()
+            key = FastAPICache.get_key_builder()(
+                func, f'{FastAPICache.get_prefix()}:{namespace}',
+                request=request, response=response, args=args, kwargs=key_kwargs,
+            )
+
+            try:
+                ttl, value = await backend.get_with_ttl(key)
+            except Exception:
+                logger.warning(f'Cache lookup of {key} failed', exc_info=True)
+                ttl, value = 0, None
+
+            async def compute() -> EncodedValue:
+                encoded = coder.encode(await func(*args, **kwargs))
+                try:
+                    await backend.set(key, encoded, _get_entry_expire(entry_expire, stale_ttl))
+                except Exception:
+                    logger.warning(f'Cache store of {key} failed', exc_info=True)
+                else:
+                    incr_namespace(namespace, 'set')
+                return encoded
+
+            stale = value is not None and 0 <= ttl <= stale_ttl and background_tasks is not None
+            if value is None:
+                incr_namespace(namespace, 'miss')
+                value = await single_flight.run(key, lambda: compute_entry(key, compute))
+                ttl = _get_entry_expire(entry_expire, stale_ttl)
+            else:
+                incr_namespace(namespace, 'hit')
+            if stale:
+                metrics.incr('cache.stale_hit')
+                incr_namespace(namespace, 'stale_hit')
+                background_tasks.add_task(refresh_entry, key, compute, stale_ttl)
+
+            if response is not None and _set_cache_headers(request, response, value, max(ttl - stale_ttl, 0), stale):
+                return response
+            return coder.decode(value)
+
+        inner.__signature__ = signature
+        inner.__cache_namespace__ = namespace
+        inner.__cache_stale_ttl__ = stale_ttl
+        return inner
+
+    return wrapper
+
+
+class OrjsonCoder(Coder):
+    """Encodes cache entries as orjson bytes, zlib compressed from ``compress_min_size`` bytes.
+
+    The first byte of an entry tells whether the rest is compressed. The
+    ``version`` is a part of the cache keys (see ``KeyBuilderCache.build_key``),
+    so workers using different encodings during a rollout never read each
+    other's entries.
+    """
+
+    version = 'oj1'
+    compress_min_size: Optional[int] = cache_settings.CACHE_COMPRESS_MIN_SIZE
+    compress_level = cache_settings.CACHE_COMPRESS_LEVEL
+
+    RAW = b'\x00'
+    ZLIB = b'\x01'
+
+    @classmethod
+    def encode(cls, value: Any) -> bytes:
+        data = orjson.dumps(value, default=jsonable_encoder)
+        if cls.compress_min_size is not None and len(data) >= cls.compress_min_size:
+            return cls.ZLIB + zlib.compress(data, cls.compress_level)
+        return cls.RAW + data
+
+    @classmethod
+    def decode(cls, value: bytes) -> Any:
+        flag, data = value[:1], value[1:]
+        if flag == cls.ZLIB:
+            data = zlib.decompress(data)
+        elif flag != cls.RAW:
+            raise ValueError(f'Unknown cache entry encoding {flag!r}')
+        return orjson.loads(data)
+
+
+CODERS: dict[str, type[Coder]] = {
+    'json': JsonCoder,
+    'orjson': OrjsonCoder,
+}
+
+
+class CacheTag:
+
+    @staticmethod
+    def hotel(hotel_id: int) -> str:
+        return f'hotel:{hotel_id}'
+
+    @staticmethod
+    def room(room_id: int) -> str:
+        return f'room:{room_id}'
+
+    @staticmethod
+    def namespace(namespace: str) -> str:
+        return f'namespace:{namespace}'
+
+    @staticmethod
+    def get_tag_key(tag: str) -> str:
+        return f'{FastAPICache.get_prefix()}:tag:{tag}'
+
+
+# Request parameters which bind a cache entry to a hotel or a room
+TAGGED_PARAMS: dict[str, Callable[[int], str]] = {
+    'hotel_id': CacheTag.hotel,
+    'room_id': CacheTag.room,
+}
+
+
+class TaggedRedisBackend(RedisBackend):
+    """Redis backend which registers every stored key under the tags of its
+    entry, so the key can be invalidated without scanning the keyspace.
+    The latency of the Redis calls is observed in the ``cache.redis.*`` histograms."""
+
+    async def get_with_ttl(self, key: str) -> tuple[int, Optional[EncodedValue]]:
+        with metrics.timer('cache.redis.get'):
+            return await super().get_with_ttl(key)
+
+    async def set(self, key: str, value: EncodedValue, expire: Optional[int] = None) -> None:  # noqa: A003
+        tags = _entry_tags.get() or set()
+
+        async with self.redis.pipeline(transaction=not self.is_cluster) as pipe:
+            pipe.set(key, value, ex=expire)
+            for tag in tags:
+                tag_key = CacheTag.get_tag_key(tag)
+                pipe.sadd(tag_key, key)
+                if expire:
+                    # the tag set must outlive the longest living key in it
+                    pipe.expire(tag_key, expire, nx=True)
+                    pipe.expire(tag_key, expire, gt=True)
+            with metrics.timer('cache.redis.set'):
+                await pipe.execute()
+
+
+class TieredRedisBackend(TaggedRedisBackend):
+    """Tagged Redis backend (L2) behind a per-worker LRU (L1).
+
+    Entries read from or written to Redis are copied into the worker memory
+    for ``local_ttl`` seconds at most and never past their Redis expiry.
+    Invalidations publish the deleted keys to ``channel`` and every
+    subscribed worker drops its copies of them. Copies are kept only while
+    the worker is subscribed, and the LRU is cleared on every subscription,
+    so invalidations published while the channel was down are never missed.
+    """
+
+    def __init__(self, redis_client: aioredis.Redis, local_size: int, local_ttl: int, channel: str):
+        super().__init__(redis_client)
+        self.channel = channel
+        # key -> (expiry time of the Redis entry, value)
+        self.local: TTLCache[str, tuple[float, EncodedValue]] = TTLCache(maxsize=local_size, ttl=local_ttl)
+        self.subscribed = False
+        # bumped by every invalidation, so a value read from Redis before an
+        # invalidation was received is not copied after it
+        self.generation = 0
+        self._listener: Optional[asyncio.Task] = None
+
+    def set_local(self, key: str, value: EncodedValue, ttl: int, generation: Optional[int] = None) -> None:
+        """Copy an entry with ``ttl`` seconds left in Redis into the worker memory.
+
+        :param generation: ``generation`` seen before the value was read from
+            Redis, the value is not copied if an invalidation came since.
+        """
+        if not self.subscribed or ttl <= 0 or generation not in (None, self.generation):
+            return
+        self.local.set(key, (self.local.timer() + ttl, value), ttl=min(ttl, self.local.ttl))
+
+    def drop_local(self, keys: list[str] | str) -> None:
+        """Drop the copies of the keys and of their rendered responses, ``'*'`` drops every copy."""
+        self.generation += 1
+        if keys == '*':
+            self.local.clear()
+            return
+        for key in keys:
+            self.local.pop(key)
+            self.local.pop(key + RESPONSE_KEY_SUFFIX)
+
+    async def invalidate_local(self, keys: list[str] | str) -> None:
+        """Drop the copies of the keys in this worker and tell the other workers to drop theirs."""
+        self.drop_local(keys)
+        try:
+            await self.redis.publish(self.channel, json.dumps(keys))
+        except RedisError as exc:
+            logger.warning(f'Cache invalidation publish failed: {exc}')
+
+    async def get_with_ttl(self, key: str) -> tuple[int, Optional[EncodedValue]]:
+        if self.subscribed:
+            item = self.local.get(key)
+            if item is not None:
+                metrics.incr('cache.l1_hit')
+                expires, value = item
+                return int(expires - self.local.timer()), value
+
+        generation = self.generation
+        ttl, value = await super().get_with_ttl(key)
+        if value is None:
+            metrics.incr('cache.miss')
+        else:
+            metrics.incr('cache.l2_hit')
+            self.set_local(key, value, ttl, generation)
+        return ttl, value
+
+    async def get(self, key: str) -> Optional[EncodedValue]:
+        _, value = await self.get_with_ttl(key)
+        return value
+
+    async def set(self, key: str, value: EncodedValue, expire: Optional[int] = None) -> None:  # noqa: A003
+        await super().set(key, value, expire)
+        self.set_local(key, value, expire or self.local.ttl)
+
+    async def clear(self, namespace: Optional[str] = None, key: Optional[str] = None) -> int:
+        result = await super().clear(namespace, key)
+        if namespace or key:
+            await self.invalidate_local('*' if namespace else [key])
+        return result
+
+    async def start(self) -> None:
+        """Start listening to the invalidations of the other workers."""
+        if self._listener is None:
+            self._listener = asyncio.create_task(self._listen())
+
+    async def stop(self) -> None:
+        if self._listener is not None:
+            self._listener.cancel()
+            with suppress(asyncio.CancelledError):
+                await self._listener
+            self._listener = None
+        self.subscribed = False
+        self.local.clear()
+
+    async def _listen(self) -> None:
+        while True:
+            try:
+                async with self.redis.pubsub() as pubsub:
+                    await pubsub.subscribe(self.channel)
+                    async for message in pubsub.listen():
+                        if message['type'] == 'subscribe':
+                            self.local.clear()
+                            self.subscribed = True
+                        elif message['type'] == 'message':
+                            self.drop_local(json.loads(message['data']))
+            except RedisError as exc:
+                logger.warning(f'Cache invalidation listener failed: {exc}')
+            finally:
+                self.subscribed = False
+            await asyncio.sleep(INVALIDATION_RETRY_DELAY)
 
 
 class KeyBuilderCache:
 
+    @classmethod
+    def normalize_param(cls, value: Any) -> Any:
+        """Bring a request parameter to its canonical form.
+
+        Strings are stripped and lower-cased, dates are rendered in ISO format
+        and enums are replaced with their values.
+        """
+        if isinstance(value, Enum):
+            value = value.value
+        if isinstance(value, str):
+            return value.strip().lower()
+        if isinstance(value, datetime.date):
+            return value.isoformat()
+        if isinstance(value, (list, tuple, set)):
+            return [cls.normalize_param(item) for item in value]
+        return value
+
     @staticmethod
+    def _is_key_param(value: Any) -> bool:
+        if value is None or isinstance(value, KEY_PARAM_TYPES):
+            return True
+        if isinstance(value, (list, tuple, set)):
+            return all(item is None or isinstance(item, KEY_PARAM_TYPES) for item in value)
+        return False
+
+    @classmethod
+    def canonical_params(cls, kwargs: dict[str, Any]) -> dict[str, Any]:
+        """Collect the path and query parameters the cached value depends on.
+
+        Parameter models declared with ``Depends()`` (e.g. ``DateRangeModel``)
+        are flattened into their fields. Every other injected dependency
+        (services, sessions, users) is left out of the key.
+
+        :param kwargs: The keyword arguments the endpoint was called with.
+        :return: Normalized parameters sorted by name.
+        """
+        params = {}
+        for name, value in kwargs.items():
+            if isinstance(value, BaseModel):
+                params.update(value.model_dump())
+            elif cls._is_key_param(value):
+                params[name] = value
+
+        return {name: cls.normalize_param(params[name]) for name in sorted(params)}
+
+    @classmethod
     def key_builder(
+            cls,
             func: Callable,
             namespace: Optional[str] = '',
-            request: Request = None,
-            response: Response = None,
-            *args: Any, **kwargs,
+            *,
+            request: Optional[Request] = None,
+            response: Optional[Response] = None,
+            args: tuple = (),
+            kwargs: Optional[dict[str, Any]] = None,
     ) -> str:
         """Build a cache key for the given function.
 
+        FastAPI always calls endpoints with keyword arguments, so the key is
+        built from ``kwargs`` only. The raw request url is not used: it holds
+        undeclared query parameters and unnormalized values, which would
+        split identical requests between several keys.
+
         :param func: The function to build a cache key for.
-        :param namespace: The namespace to use for the cache key.
+        :param namespace: The namespace to use for the cache key, already prefixed by fastapi-cache.
         :param request: The current request.
         :param response: The current response.
         :param args: The positional arguments to pass to the function.
         :param kwargs: The keyword arguments to pass to the function.
         :return: The cache key.
         """
-        prefix = FastAPICache.get_prefix()
+        params = cls.canonical_params(kwargs or {})
+        key = cls.build_key(func, namespace, params)
 
-        key = f'{prefix}:{namespace}:{func.__module__}:{func.__name__}'
+        _entry_tags.set(cls.get_param_tags(namespace, params))
+        _entry_deadlines.set([])
 
-        if args_str := (str(args) + str(kwargs)):
-            args_hash = hashlib.sha256(args_str.encode('utf-8')).hexdigest()
-            key += f':{args_hash}'
+        logger.debug(f'key_builder: {key}')
+        return key
 
-        request_str = ''
+    @staticmethod
+    def build_key(func: Callable, namespace: str, params: dict[str, Any]) -> str:
+        """Build a cache key from already canonical parameters.
 
-        if request:
-            request_str += f':{request.method}:{request.url}'
-        if response:
-            request_str += f':{response.status_code}'
-        if request_str:
-            request_hash = hashlib.sha256(request_str.encode('utf-8')).hexdigest()
-            key += f':{request_hash}'
+        :param func: The cached function.
+        :param namespace: The prefixed namespace of the cache entry.
+        :param params: The parameters returned by ``canonical_params``.
+        """
+        key = f'{namespace}:{func.__module__}:{func.__name__}'
+        # entries of another encoding are kept under other keys (no coder before FastAPICache.init)
+        version = getattr(FastAPICache._coder, 'version', None)
+        if version:
+            key += f':{version}'
 
-        logger.debug(f'key_builder: {key}')
+        if params:
+            params_str = json.dumps(params, sort_keys=True, ensure_ascii=False, separators=(',', ':'))
+            params_hash = hashlib.sha256(params_str.encode('utf-8')).hexdigest()
+            key += f':{params_hash}'
         return key
 
     @staticmethod
+    def get_response_key(key: str) -> str:
+        return key + RESPONSE_KEY_SUFFIX
+
+    @classmethod
+    async def store_response(cls, key: str, value: bytes, stale_ttl: int = 0) -> bool:
+        """Store the rendered response of the cache entry ``key`` if the entry still exists.
+
+        :param stale_ttl: The TTL left to the entry when it turns stale, the
+            response is not served past that.
+        """
+        backend = FastAPICache.get_backend()
+        generation = getattr(backend, 'generation', None)
+        response_key = cls.get_response_key(key)
+
+        with metrics.timer('cache.redis.store_response'):
+            ttl = await _store_response(keys=[key, response_key], args=[value, stale_ttl])
+        if ttl and isinstance(backend, TieredRedisBackend):
+            backend.set_local(response_key, value, ttl, generation)
+        return bool(ttl)
+
+    @staticmethod
+    def get_param_tags(namespace: str, params: dict[str, Any]) -> set[str]:
+        """Get the tags a cache entry gets from its namespace and parameters."""
+        tags = {CacheTag.namespace(namespace)}
+
+        for name, tag in TAGGED_PARAMS.items():
+            if params.get(name) is not None:
+                tags.add(tag(params[name]))
+        return tags
+
+    @staticmethod
+    def tag_entry(*tags: str) -> None:
+        """Register additional tags for the cache entry of the current request.
+
+        Used by endpoints whose result depends on objects not present in the
+        request parameters, e.g. hotels found by a search query.
+        """
+        entry_tags = _entry_tags.get()
+        if entry_tags is not None:
+            entry_tags.update(tags)
+
+    @staticmethod
+    def expire_entry_at(timestamp: float) -> None:
+        """Make the cache entry of the current request turn stale at ``timestamp`` (unix time) at the latest.
+
+        Used by endpoints whose result depends on state expiring by itself,
+        e.g. room holds, which is not invalidated when it expires.
+        """
+        deadlines = _entry_deadlines.get()
+        if deadlines is not None:
+            deadlines.append(timestamp)
+
+    @staticmethod
+    def get_namespace(key: str) -> str:
+        """Get the (unprefixed) namespace of a key built by ``build_key``."""
+        return key[len(FastAPICache.get_prefix()) + 1:].split(':', 1)[0]
+
+    @classmethod
+    async def invalidate_tags(cls, *tags: str) -> int:
+        """Delete every cache entry registered under any of the given tags.
+
+        Every namespace with entries registered under the tags counts an
+        invalidation, and the entries still alive in Redis as removed keys.
+
+        :param tags: The tags to invalidate.
+        :return: The number of deleted entries.
+        """
+        if not tags:
+            return 0
+
+        tag_keys = [CacheTag.get_tag_key(tag) for tag in tags]
+        with metrics.timer('cache.redis.invalidate'):
+            removed, keys = await _invalidate_tags(keys=tag_keys, args=[RESPONSE_KEY_SUFFIX])
+
+        backend = FastAPICache.get_backend()
+        if keys and isinstance(backend, TieredRedisBackend):
+            await backend.invalidate_local(keys)
+
+        for namespace in {cls.get_namespace(key) for key in keys}:
+            incr_namespace(namespace, 'invalidation')
+        for key in removed:
+            incr_namespace(cls.get_namespace(key), 'keys_removed')
+
+        logger.debug(f'invalidate_tags: {tags}, cleared caches: {len(removed)}')
+        return len(removed)
+
+    @classmethod
+    async def clear_cache_for_room(cls, room_id: int, hotel_id: int) -> int:
+        """Clear the cache entries affected by bookings of the given room.
+
+        :param room_id: The booked room id.
+        :param hotel_id: The id of the hotel the room belongs to.
+        """
+        return await cls.invalidate_tags(CacheTag.room(room_id), CacheTag.hotel(hotel_id))
+
+    @classmethod
     async def clear_cache_for_func(
-            func: Callable | str,
-    ):
+            cls, func: Callable | str,
+    ) -> int:
         """Clear the cache for the given function.
 
         :param func: The function to clear the cache for.
@@ -65,10 +886,4 @@ class KeyBuilderCache:
         func_name = func.__name__ if callable(func) else func
 
         prefix = FastAPICache.get_prefix()
-        pattern = f'{prefix}:clearable-{func_name}:*'
-        logger.debug(f'clear_cache_for_func: {pattern}')
-        keys = await redis.keys(pattern)
-        result = 0
-        if keys:
-            result = await redis.delete(*keys)
-        logger.debug(f'cleared caches: {result}')
+        return await cls.invalidate_tags(CacheTag.namespace(f'{prefix}:clearable-{func_name}'))
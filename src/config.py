@@ -44,6 +44,9 @@ class DatabaseSettings(BaseSettings):
     POSTGRES_HOST: str
     POSTGRES_PORT: int
     POSTGRES_DB: str
+    # replays of a Transaction.run unit of work after a serialization failure or a deadlock
+    TRANSACTION_MAX_RETRIES: int = 3
+    TRANSACTION_RETRY_DELAY: float = 0.02
 
     @property
     def DATABASE_URL(self) -> str:  # noqa
@@ -112,10 +115,63 @@ class SMTPSettings(BaseSettings):
     model_config = _base_env_config.copy()
 
 
+class AvailabilitySettings(BaseSettings):
+    AVAILABILITY_ENGINE_ENABLED: bool = False  # requires numpy
+    AVAILABILITY_HORIZON_DAYS: int = 365
+    AVAILABILITY_RESYNC_SECONDS: int = 60
+    # booking changes are published to every worker on this channel
+    AVAILABILITY_CHANNEL: str = 'availability-deltas'
+
+    model_config = _base_env_config.copy()
+
+
+class CacheSettings(BaseSettings):
+    # per-worker copies of the Redis cache entries, kept coherent via pub/sub
+    CACHE_LOCAL_ENABLED: bool = True
+    CACHE_LOCAL_SIZE: int = 1024
+    # bounds how long a copy may outlive a lost invalidation message
+    CACHE_LOCAL_TTL: int = 30
+    CACHE_INVALIDATION_CHANNEL: str = 'cache-invalidation'
+    # lock letting one worker compute a missing entry, must outlive the slowest computation
+    CACHE_LOCK_TTL: float = 5.0
+    # how long the other workers wait for the entry before computing it themselves
+    CACHE_LOCK_WAIT: float = 2.0
+    CACHE_LOCK_POLL_INTERVAL: float = 0.05
+    CACHE_CODER: Literal['json', 'orjson'] = 'orjson'
+    # entries from this size are compressed by the orjson coder
+    CACHE_COMPRESS_MIN_SIZE: int = 1024
+    CACHE_COMPRESS_LEVEL: int = 6
+    # how often a worker adds its cache counters to the totals in Redis
+    CACHE_METRICS_FLUSH_INTERVAL: float = 5.0
+
+    model_config = _base_env_config.copy()
+
+
+class IdempotencySettings(BaseSettings):
+    IDEMPOTENCY_TTL: int = 60 * 60 * 24
+    # lifetime of the in-flight marker, must outlive the slowest request
+    IDEMPOTENCY_LOCK_TTL: int = 30
+    IDEMPOTENCY_WAIT_TIMEOUT: float = 10.0
+    IDEMPOTENCY_POLL_INTERVAL: float = 0.05
+
+    model_config = _base_env_config.copy()
+
+
+class BookingHoldSettings(BaseSettings):
+    BOOKING_HOLD_TTL: int = 60 * 10
+    BOOKING_HOLD_MAX_UNITS: int = 5
+
+    model_config = _base_env_config.copy()
+
+
 db_settings = DatabaseSettings()
 redis_settings = RedisSettings()
 mongo_settings = MongoSettings()
 google_smtp_settings = SMTPSettings()
+availability_settings = AvailabilitySettings()
+cache_settings = CacheSettings()
+idempotency_settings = IdempotencySettings()
+booking_hold_settings = BookingHoldSettings()
 
 CORS_ALLOW_ORIGINS = [
     'http://127.0.0.1:8000',
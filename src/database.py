@@ -1,13 +1,14 @@
 import logging
 from contextlib import asynccontextmanager
-from typing import AsyncGenerator, Literal
+from typing import AsyncGenerator, Literal, Optional
 
+from motor.motor_asyncio import AsyncIOMotorClient, AsyncIOMotorDatabase
 from sqlalchemy import MetaData
 from sqlalchemy.event import listens_for
 from sqlalchemy.ext.asyncio import AsyncSession, create_async_engine
 from sqlalchemy.orm import DeclarativeMeta, declarative_base, sessionmaker
 
-from src.config import app_settings, db_settings
+from src.config import app_settings, db_settings, mongo_settings
 
 DEFAULT_ISOLATION_LEVEL: Literal['READ COMMITTED', 'REPEATABLE READ', 'SERIALIZABLE'] = 'READ COMMITTED'
 
@@ -34,6 +35,32 @@ async def context_db_session() -> AsyncSession:
     await session.close()
 
 
+_mongo_client: Optional[AsyncIOMotorClient] = None
+
+
+def get_mongo_client() -> AsyncIOMotorClient:
+    """Get the app-lifetime Mongo client, creating it on first use.
+
+    The client holds its own connection pool and monitor threads and is
+    safe to share, so it must never be created per request.
+    """
+    global _mongo_client
+    if _mongo_client is None:
+        _mongo_client = AsyncIOMotorClient(**mongo_settings.MONGODB_AUTHPARAMS)
+    return _mongo_client
+
+
+def get_mongo_database() -> AsyncIOMotorDatabase:
+    return get_mongo_client().get_database(mongo_settings.MONGODB_DB)
+
+
+def close_mongo_client() -> None:
+    global _mongo_client
+    if _mongo_client is not None:
+        _mongo_client.close()
+        _mongo_client = None
+
+
 @listens_for(engine.sync_engine, 'before_cursor_execute', named=True)
 def log_query(
         conn, cursor, statement, parameters, context, executemany,
@@ -0,0 +1,324 @@
+import asyncio
+import datetime
+import logging
+from collections.abc import Iterable
+from contextlib import suppress
+from typing import Optional
+
+from redis import asyncio as aioredis
+from redis.exceptions import RedisError
+from sqlalchemy import select
+
+from src.base.utils import get_utcnow
+from src.bookings.models import Booking
+from src.bookings.repositories import BookingRepository
+from src.cache import redis
+from src.config import availability_settings
+from src.database import context_db_session
+from src.hotels.models import Room
+
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+logger = logging.getLogger('all')
+
+# Number of the last booking change published to the workers
+SEQUENCE_KEY = 'availability:seq'
+
+# Numbers a booking change and publishes it as "<number>:<change>" in one step,
+# so every subscriber receives the changes in the order of their numbers.
+PUBLISH_DELTA_SCRIPT = """
+local seq = redis.call('INCR', KEYS[1])
+redis.call('PUBLISH', ARGV[1], seq .. ':' .. ARGV[2])
+return seq
+"""
+
+# Seconds to wait for the subscription before the first load
+SUBSCRIBE_TIMEOUT = 5
+
+# Seconds to wait before subscribing again after the channel failed
+RESUBSCRIBE_DELAY = 1
+
+
+class AvailabilityEngine:
+    """Per-worker matrix of booked units per room and night.
+
+    Rows are rooms, columns are the nights of a rolling horizon starting at
+    ``start``. Room listings and hotel search read ``rooms_left`` from it
+    instead of aggregating bookings in Postgres.
+
+    The listings are cached in Redis for every worker, so the matrix is only
+    used while it holds every booking change. Changes are numbered and
+    published to all workers (see ``publish``) before the listings are
+    invalidated, and a worker whose matrix misses a published change reads
+    Postgres instead (see ``is_current``). Changes received while the matrix
+    is loaded are applied on top of it, the ids of the counted bookings keep
+    them from being counted twice. Booking creation itself keeps checking
+    availability in Postgres, so a stale matrix can't cause an overbooking.
+    """
+
+    def __init__(self, redis_client: aioredis.Redis, horizon_days: int, channel: str):
+        self.redis = redis_client
+        self.horizon_days = horizon_days
+        self.channel = channel
+        self.start: Optional[datetime.date] = None
+        self.room_index: dict[int, int] = {}
+        self.hotel_ids = None
+        self.booked = None
+        # number of the last applied change and the bookings counted in the matrix
+        self.seq = 0
+        self.booking_ids: set[int] = set()
+        # changes received while the matrix is loaded
+        self._pending: Optional[list[tuple[int, str]]] = None
+        self._subscribed = asyncio.Event()
+        self._reload = asyncio.Event()
+        self._publish_delta = redis_client.register_script(PUBLISH_DELTA_SCRIPT)
+        self._listener: Optional[asyncio.Task] = None
+        self._resync_task: Optional[asyncio.Task] = None
+
+    @property
+    def loaded(self) -> bool:
+        return self.booked is not None
+
+    @property
+    def subscribed(self) -> bool:
+        return self._subscribed.is_set()
+
+    async def load(self) -> None:
+        """Build the matrix from the bookings overlapping the horizon."""
+        start = get_utcnow().date()
+        end = start + datetime.timedelta(days=self.horizon_days)
+
+        # every change numbered after the sequence read may be missing from the bookings read next
+        self._pending = []
+        try:
+            seq = int(await self.redis.get(SEQUENCE_KEY) or 0)
+            async with context_db_session() as session:
+                rooms = (await session.execute(select(Room.id, Room.hotel_id).order_by(Room.id))).all()
+                bookings = (await session.execute(
+                    select(Booking.id, Booking.room_id, Booking.date_from, Booking.date_to).where(
+                        BookingRepository.get_booked_rooms_clause(start, end),
+                    ),
+                )).all()
+        except BaseException:
+            self._pending = None
+            raise
+
+        room_index = {room.id: row for row, room in enumerate(rooms)}
+        bookings = [booking for booking in bookings if booking.room_id in room_index]
+
+        # +1 on the first night of a booking, -1 on the night after the last one
+        changes = np.zeros((len(rooms), self.horizon_days + 1), dtype=np.int32)
+        if bookings:
+            rows = np.array([room_index[booking.room_id] for booking in bookings], dtype=np.intp)
+            first = np.array([(booking.date_from - start).days for booking in bookings], dtype=np.intp)
+            last = np.array([(booking.date_to - start).days for booking in bookings], dtype=np.intp)
+            np.add.at(changes, (rows, first.clip(0, self.horizon_days)), 1)
+            np.add.at(changes, (rows, last.clip(0, self.horizon_days)), -1)
+
+        booked = np.cumsum(changes[:, :-1], axis=1, dtype=np.int32)
+        hotel_ids = np.array([room.hotel_id for room in rooms], dtype=np.int64)
+
+        self.start, self.room_index, self.hotel_ids, self.booked = start, room_index, hotel_ids, booked
+        self.seq, self.booking_ids = seq, {booking.id for booking in bookings}
+        pending, self._pending = self._pending, None
+        for delta_seq, delta in pending:
+            self._apply(delta_seq, delta)
+        logger.info(f'Availability engine loaded: {len(rooms)} rooms, {len(bookings)} bookings')
+
+    def covers(self, date_from: datetime.date, date_to: datetime.date) -> bool:
+        """Check the range lies within the loaded horizon."""
+        if not self.loaded or date_from >= date_to:
+            return False
+        return self.start <= date_from and (date_to - self.start).days <= self.horizon_days
+
+    async def is_current(self) -> bool:
+        """Check the matrix holds every published booking change.
+
+        Redis failures and a lost sequence (e.g. Redis restarted) count as
+        not current, the latter also reloads the matrix.
+        """
+        if not self.loaded or not self.subscribed or self._pending is not None:
+            return False
+        try:
+            seq = int(await self.redis.get(SEQUENCE_KEY) or 0)
+        except RedisError as exc:
+            logger.warning(f'Availability sequence read failed: {exc}')
+            return False
+        if seq < self.seq:
+            self._reload.set()
+        return seq == self.seq
+
+    def _get_nights(self, date_from: datetime.date, date_to: datetime.date) -> slice:
+        return slice((date_from - self.start).days, (date_to - self.start).days)
+
+    def book(self, room_id: int, date_from: datetime.date, date_to: datetime.date, delta: int = 1) -> None:
+        """Apply a created (``delta=1``) or cancelled (``delta=-1``) booking to the matrix."""
+        if not self.loaded or room_id not in self.room_index:
+            return
+
+        first = min(max((date_from - self.start).days, 0), self.horizon_days)
+        last = min(max((date_to - self.start).days, 0), self.horizon_days)
+        self.booked[self.room_index[room_id], first:last] += delta
+
+    async def publish(
+            self, booking_id: int, room_id: int, date_from: datetime.date, date_to: datetime.date, delta: int = 1,
+    ) -> None:
+        """Send a created (``delta=1``) or cancelled (``delta=-1``) booking to every worker, this one included.
+
+        If Redis fails, this worker reloads its matrix. The other workers
+        don't use theirs while they can't read the sequence, and reload once
+        they subscribe again, so only a failure of this call alone leaves
+        them behind until the periodic resync.
+        """
+        data = f'{booking_id},{room_id},{date_from.toordinal()},{date_to.toordinal()},{delta}'
+        try:
+            await self._publish_delta(keys=[SEQUENCE_KEY], args=[self.channel, data])
+        except RedisError:
+            self._reload.set()
+            raise
+
+    def _receive(self, message: str) -> None:
+        delta_seq, delta = message.split(':', 1)
+        if self._pending is not None:
+            self._pending.append((int(delta_seq), delta))
+        else:
+            self._apply(int(delta_seq), delta)
+
+    def _apply(self, delta_seq: int, delta: str) -> None:
+        if delta_seq <= self.seq:
+            return
+        if delta_seq > self.seq + 1:
+            # changes were lost while the channel was down, the matrix stays behind until reloaded
+            self._reload.set()
+            return
+        booking_id, room_id, date_from, date_to, units = map(int, delta.split(','))
+        if room_id not in self.room_index:
+            # a room created after the load, the matrix stays behind until reloaded
+            self._reload.set()
+            return
+        self.seq = delta_seq
+
+        # skip creations already loaded from Postgres and cancellations of bookings never counted
+        if (units > 0) == (booking_id in self.booking_ids):
+            return
+        if units > 0:
+            self.booking_ids.add(booking_id)
+        else:
+            self.booking_ids.discard(booking_id)
+        self.book(room_id, datetime.date.fromordinal(date_from), datetime.date.fromordinal(date_to), units)
+
+    def rooms_booked(
+            self, room_ids: Iterable[int], date_from: datetime.date, date_to: datetime.date,
+    ) -> Optional[dict[int, int]]:
+        """Get the peak number of booked units per room over the range.
+
+        :return: The units per room id, or None if some room was created after
+            the last load, the matrix is reloaded then.
+        """
+        room_ids = list(room_ids)
+        if any(room_id not in self.room_index for room_id in room_ids):
+            self._reload.set()
+            return None
+
+        result = dict.fromkeys(room_ids, 0)
+        if room_ids:
+            rows = np.array([self.room_index[room_id] for room_id in room_ids], dtype=np.intp)
+            peaks = self.booked[rows, self._get_nights(date_from, date_to)].max(axis=1)
+            result.update(zip(room_ids, peaks.tolist(), strict=True))
+        return result
+
+    def hotels_rooms_booked(
+            self, hotel_ids: Iterable[int], date_from: datetime.date, date_to: datetime.date,
+    ) -> dict[int, int]:
+        """Get the sum of peak booked units of the rooms of every hotel.
+
+        Rooms created after the last load are left out, they have no bookings
+        as long as the matrix is current (see ``_apply``).
+        """
+        hotel_ids = list(hotel_ids)
+        result = dict.fromkeys(hotel_ids, 0)
+
+        rows = np.flatnonzero(np.isin(self.hotel_ids, hotel_ids))
+        if rows.size:
+            peaks = self.booked[rows, self._get_nights(date_from, date_to)].max(axis=1)
+            hotels, inverse = np.unique(self.hotel_ids[rows], return_inverse=True)
+            sums = np.bincount(inverse, weights=peaks)
+            result.update(zip(hotels.tolist(), sums.astype(np.int64).tolist(), strict=True))
+        return result
+
+    async def _listen(self) -> None:
+        while True:
+            try:
+                async with self.redis.pubsub() as pubsub:
+                    await pubsub.subscribe(self.channel)
+                    async for message in pubsub.listen():
+                        if message['type'] == 'subscribe':
+                            self._subscribed.set()
+                            if self.loaded:
+                                # changes published while the channel was down are lost
+                                self._reload.set()
+                        elif message['type'] == 'message':
+                            self._receive(message['data'])
+            except RedisError as exc:
+                logger.warning(f'Availability listener failed: {exc}')
+            finally:
+                self._subscribed.clear()
+            await asyncio.sleep(RESUBSCRIBE_DELAY)
+
+    async def _resync(self, interval: int) -> None:
+        while True:
+            with suppress(asyncio.TimeoutError):
+                await asyncio.wait_for(self._reload.wait(), interval)
+            self._reload.clear()
+            try:
+                await self.load()
+            except Exception as exc:
+                logger.exception(f'Availability engine resync failed: {exc}')
+
+    async def start_engine(self, resync_interval: int) -> None:
+        self._listener = asyncio.create_task(self._listen())
+        # changes are received from the subscription on, so the first load has to follow it
+        with suppress(asyncio.TimeoutError):
+            await asyncio.wait_for(self._subscribed.wait(), SUBSCRIBE_TIMEOUT)
+        await self.load()
+        self._resync_task = asyncio.create_task(self._resync(resync_interval))
+
+    async def stop_engine(self) -> None:
+        for task in (self._resync_task, self._listener):
+            if task is not None:
+                task.cancel()
+                with suppress(asyncio.CancelledError):
+                    await task
+        self._resync_task = self._listener = None
+        self._subscribed.clear()
+        self.booked = None
+
+
+availability_engine = AvailabilityEngine(
+    redis,
+    horizon_days=availability_settings.AVAILABILITY_HORIZON_DAYS,
+    channel=availability_settings.AVAILABILITY_CHANNEL,
+)
+
+
+def get_availability_engine() -> Optional[AvailabilityEngine]:
+    """Get the engine if it is enabled, the listings use it only while it is loaded and current."""
+    if availability_settings.AVAILABILITY_ENGINE_ENABLED and np is not None:
+        return availability_engine
+    return None
+
+
+async def start_availability_engine() -> None:
+    if not availability_settings.AVAILABILITY_ENGINE_ENABLED:
+        return
+    if np is None:
+        logger.warning('AVAILABILITY_ENGINE_ENABLED is set, but numpy is not installed')
+        return
+    await availability_engine.start_engine(availability_settings.AVAILABILITY_RESYNC_SECONDS)
+
+
+async def stop_availability_engine() -> None:
+    await availability_engine.stop_engine()
@@ -4,7 +4,9 @@ from fastapi import Depends
 from sqlalchemy.ext.asyncio import AsyncSession
 
 from src.base.repositories import Transaction
+from src.bookings.holds import hold_store
 from src.database import get_db_session
+from src.hotels.availability import get_availability_engine
 from src.hotels.repositories import HotelRepository
 from src.hotels.services import HotelService
 
@@ -14,4 +16,6 @@ async def get_hotel_service(
 ):
     repository = HotelRepository(session=session)
     transaction = Transaction(session=session)
-    return HotelService(repository=repository, transaction=transaction)
+    return HotelService(
+        repository=repository, transaction=transaction, availability=get_availability_engine(), holds=hold_store,
+    )
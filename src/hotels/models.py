@@ -2,7 +2,7 @@ from os import PathLike
 from pathlib import Path
 from typing import List
 
-from sqlalchemy import JSON, ForeignKey, Integer, String, UniqueConstraint
+from sqlalchemy import JSON, ForeignKey, Index, Integer, String, UniqueConstraint
 from sqlalchemy.ext.asyncio import AsyncAttrs
 from sqlalchemy.orm import Mapped, mapped_column, relationship
 
@@ -13,6 +13,14 @@ from src.database import DatabaseModel
 class Hotel(DatabaseModel):
     __tablename__ = 'hotel'
     __allow_unmapped__ = True
+    __table_args__ = (
+        # trigram indexes serve the ILIKE '%...%' hotel search (requires pg_trgm)
+        Index('ix_hotel_name_trgm', 'name', postgresql_using='gin', postgresql_ops={'name': 'gin_trgm_ops'}),
+        Index(
+            'ix_hotel_location_trgm', 'location',
+            postgresql_using='gin', postgresql_ops={'location': 'gin_trgm_ops'},
+        ),
+    )
 
     id: Mapped[int] = mapped_column(  # noqa
         Integer, primary_key=True, index=True, autoincrement=True,
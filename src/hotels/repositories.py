@@ -3,12 +3,12 @@ import logging
 from collections.abc import Sequence
 from typing import List, Optional, Type
 
-from sqlalchemy import RowMapping, and_, delete, func, or_, select
+from sqlalchemy import RowMapping, Select, and_, delete, func, or_, select
 from sqlalchemy.exc import IntegrityError
 
 from src.base.exceptions import HTTP_EXC, NotFound
 from src.base.repositories import BaseRepository
-from src.bookings.models import Booking
+from src.bookings.models import RoomInventory
 from src.bookings.repositories import BookingRepository
 from src.hotels.models import FavouriteHotel, Hotel, Room
 
@@ -49,40 +49,38 @@ class HotelRepository(BaseRepository[Hotel | Room]):
     async def get_room_or_404(self, room_id: int) -> Room:
         return await self._get_room_or_exception(room_id, NotFound, 'Room with this id not found')
 
+    @staticmethod
+    def get_found_hotels_query(name: str) -> Select:
+        """Select the ids of hotels matching the search query with their relevance rank.
+
+        Both ``ILIKE`` filters are served by the trigram indexes on ``hotel``,
+        the rank is the best word similarity of the query to the hotel name or
+        location.
+        """
+        pattern = f'%{name}%'
+        rank = func.greatest(
+            func.word_similarity(name, Hotel.name),
+            func.word_similarity(name, Hotel.location),
+        )
+        return select(
+            Hotel.id.label('hotel_id'),
+            rank.label('rank'),
+        ).where(or_(Hotel.name.ilike(pattern), Hotel.location.ilike(pattern)))
+
     async def search_hotels(
             self, name: str, date_from: datetime.date, date_to: datetime.date,
-    ):
-        """"""
-        # TODO: rewrite query to use search hotels instead (3x faster)
+    ) -> Sequence[RowMapping]:
+        """Search hotels by name or location with their free rooms, most relevant first.
+
+        Matching hotels are resolved once in the ``found_hotels`` CTE, which
+        the rooms and bookings aggregates are restricted to. Full hotels are
+        returned too, their ``rooms_left`` is not positive.
         """
-        explain analyse with const(curr_date) as (
-            values (date('2023-09-04'))
-        ), search_hotels as (
-           select h.id from hotel h
-           where h.name ilike '%алтай%' or h.location ilike '%алтай%'
-        ), booked_rooms_by_hotels as (
-            select count(b.id) as rooms_booked, sh.id as hotel_id from booking b
-            join const on true
-            left join room r on r.id = b.room_id
-            join search_hotels sh on sh.id = r.id
-            WHERE b.date_from <= const.curr_date AND b.date_to >= const.curr_date OR
-                  b.date_from > const.curr_date AND b.date_to < const.curr_date OR
-                  b.date_from <= const.curr_date AND b.date_to >= const.curr_date AND b.date_to < const.curr_date OR
-                  b.date_from > const.curr_date AND b.date_from <= const.curr_date AND b.date_to >= const.curr_date
-            group by sh.id
-        ), rooms_by_hotels as (
-            select sh.id as hotel_id, sum(r.quantity) as rooms_count from room r
-            join search_hotels sh on sh.id = r.id
-            group by sh.id
-        )
-        select h.id, h.name, h.image_id, (rbh.rooms_count - br.rooms_booked) as rooms_left from hotel h
-        join booked_rooms_by_hotels br on br.hotel_id = h.id
-        join rooms_by_hotels rbh on rbh.hotel_id = h.id
-        join search_hotels sh on h.id = sh.id;
-                """
-        booked_by_hotels = await self.get_booked_by_hotels(date_from=date_from, date_to=date_to, name=name)
+        found_hotels = self.get_found_hotels_query(name).cte('found_hotels')
+        hotel_ids = select(found_hotels.c.hotel_id)
 
-        rooms_by_hotels = await self.get_rooms_by_hotels(name=name)
+        booked_by_hotels = await self.get_booked_by_hotels(date_from=date_from, date_to=date_to, hotel_ids=hotel_ids)
+        rooms_by_hotels = await self.get_rooms_by_hotels(hotel_ids=hotel_ids)
 
         hotels = select(
             Hotel.id,
@@ -93,13 +91,33 @@ class HotelRepository(BaseRepository[Hotel | Room]):
             (rooms_by_hotels.c.rooms_count - func.coalesce(booked_by_hotels.c.rooms_booked, 0)).label('rooms_left'),
             rooms_by_hotels.c.rooms_count.label('rooms_count'),
         ).select_from(Hotel).join(
+            found_hotels, found_hotels.c.hotel_id == Hotel.id,
+        ).join(
             booked_by_hotels, booked_by_hotels.c.hotel_id == Hotel.id, isouter=True,
         ).join(
             rooms_by_hotels, rooms_by_hotels.c.hotel_id == Hotel.id,
-        ).where(and_(
-            or_(Hotel.name.ilike(f'%{name}%'), Hotel.location.ilike(f'%{name}%')),
-            rooms_by_hotels.c.rooms_count > func.coalesce(booked_by_hotels.c.rooms_booked, 0),
-        ))
+        ).order_by(found_hotels.c.rank.desc(), Hotel.id)
+
+        result = await self.session.execute(hotels)
+        return result.mappings().all()
+
+    async def search_hotels_rooms_count(self, name: str) -> Sequence[RowMapping]:
+        """Search hotels like ``search_hotels`` but without the booked rooms aggregate."""
+        found_hotels = self.get_found_hotels_query(name).cte('found_hotels')
+        rooms_by_hotels = await self.get_rooms_by_hotels(hotel_ids=select(found_hotels.c.hotel_id))
+
+        hotels = select(
+            Hotel.id,
+            Hotel.name,
+            Hotel.location,
+            Hotel.image_id,
+            Hotel.services,
+            rooms_by_hotels.c.rooms_count.label('rooms_count'),
+        ).select_from(Hotel).join(
+            found_hotels, found_hotels.c.hotel_id == Hotel.id,
+        ).join(
+            rooms_by_hotels, rooms_by_hotels.c.hotel_id == Hotel.id,
+        ).order_by(found_hotels.c.rank.desc(), Hotel.id)
 
         result = await self.session.execute(hotels)
         return result.mappings().all()
@@ -117,13 +135,9 @@ class HotelRepository(BaseRepository[Hotel | Room]):
     async def get_hotel_rooms_info(
             self, hotel_id: int, date_from: datetime.date, date_to: datetime.date, room_id: Optional[int],
     ) -> Sequence[RowMapping] | RowMapping | None:
-        clauses = await BookingRepository.get_booked_rooms_clauses(date_from, date_to)
-        booked_rooms = select(
-            Room.id.label('room_id'),
-            func.coalesce(func.count(Booking.id), 0).label('rooms_booked'),
-        ).select_from(Room).join(
-            Booking, Booking.room_id == Room.id, isouter=True,
-        ).where(and_(Room.hotel_id == hotel_id, or_(*clauses))).group_by(Room.id)
+        booked_rooms = BookingRepository.get_booked_rooms_query(date_from, date_to).join(
+            Room, Room.id == RoomInventory.room_id,
+        ).where(Room.hotel_id == hotel_id)
 
         if room_id:
             booked_rooms = booked_rooms.where(Room.id == room_id)
@@ -148,6 +162,25 @@ class HotelRepository(BaseRepository[Hotel | Room]):
 
         return result.mappings().all()
 
+    async def get_hotel_rooms(
+            self, hotel_id: int, date_from: datetime.date, date_to: datetime.date, room_id: Optional[int],
+    ) -> Sequence[RowMapping] | RowMapping | None:
+        """Get hotel rooms like ``get_hotel_rooms_info`` but without the booked rooms aggregate."""
+        rooms = select(
+            Room.__table__.columns,  # noqa
+            (Room.price * (date_to - date_from).days).label('total_cost'),
+        ).where(Room.hotel_id == hotel_id)
+
+        if room_id:
+            rooms = rooms.where(Room.id == room_id)
+
+        result = await self.session.execute(rooms)
+
+        if room_id:
+            return result.mappings().first()
+
+        return result.mappings().all()
+
     async def get_my_favourite_hotels(self, user_id: int) -> Sequence[RowMapping]:
         stmt = select(
             Hotel.__table__.columns,  # noqa
@@ -184,23 +217,22 @@ class HotelRepository(BaseRepository[Hotel | Room]):
         await self.session.execute(stmt)
         await self.session.commit()
 
-    @staticmethod
-    async def get_hotel_join(name: Optional[str] = None, hotel_ids: Optional[List[int]] = None):
-        if not name and not hotel_ids:
+    @classmethod
+    async def get_hotel_join(cls, name: Optional[str] = None, hotel_ids: Optional[List[int] | Select] = None):
+        if name is None and hotel_ids is None:
             raise RuntimeError('name or hotel_id required for get_rooms_by_hotels')
         hotel_join_clause = None
 
         if name is not None:
-            hotel_join_clause = and_(Hotel.id == Room.hotel_id, or_(
-                Hotel.name.ilike(f'%{name}%'), Hotel.location.ilike(f'%{name}%'),
-            ))
+            found_hotels = cls.get_found_hotels_query(name).subquery('found_hotels')
+            hotel_join_clause = and_(Hotel.id == Room.hotel_id, Hotel.id.in_(select(found_hotels.c.hotel_id)))
         if hotel_ids is not None:
-            hotel_join_clause = Hotel.id.in_(hotel_ids)
+            hotel_join_clause = and_(Hotel.id == Room.hotel_id, Hotel.id.in_(hotel_ids))
         return hotel_join_clause
 
     @classmethod
     async def get_rooms_by_hotels(
-            cls, name: Optional[str] = None, hotel_ids: Optional[List[int]] = None,
+            cls, name: Optional[str] = None, hotel_ids: Optional[List[int] | Select] = None,
     ):
         hotel_join_clause = await cls.get_hotel_join(name=name, hotel_ids=hotel_ids)
 
@@ -214,17 +246,17 @@ class HotelRepository(BaseRepository[Hotel | Room]):
     @classmethod
     async def get_booked_by_hotels(
             cls, date_from: datetime.date, date_to: datetime.date,
-            name: Optional[str] = None, hotel_ids: Optional[List[int]] = None,
+            name: Optional[str] = None, hotel_ids: Optional[List[int] | Select] = None,
     ):
         hotel_join_clause = await cls.get_hotel_join(name=name, hotel_ids=hotel_ids)
 
-        clauses = await BookingRepository.get_booked_rooms_clauses(date_from, date_to)
+        booked_rooms = BookingRepository.get_booked_rooms_query(date_from, date_to).subquery('booked_rooms')
 
         return select(
-            func.count(Booking.id).label('rooms_booked'),
+            func.sum(booked_rooms.c.rooms_booked).label('rooms_booked'),
             Hotel.id.label('hotel_id'),
-        ).select_from(Booking).join(
-            Room, Room.id == Booking.room_id, isouter=True,
+        ).select_from(booked_rooms).join(
+            Room, Room.id == booked_rooms.c.room_id,
         ).join(
             Hotel, hotel_join_clause,
-        ).where(or_(*clauses)).group_by(Hotel.id).cte('booked_by_hotels')
+        ).group_by(Hotel.id).cte('booked_by_hotels')
@@ -1,10 +1,10 @@
 from typing import Annotated, List
 
 from fastapi import APIRouter, Depends, status
-from fastapi_cache.decorator import cache
 
 from src.auth.dependencies import get_current_user
 from src.base.schemas import DetailModel, SuccessModel
+from src.cache import cache
 from src.hotels.dependencies import get_hotel_service
 from src.hotels.schemas import DateRangeModel, HotelInfo, HotelWithRoomsLeft
 from src.hotels.services import HotelService
@@ -20,7 +20,7 @@ hotels_router = APIRouter(
     status_code=status.HTTP_200_OK,
     response_model=List[HotelWithRoomsLeft],
 )
-@cache(expire=60 * 30, namespace='clearable-search_available_hotels')
+@cache(expire=60 * 60, stale_after=60 * 30, namespace='clearable-search_available_hotels')
 async def search_available_hotels(
         name: str,
         filters: Annotated[DateRangeModel, Depends()],
@@ -40,7 +40,7 @@ async def search_available_hotels(
         },
     },
 )
-@cache(expire=60 * 30, namespace='clearable-get_hotel_info')
+@cache(expire=60 * 60, stale_after=60 * 30, namespace='clearable-get_hotel_info')
 async def get_hotel_info(
         hotel_id: int,
         hotel_service: Annotated[HotelService, Depends(get_hotel_service)],
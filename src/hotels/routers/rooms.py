@@ -1,8 +1,8 @@
 from typing import Annotated, List
 
 from fastapi import APIRouter, Depends, status
-from fastapi_cache.decorator import cache
 
+from src.cache import cache
 from src.hotels.dependencies import get_hotel_service
 from src.hotels.schemas import DateRangeModel, HotelRoomDetailedInfo
 from src.hotels.services import HotelService
@@ -17,7 +17,7 @@ rooms_router = APIRouter(
     status_code=status.HTTP_200_OK,
     response_model=List[HotelRoomDetailedInfo],
 )
-@cache(expire=60 * 30, namespace='clearable-get_rooms_for_hotel')
+@cache(expire=60 * 60, stale_after=60 * 30, namespace='clearable-get_rooms_for_hotel')
 async def get_rooms_for_hotel(
         hotel_id: int,
         settings: Annotated[DateRangeModel, Depends()],
@@ -32,7 +32,7 @@ async def get_rooms_for_hotel(
     status_code=status.HTTP_200_OK,
     response_model=HotelRoomDetailedInfo,
 )
-@cache(expire=60 * 30, namespace='clearable-get_room_info')
+@cache(expire=60 * 60, stale_after=60 * 30, namespace='clearable-get_room_info')
 async def get_room_info(
         hotel_id: int,
         room_id: int,
@@ -7,6 +7,9 @@ from sqlalchemy import RowMapping
 
 from src.base.exceptions import NotFound
 from src.base.repositories import Transaction
+from src.bookings.holds import HoldStore
+from src.cache import CacheTag, KeyBuilderCache
+from src.hotels.availability import AvailabilityEngine
 from src.hotels.models import Hotel, Room
 from src.hotels.repositories import HotelRepository
 
@@ -15,6 +18,19 @@ from src.hotels.repositories import HotelRepository
 class HotelService:
     repository: HotelRepository
     transaction: Transaction
+    availability: Optional[AvailabilityEngine] = None
+    holds: Optional[HoldStore] = None
+
+    async def _use_availability(self, date_from: datetime.date, date_to: datetime.date) -> bool:
+        # the listings are cached for every worker, so the matrix must hold every booking change
+        return bool(self.availability and self.availability.covers(date_from, date_to)
+                    and await self.availability.is_current())
+
+    @staticmethod
+    def _expire_with_holds(expires_at: Optional[int]) -> None:
+        # holds are not invalidated when they expire, so the cached listing must not outlive them
+        if expires_at is not None:
+            KeyBuilderCache.expire_entry_at(expires_at)
 
     async def get_room_by_id(self, room_id: int) -> Room:
         return await self.repository.get_room_or_404(room_id)
@@ -23,7 +39,24 @@ class HotelService:
             self, name: str, date_from: datetime.date, date_to: datetime.date,
     ) -> list[Hotel]:
         name = name.strip().lower()
-        return await self.repository.search_hotels(name, date_from, date_to)
+        if await self._use_availability(date_from, date_to):
+            hotels = await self.repository.search_hotels_rooms_count(name)
+            booked = self.availability.hotels_rooms_booked([hotel.id for hotel in hotels], date_from, date_to)
+            hotels = [{**hotel, 'rooms_left': hotel.rooms_count - booked[hotel.id]} for hotel in hotels]
+        else:
+            hotels = await self.repository.search_hotels(name, date_from, date_to)
+
+        # full hotels are tagged too, so the searches leaving them out are invalidated when they free up
+        KeyBuilderCache.tag_entry(*(CacheTag.hotel(hotel['id']) for hotel in hotels))
+
+        if self.holds:
+            held, expires_at = await self.holds.get_held_rooms([hotel['id'] for hotel in hotels], date_from, date_to)
+            self._expire_with_holds(expires_at)
+            hotels = [
+                {**hotel, 'rooms_left': hotel['rooms_left'] - sum(held.get(hotel['id'], {}).values())}
+                for hotel in hotels
+            ]
+        return [hotel for hotel in hotels if hotel['rooms_left'] > 0]
 
     async def get_hotel_info(self, hotel_id: int) -> RowMapping:
         result = await self.repository.get_hotel_info(hotel_id)
@@ -33,8 +66,35 @@ class HotelService:
 
     async def get_hotel_rooms(
             self, hotel_id: int, date_from: datetime.date, date_to: datetime.date, room_id: Optional[int] = None,
-    ) -> Sequence[RowMapping]:
-        return await self.repository.get_hotel_rooms_info(hotel_id, date_from, date_to, room_id=room_id)
+    ) -> Sequence[RowMapping] | RowMapping | None:
+        rooms = None
+        if await self._use_availability(date_from, date_to):
+            found = await self.repository.get_hotel_rooms(hotel_id, date_from, date_to, room_id=room_id)
+            if found is None:
+                return None
+            if room_id:
+                found = [found]
+
+            # None for rooms created after the matrix was loaded
+            booked = self.availability.rooms_booked([room.id for room in found], date_from, date_to)
+            if booked is not None:
+                rooms = [{**room, 'rooms_left': room.quantity - booked[room.id]} for room in found]
+        if rooms is None:
+            rooms = await self.repository.get_hotel_rooms_info(hotel_id, date_from, date_to, room_id=room_id)
+            if rooms is None:
+                return None
+            if room_id:
+                rooms = [rooms]
+
+        if self.holds:
+            # held units are counted over their peak night, a lower bound of what is left
+            held, expires_at = await self.holds.get_held_rooms([hotel_id], date_from, date_to)
+            self._expire_with_holds(expires_at)
+            rooms = [
+                {**room, 'rooms_left': room['rooms_left'] - held.get(hotel_id, {}).get(room['id'], 0)}
+                for room in rooms
+            ]
+        return rooms[0] if room_id else rooms
 
     async def get_my_favourite_hotels(self, user_id: int) -> Sequence[RowMapping]:
         return await self.repository.get_my_favourite_hotels(user_id)
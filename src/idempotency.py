@@ -0,0 +1,130 @@
+import asyncio
+import hashlib
+import json
+import logging
+from collections.abc import Awaitable, Callable
+from typing import Any
+
+from fastapi.encoders import jsonable_encoder
+from redis.asyncio import Redis
+from redis.exceptions import RedisError
+
+from src.base.exceptions import DataConflict
+from src.cache import redis
+from src.config import idempotency_settings
+from src.metrics import metrics
+
+logger = logging.getLogger('debugger')
+
+
+class IdempotencyKeyReused(DataConflict):
+    detail = 'Idempotency-Key was already used with another request'
+
+
+class IdempotentRequestInProgress(DataConflict):
+    detail = 'Request with this Idempotency-Key is still in progress'
+
+
+class IdempotencyStore:
+    """Responses of requests sent with an ``Idempotency-Key`` header.
+
+    The first request with a key stores an in-flight marker, runs and
+    replaces the marker with its response for ``ttl`` seconds. Duplicates
+    sent meanwhile wait for that response instead of running again, later
+    ones get it straight from Redis. A failed request releases the key, so it
+    can be retried. The marker expires after ``lock_ttl`` seconds, a crashed
+    worker doesn't hold the key forever. Redis failures fall back to running
+    the request unprotected.
+    """
+
+    def __init__(self, redis_client: Redis, ttl: int, lock_ttl: int, wait_timeout: float, poll_interval: float):
+        self.redis = redis_client
+        self.ttl = ttl
+        self.lock_ttl = lock_ttl
+        self.wait_timeout = wait_timeout
+        self.poll_interval = poll_interval
+
+    @staticmethod
+    def get_key(scope: str, key: str) -> str:
+        return f'idempotency:{scope}:{key}'
+
+    @staticmethod
+    def get_fingerprint(request_data: Any) -> str:
+        """Digest of the request data a key is bound to."""
+        data = json.dumps(jsonable_encoder(request_data), sort_keys=True, separators=(',', ':'))
+        return hashlib.sha256(data.encode()).hexdigest()
+
+    async def run(
+            self, scope: str, key: str, fingerprint: str, func: Callable[[], Awaitable[Any]],
+    ) -> tuple[Any, bool]:
+        """Run ``func`` once per key.
+
+        :param scope: Namespace of the key, e.g. the endpoint and the user id.
+        :param key: The ``Idempotency-Key`` header value.
+        :param fingerprint: The ``get_fingerprint`` of the request data.
+        :param func: The request handler.
+        :return: The JSON compatible result and whether it was replayed.
+        :raises IdempotencyKeyReused: If the key was used with another fingerprint.
+        :raises IdempotentRequestInProgress: If the first request didn't finish in ``wait_timeout``.
+        """
+        redis_key = self.get_key(scope, key)
+        try:
+            acquired, response = await self._acquire(redis_key, fingerprint)
+        except RedisError as exc:
+            logger.warning(f'Idempotency key lookup failed: {exc}')
+            return jsonable_encoder(await func()), False
+
+        if not acquired:
+            metrics.incr('idempotency.replay')
+            return response, True
+
+        try:
+            result = jsonable_encoder(await func())
+        except BaseException:
+            await self._release(redis_key)
+            raise
+
+        metrics.incr('idempotency.executed')
+        try:
+            await self.redis.set(redis_key, json.dumps({'fingerprint': fingerprint, 'response': result}), ex=self.ttl)
+        except RedisError as exc:
+            logger.warning(f'Idempotent response store failed: {exc}')
+        return result, False
+
+    async def _acquire(self, redis_key: str, fingerprint: str) -> tuple[bool, Any]:
+        """Take the key or wait for the response of the request holding it."""
+        marker = json.dumps({'fingerprint': fingerprint})
+        loop = asyncio.get_running_loop()
+        deadline = loop.time() + self.wait_timeout
+
+        while True:
+            if await self.redis.set(redis_key, marker, nx=True, ex=self.lock_ttl):
+                return True, None
+
+            cached = await self.redis.get(redis_key)
+            if cached is not None:
+                entry = json.loads(cached)
+                if entry['fingerprint'] != fingerprint:
+                    raise IdempotencyKeyReused
+                if 'response' in entry:
+                    return False, entry['response']
+
+            if loop.time() >= deadline:
+                raise IdempotentRequestInProgress
+            metrics.incr('idempotency.wait')
+            await asyncio.sleep(self.poll_interval)
+
+    async def _release(self, redis_key: str) -> None:
+        try:
+            await self.redis.delete(redis_key)
+        except RedisError as exc:
+            logger.warning(f'Idempotency key release failed: {exc}')
+
+
+idempotency_store = IdempotencyStore(
+    redis,
+    ttl=idempotency_settings.IDEMPOTENCY_TTL,
+    lock_ttl=idempotency_settings.IDEMPOTENCY_LOCK_TTL,
+    wait_timeout=idempotency_settings.IDEMPOTENCY_WAIT_TIMEOUT,
+    poll_interval=idempotency_settings.IDEMPOTENCY_POLL_INTERVAL,
+)
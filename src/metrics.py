@@ -0,0 +1,74 @@
+import time
+from collections import defaultdict
+from collections.abc import Iterator
+from contextlib import contextmanager
+from typing import Any
+
+# Upper bounds in seconds of the latency histogram buckets
+LATENCY_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0)
+
+
+class Histogram:
+    """Counts of observed values per bucket, along with their count and sum."""
+
+    def __init__(self, buckets: tuple[float, ...] = LATENCY_BUCKETS):
+        self.buckets = buckets
+        # the last count is of the values above every bucket
+        self.counts = [0] * (len(buckets) + 1)
+        self.count = 0
+        self.sum = 0.0
+
+    def observe(self, value: float) -> None:
+        index = next((i for i, bound in enumerate(self.buckets) if value <= bound), len(self.buckets))
+        self.counts[index] += 1
+        self.count += 1
+        self.sum += value
+
+    def snapshot(self) -> dict[str, Any]:
+        """Cumulative bucket counts keyed by their upper bound, like Prometheus ``le`` buckets."""
+        buckets, total = {}, 0
+        for bound, count in zip([*map(str, self.buckets), '+Inf'], self.counts, strict=True):
+            total += count
+            buckets[bound] = total
+        return {'count': self.count, 'sum': self.sum, 'buckets': buckets}
+
+
+class Metrics:
+    """Per-worker counters and latency histograms of the app internals (cache hits, misses etc.)."""
+
+    def __init__(self):
+        self._counters: defaultdict[str, int] = defaultdict(int)
+        self._histograms: dict[str, Histogram] = {}
+
+    def incr(self, name: str, value: int = 1) -> None:
+        self._counters[name] += value
+
+    def get(self, name: str) -> int:
+        return self._counters.get(name, 0)
+
+    def observe(self, name: str, value: float) -> None:
+        if name not in self._histograms:
+            self._histograms[name] = Histogram()
+        self._histograms[name].observe(value)
+
+    @contextmanager
+    def timer(self, name: str) -> Iterator[None]:
+        """Observe the duration of the block in the ``name`` histogram, failed blocks included."""
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(name, time.perf_counter() - start)
+
+    def snapshot(self) -> dict[str, int]:
+        return dict(sorted(self._counters.items()))
+
+    def histograms(self) -> dict[str, dict[str, Any]]:
+        return {name: self._histograms[name].snapshot() for name in sorted(self._histograms)}
+
+    def reset(self) -> None:
+        self._counters.clear()
+        self._histograms.clear()
+
+
+metrics = Metrics()
@@ -1,13 +1,27 @@
-from typing import Optional
+import json
+import logging
+from collections.abc import Sequence
+from typing import Any, Optional
 
-from fastapi import Request, status
+from fastapi import APIRouter, Request, status
+from fastapi.dependencies.models import Dependant
+from fastapi.dependencies.utils import get_flat_dependant, request_params_to_args
 from fastapi.responses import RedirectResponse
+from fastapi.routing import APIRoute
+from fastapi_cache import FastAPICache
+from redis.exceptions import RedisError
 from sqladmin.authentication import AuthenticationBackend
+from starlette.datastructures import QueryParams
+from starlette.routing import Match
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
 
 from src.auth.dependencies import get_auth_service, get_current_user
+from src.cache import STALE_HEADER, EncodedValue, KeyBuilderCache, incr_namespace
 from src.database import context_db_session
 from src.users.dependencies import get_user_service
 
+logger = logging.getLogger('debugger')
+
 
 class AdminAuthJWTMiddleware(AuthenticationBackend):
     async def login(self, request: Request) -> bool:
@@ -62,3 +76,132 @@ class AdminAuthJWTMiddleware(AuthenticationBackend):
                     except Exception:
                         return RedirectResponse(request.url_for('admin:login'), status_code=status.HTTP_302_FOUND)
                 return RedirectResponse(request.url_for('admin:login'), status_code=status.HTTP_302_FOUND)
+
+
+class ResponseCacheMiddleware:
+    """Serve cached GET responses before routing.
+
+    A hit is answered with the stored body and headers, so it costs at most
+    one Redis round trip (none when the cache backend keeps a copy in the
+    worker memory, see ``TieredRedisBackend``): the endpoint dependencies
+    (database session, services, parameter models) are not resolved and the
+    cached value is not decoded and serialized again. Only endpoints
+    decorated with ``src.cache.cache`` are served. The key is the one
+    ``KeyBuilderCache.key_builder`` gives the endpoint, so the responses are
+    invalidated together with the entries. Responses of entries cached with
+    ``stale_after`` are served until the entry turns stale, and responses
+    built from stale entries aren't stored.
+    """
+
+    SKIPPED_HEADERS = {b'content-length', b'cache-control', b'etag'}
+    STALE_RAW_HEADER = STALE_HEADER.lower().encode('latin-1')
+
+    def __init__(self, app: ASGIApp, router: APIRouter, paths: Sequence[str]):
+        self.app = app
+        self.router = router
+        self.paths = tuple(paths)
+        self._dependants: dict[str, Dependant] = {}
+
+    def _is_cacheable(self, scope: Scope) -> bool:
+        if scope['type'] != 'http' or scope['method'] != 'GET' or not scope['path'].startswith(self.paths):
+            return False
+        cache_control = Request(scope).headers.get('Cache-Control')
+        return cache_control not in ('no-store', 'no-cache') and FastAPICache.get_enable()
+
+    def _get_dependant(self, route: APIRoute) -> Dependant:
+        if route.unique_id not in self._dependants:
+            self._dependants[route.unique_id] = get_flat_dependant(route.dependant)
+        return self._dependants[route.unique_id]
+
+    def get_cache_key(self, scope: Scope) -> Optional[str]:
+        """Build the cache key of the request from its path and query parameters.
+
+        :return: The key, or None if the endpoint is not cached or the
+            parameters are invalid (the endpoint will report the error).
+        """
+        entry = self.get_cache_entry(scope)
+        return entry[0] if entry else None
+
+    def get_cache_entry(self, scope: Scope) -> Optional[tuple[str, int]]:
+        """Get the cache key of the request and the TTL left to its entry when it turns stale."""
+        for route in self.router.routes:
+            match, child_scope = route.matches(scope)
+            if match == Match.FULL:
+                break
+        else:
+            return None
+
+        namespace = getattr(getattr(route, 'endpoint', None), '__cache_namespace__', None)
+        if not isinstance(route, APIRoute) or namespace is None:
+            return None
+
+        dependant = self._get_dependant(route)
+        path_values, path_errors = request_params_to_args(dependant.path_params, child_scope['path_params'])
+        query_values, query_errors = request_params_to_args(
+            dependant.query_params, QueryParams(scope['query_string']),
+        )
+        if path_errors or query_errors:
+            return None
+
+        params = KeyBuilderCache.canonical_params({**path_values, **query_values})
+        key = KeyBuilderCache.build_key(route.endpoint, f'{FastAPICache.get_prefix()}:{namespace}', params)
+        return key, getattr(route.endpoint, '__cache_stale_ttl__', 0)
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        entry = self.get_cache_entry(scope) if self._is_cacheable(scope) else None
+        if entry is None:
+            await self.app(scope, receive, send)
+            return
+
+        key, stale_ttl = entry
+        try:
+            ttl, cached = await FastAPICache.get_backend().get_with_ttl(KeyBuilderCache.get_response_key(key))
+        except RedisError as exc:
+            logger.warning(f'Response cache lookup failed: {exc}')
+            cached, ttl = None, 0
+
+        namespace = KeyBuilderCache.get_namespace(key)
+        if cached is not None:
+            incr_namespace(namespace, 'response_hit')
+            await self.send_cached(send, cached, ttl)
+            return
+        incr_namespace(namespace, 'response_miss')
+
+        start: dict[str, Any] = {}
+        body: list[bytes] = []
+
+        async def send_wrapper(message: Message) -> None:
+            if message['type'] == 'http.response.start':
+                start.update(message)
+            elif message['type'] == 'http.response.body':
+                body.append(message.get('body', b''))
+            await send(message)
+
+        await self.app(scope, receive, send_wrapper)
+
+        raw_headers = start.get('headers', [])
+        stale = any(name.lower() == self.STALE_RAW_HEADER for name, _ in raw_headers)
+        if start.get('status') == status.HTTP_200_OK and not stale:
+            headers = [
+                [name.decode('latin-1'), value.decode('latin-1')]
+                for name, value in raw_headers
+                if name.lower() not in self.SKIPPED_HEADERS
+            ]
+            value = json.dumps(headers).encode('utf-8') + b'\n' + b''.join(body)
+            try:
+                await KeyBuilderCache.store_response(key, value, stale_ttl)
+            except RedisError as exc:
+                logger.warning(f'Response cache store failed: {exc}')
+
+    @staticmethod
+    async def send_cached(send: Send, cached: EncodedValue, ttl: int) -> None:
+        if isinstance(cached, str):
+            cached = cached.encode('utf-8')
+        headers, body = cached.split(b'\n', 1)
+
+        raw_headers = [(name.encode('latin-1'), value.encode('latin-1')) for name, value in json.loads(headers)]
+        raw_headers.append((b'content-length', str(len(body)).encode('latin-1')))
+        raw_headers.append((b'cache-control', f'max-age={max(ttl, 0)}'.encode('latin-1')))
+
+        await send({'type': 'http.response.start', 'status': status.HTTP_200_OK, 'headers': raw_headers})
+        await send({'type': 'http.response.body', 'body': body})
@@ -0,0 +1,35 @@
+from typing import Optional
+
+from fastapi import Request
+from sqladmin import BaseView, expose
+
+from src.cache import get_namespace_metrics
+from src.metrics import metrics
+
+
+def get_ratio(hits: int, misses: int) -> Optional[float]:
+    return round(hits / (hits + misses), 3) if hits + misses else None
+
+
+class CacheMetricsAdminView(BaseView):
+    name = 'Cache metrics'
+    identity = 'cache-metrics'
+    icon = 'fa-solid fa-chart-line'
+
+    @expose('/cache-metrics', identity='cache-metrics')
+    async def cache_metrics(self, request: Request):
+        namespaces = await get_namespace_metrics()
+        for counters in namespaces.values():
+            hits, misses = counters.get('hit', 0), counters.get('miss', 0)
+            response_hits = counters.get('response_hit', 0)
+            # responses served by ResponseCacheMiddleware never reach the endpoint lookup
+            counters['hit_ratio'] = get_ratio(response_hits + hits, misses)
+            counters['response_hit_ratio'] = get_ratio(response_hits, counters.get('response_miss', 0))
+
+        histograms = {
+            name: histogram for name, histogram in metrics.histograms().items() if name.startswith('cache.redis.')
+        }
+        return self.templates.TemplateResponse(
+            'admin/cache_metrics.html',
+            context={'request': request, 'namespaces': namespaces, 'histograms': histograms},
+        )
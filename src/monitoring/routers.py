@@ -0,0 +1,23 @@
+from typing import Annotated, Any
+
+from fastapi import APIRouter, Depends
+
+from src.auth.dependencies import get_staff_user
+from src.cache import get_namespace_metrics
+from src.metrics import metrics
+from src.users.models import User
+
+monitoring_router = APIRouter(
+    prefix='/metrics',
+)
+
+
+@monitoring_router.get('')
+async def get_metrics(_: Annotated[User, Depends(get_staff_user)]) -> dict[str, Any]:
+    """Get the cache counters of every worker per namespace, and the other
+    counters and latency histograms of the worker serving the request."""
+    return {
+        'counters': metrics.snapshot(),
+        'cache_namespaces': await get_namespace_metrics(),
+        'histograms': metrics.histograms(),
+    }
@@ -5,6 +5,7 @@ from sqladmin.models import ModelView
 
 from src.base.permissions import PermissionService
 from src.database import context_db_session
+from src.users.cache import user_cache
 from src.users.models import User
 
 
@@ -20,6 +21,12 @@ class UserAdminView(ModelView, model=User):
     column_searchable_list = [User.id, User.username, User.email]
     icon = 'fa-solid fa-user'
 
+    async def after_model_change(self, data: dict, model: User, is_created: bool) -> None:
+        await user_cache.invalidate(model.id)
+
+    async def after_model_delete(self, model: User) -> None:
+        await user_cache.invalidate(model.id)
+
     @action(
         name='Promote to a staff',
         confirmation_message='Are you sure you want to promote this users to a staff users?',
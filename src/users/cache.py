@@ -0,0 +1,81 @@
+import json
+import logging
+from typing import Any, Optional
+
+from redis.asyncio import Redis
+from redis.exceptions import RedisError
+
+from src.auth.config import auth_config
+from src.base.lru import TTLCache
+from src.cache import redis
+from src.metrics import metrics
+from src.users.models import User
+
+logger = logging.getLogger('debugger')
+
+# The password hash is left out: Redis is shared with the public response cache, and
+# the hash is loaded from the database on the rare paths checking it (see UserService.update_user)
+USER_CACHE_COLUMNS = ('id', 'username', 'email', 'is_active', 'is_staff', 'is_superuser')
+
+
+class UserCache:
+    """Cache of the users of authenticated requests, keyed by user id.
+
+    Column values are kept in a small per-worker LRU in front of Redis.
+    ``invalidate`` clears both, other workers drop their local copy after
+    ``local_ttl`` seconds at most. Redis failures fall back to the database.
+    """
+
+    def __init__(self, redis_client: Redis, ttl: int, local_ttl: float, local_size: int):
+        self.redis = redis_client
+        self.ttl = ttl
+        self.local: TTLCache[int, dict[str, Any]] = TTLCache(maxsize=local_size, ttl=local_ttl)
+
+    @staticmethod
+    def get_key(user_id: int) -> str:
+        return f'user-cache:{user_id}'
+
+    async def get(self, user_id: int) -> Optional[dict[str, Any]]:  # noqa: A003
+        data = self.local.get(user_id)
+        if data is not None:
+            metrics.incr('user_cache.local_hit')
+            return data
+
+        try:
+            cached = await self.redis.get(self.get_key(user_id))
+        except RedisError as exc:
+            logger.warning(f'User cache lookup failed: {exc}')
+            cached = None
+
+        if cached is None:
+            metrics.incr('user_cache.miss')
+            return None
+
+        metrics.incr('user_cache.redis_hit')
+        data = json.loads(cached)
+        self.local.set(user_id, data)
+        return data
+
+    async def set(self, user: User) -> None:  # noqa: A003
+        data = {column: getattr(user, column) for column in USER_CACHE_COLUMNS}
+        self.local.set(user.id, data)
+        try:
+            await self.redis.set(self.get_key(user.id), json.dumps(data), ex=self.ttl)
+        except RedisError as exc:
+            logger.warning(f'User cache store failed: {exc}')
+
+    async def invalidate(self, user_id: int) -> None:
+        self.local.pop(user_id)
+        metrics.incr('user_cache.invalidation')
+        try:
+            await self.redis.delete(self.get_key(user_id))
+        except RedisError as exc:
+            logger.warning(f'User cache invalidation failed: {exc}')
+
+
+user_cache = UserCache(
+    redis,
+    ttl=auth_config.USER_CACHE_TTL,
+    local_ttl=auth_config.USER_CACHE_LOCAL_TTL,
+    local_size=auth_config.USER_CACHE_LOCAL_SIZE,
+)
@@ -1,4 +1,4 @@
-from sqlalchemy import Boolean, Integer, String
+from sqlalchemy import Boolean, Index, Integer, String, text
 from sqlalchemy.ext.asyncio import AsyncAttrs
 from sqlalchemy.orm import Mapped, mapped_column, relationship
 
@@ -8,6 +8,10 @@ from src.database import DatabaseModel
 class User(DatabaseModel, AsyncAttrs):
     __tablename__ = 'user'
     __allow_unmapped__ = True
+    __table_args__ = (
+        # usernames are unique regardless of case, lookups go through lower(username)
+        Index('ix_user_username_lower', text('lower(username)'), unique=True),
+    )
 
     id: Mapped[int] = mapped_column(  # noqa
         Integer, primary_key=True, index=True, autoincrement=True,
@@ -1,8 +1,10 @@
 import logging
 from dataclasses import dataclass
-from typing import Optional
+from typing import Any, Optional
 
-from sqlalchemy import or_, select
+from sqlalchemy import func, or_, select
+from sqlalchemy.dialects.postgresql import insert
+from sqlalchemy.orm import make_transient_to_detached
 
 from src.base.repositories import BaseRepository
 from src.users.exceptions import UsernameOrEmailAlreadyExists
@@ -16,7 +18,7 @@ class UserRepository(BaseRepository[User]):
     async def find_for_login(self, search: str) -> User | None:
         result = await self.session.scalar(
             select(User).where(or_(
-                User.username.ilike(search.lower()),
+                func.lower(User.username) == search.lower(),
                 User.email == search,
             )),
         )
@@ -26,17 +28,36 @@ class UserRepository(BaseRepository[User]):
     async def get_by_id(self, user_id: int) -> User | None:
         return await self.session.get(User, user_id) or None
 
+    async def from_cached(self, data: dict[str, Any]) -> User:
+        """Attach a user rebuilt from cached column values to the session without querying it."""
+        user = User(**data)
+        make_transient_to_detached(user)
+        return await self.session.merge(user, load=False)
+
     async def get_by_email(self, email: str) -> User | None:
         return await self.session.scalar(
             select(User).where(User.email == email),
         )
 
+    async def create_if_available(self, user: User) -> User | None:
+        """Insert the user unless its username or email is already taken.
+
+        :return: The created user or None on a conflict.
+        """
+        stmt = (
+            insert(User)
+            .values(username=user.username, email=user.email, password=user.password)
+            .on_conflict_do_nothing()
+            .returning(User)
+        )
+        return await self.session.scalar(stmt)
+
     async def credentials_available(
             self, email: str, username: str, not_by: Optional[int] = None,
     ) -> None:
         stmt = select(User.username, User.email).where(or_(
             User.email == email,
-            User.username.ilike(username.lower()),
+            func.lower(User.username) == username.lower(),
         ))
 
         if not_by is not None:
@@ -5,9 +5,11 @@ from typing import Optional, Type
 from pydantic import EmailStr
 from sqlalchemy.exc import IntegrityError
 
-from src.auth.config import auth_config, pwd_context
+from src.auth.config import auth_config
+from src.auth.hashing import password_hasher
 from src.base.exceptions import HTTP_EXC, NotFound, Unauthorized
 from src.base.repositories import Transaction
+from src.users.cache import user_cache
 from src.users.exceptions import PasswordValidationError, UsernameOrEmailAlreadyExists, UsernameValidationError
 from src.users.models import User
 from src.users.repositories import UserRepository
@@ -26,21 +28,22 @@ class UserService:
             password: str,
             bypass_validation: bool = False,
     ) -> User:
-        async with self.transaction:
-            await self.repository.credentials_available(email=email, username=username)
-
-            if not bypass_validation:
-                await RegisterService.password_validator(username=username, email=email, password=password)
-                await RegisterService.username_validator(username=username)
+        if not bypass_validation:
+            await RegisterService.password_validator(username=username, email=email, password=password)
+            await RegisterService.username_validator(username=username)
 
-            hashed_password = await RegisterService.make_password_hash(password=password)
+        hashed_password = await RegisterService.make_password_hash(password=password)
 
-            user = User(
+        async with self.transaction:
+            user = await self.repository.create_if_available(User(
                 username=username,
                 email=email,
                 password=hashed_password,
-            )
-            await self.repository.create(user)
+            ))
+            if user is None:
+                # only a conflict pays for the second query, to tell which credential is taken
+                await self.repository.credentials_available(email=email, username=username)
+                raise UsernameOrEmailAlreadyExists('username or email already exists')
 
         return user
 
@@ -57,7 +60,9 @@ class UserService:
             user.email = update_data.email
 
         if update_data.password and update_data.old_password:
-            if not await RegisterService.check_password_hash(update_data.old_password, user.password):
+            # users of authenticated requests come from user_cache without the password hash
+            password_hash = await user.awaitable_attrs.password
+            if not await RegisterService.check_password_hash(update_data.old_password, password_hash):
                 raise PasswordValidationError('Old password does not match')
 
             if not auth_config.DISABLE_PASSWORD_VALIDATOR:
@@ -71,6 +76,8 @@ class UserService:
                 await self.repository.update(user)
         except IntegrityError as e:
             raise UsernameOrEmailAlreadyExists('username or email already exists') from e
+        finally:
+            await user_cache.invalidate(user.id)
 
         return user
 
@@ -80,6 +87,17 @@ class UserService:
     async def get_user_by_id(self, user_id: int) -> User | None:
         return await self.repository.get_by_id(user_id=user_id)
 
+    async def get_authenticated_user(self, user_id: int) -> User | None:
+        """Get the user of an authenticated request through ``user_cache``."""
+        data = await user_cache.get(user_id)
+        if data is not None:
+            return await self.repository.from_cached(data)
+
+        user = await self.get_user_by_id(user_id=user_id)
+        if user:
+            await user_cache.set(user)
+        return user
+
     async def get_user_by_email(self, email: str) -> User | None:
         return await self.repository.get_by_email(email=email)
 
@@ -137,10 +155,10 @@ class RegisterService:
 
     @staticmethod
     async def make_password_hash(password: str) -> str:
-        return pwd_context.hash(password)
+        return await password_hasher.hash(password)
 
     @staticmethod
     async def check_password_hash(
             plain_password: str, hashed_password: str,
     ) -> bool:
-        return pwd_context.verify(plain_password, hashed_password)
+        return await password_hasher.verify(plain_password, hashed_password)
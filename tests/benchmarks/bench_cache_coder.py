@@ -0,0 +1,102 @@
+"""Size and encode/decode time of the cache coders on hotel and room listings.
+
+The payloads mimic the cached endpoints: hotel search results with
+Cyrillic names, locations and services, and the rooms of a hotel. No
+services are needed::
+
+    python -m tests.benchmarks.bench_cache_coder --hotels 50 --rounds 2000
+"""
+import argparse
+import time
+from typing import Any
+
+from fastapi_cache.coder import Coder, JsonCoder
+
+from src.cache import OrjsonCoder
+from src.hotels.schemas import HotelRoomDetailedInfo, HotelWithRoomsLeft
+
+SERVICES = ['Бесплатный Wi-Fi', 'Парковка', 'Бассейн', 'Фитнес-центр', 'Кондиционер', 'Спа']
+
+
+class RawOrjsonCoder(OrjsonCoder):
+    compress_min_size = None
+
+
+class CompressedOrjsonCoder(OrjsonCoder):
+    compress_min_size = 0
+
+
+CODERS: dict[str, type[Coder]] = {
+    'json': JsonCoder,
+    'orjson': RawOrjsonCoder,
+    'orjson+zlib': CompressedOrjsonCoder,
+    f'orjson default (zlib from {OrjsonCoder.compress_min_size} B)': OrjsonCoder,
+}
+
+
+def make_hotels(count: int) -> list[dict[str, Any]]:
+    return [
+        HotelWithRoomsLeft(
+            id=i,
+            name=f'Отель Алтай Резорт {i}',
+            location='Республика Алтай, Турочакский район, село Артыбаш, улица Телецкая, 44',
+            image_id=i,
+            services=SERVICES[:i % len(SERVICES) + 1],
+            rooms_count=30,
+            rooms_left=i % 30,
+        ).model_dump()
+        for i in range(count)
+    ]
+
+
+def make_rooms(count: int) -> list[dict[str, Any]]:
+    return [
+        HotelRoomDetailedInfo(
+            id=i,
+            hotel_id=1,
+            name=f'Номер Люкс {i}',
+            description='Просторный номер с видом на Телецкое озеро, двуспальной кроватью и балконом',
+            services=SERVICES[:i % len(SERVICES) + 1],
+            price=7000,
+            image_id=i,
+            quantity=5,
+            total_cost=14000,
+            rooms_left=i % 5,
+        ).model_dump()
+        for i in range(count)
+    ]
+
+
+def measure(payload_name: str, payload: Any, rounds: int) -> None:
+    print(payload_name)
+    for name, coder in CODERS.items():
+        encoded = coder.encode(payload)
+        size = len(encoded.encode('utf-8') if isinstance(encoded, str) else encoded)
+
+        start = time.perf_counter()
+        for _ in range(rounds):
+            coder.encode(payload)
+        encode_time = (time.perf_counter() - start) / rounds
+
+        start = time.perf_counter()
+        for _ in range(rounds):
+            coder.decode(encoded)
+        decode_time = (time.perf_counter() - start) / rounds
+
+        print(f'  {name:<36} {size:8} B   encode {encode_time * 1e6:8.1f} us   decode {decode_time * 1e6:8.1f} us')
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--hotels', type=int, default=50)
+    parser.add_argument('--rooms', type=int, default=10)
+    parser.add_argument('--rounds', type=int, default=2000)
+    args = parser.parse_args()
+
+    measure(f'hotel search, {args.hotels} hotels', make_hotels(args.hotels), args.rounds)
+    measure(f'hotel rooms, {args.rooms} rooms', make_rooms(args.rooms), args.rounds)
+    measure('single hotel', make_hotels(1)[0], args.rounds)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,57 @@
+"""Throughput of ``get_current_user`` with and without the verified-token cache.
+
+The user is served from the user cache, so only token verification and
+the dependency itself are measured and no database is needed::
+
+    python -m tests.benchmarks.bench_current_user --calls 20000
+"""
+import argparse
+import asyncio
+import time
+
+from migrations import __models__  # noqa
+from src.auth.dependencies import get_auth_service, get_current_user
+from src.auth.jwt import create_access_token
+from src.auth.services import verified_tokens
+from src.database import context_db_session
+from src.users.cache import USER_CACHE_COLUMNS, user_cache
+from src.users.dependencies import get_user_service
+from src.users.models import User
+
+USER = User(
+    id=1, username='bench_user', password='', email='bench_user@example.org',
+    is_active=True, is_staff=False, is_superuser=False,
+)
+
+
+async def measure(name: str, calls: int, clear_tokens: bool) -> None:
+    token = create_access_token(USER)
+
+    async with context_db_session() as session:
+        auth_service = await get_auth_service(await get_user_service(session))
+
+        start = time.perf_counter()
+        for _ in range(calls):
+            if clear_tokens:
+                verified_tokens.clear()
+            await get_current_user(auth_service, token)
+            session.expunge_all()
+        total = time.perf_counter() - start
+
+    print(f'{name:<22} {calls / total:10.0f} calls/s   {total / calls * 1e6:8.1f} us/call')
+
+
+async def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--calls', type=int, default=20000)
+    args = parser.parse_args()
+
+    user_cache.local.ttl = float('inf')
+    user_cache.local.set(USER.id, {column: getattr(USER, column) for column in USER_CACHE_COLUMNS})
+
+    await measure('jwt decode every call', args.calls, clear_tokens=True)
+    await measure('verified-token cache', args.calls, clear_tokens=False)
+
+
+if __name__ == '__main__':
+    asyncio.run(main())
@@ -0,0 +1,88 @@
+"""Latency of an unrelated hotels request while logins are being processed.
+
+Measures ``GET /api/v1/hotels/{id}`` (bypassing the response cache) alone
+and then during a storm of concurrent logins on the same event loop. With
+bcrypt running on the event loop the second number grows with every
+login; with the bounded hashing pool it stays flat. Requires the database
+services and the usual ``.env`` settings::
+
+    python -m tests.benchmarks.bench_login_storm --logins 50 --requests 50
+"""
+import argparse
+import asyncio
+import statistics
+import time
+
+from httpx import AsyncClient
+from sqlalchemy import select
+
+from src.app import app
+from src.database import context_db_session
+from src.hotels.models import Hotel
+from src.users.dependencies import get_user_service
+from src.users.models import User
+from src.users.services import RegisterService
+
+USERNAME = 'bench_login_storm'
+PASSWORD = 'Bench_password123'
+
+
+async def prepare() -> int:
+    async with context_db_session() as session:
+        hotel_id = await session.scalar(select(Hotel.id).limit(1))
+        if hotel_id is None:
+            raise SystemExit('At least one hotel is required')
+
+        user_service = await get_user_service(session)
+        if not await user_service.get_user_for_login(USERNAME):
+            user = User(
+                username=USERNAME,
+                email=f'{USERNAME}@example.org',
+                password=await RegisterService.make_password_hash(PASSWORD),
+                is_active=True,
+            )
+            await user_service.repository.create(user, commit=True)
+    return hotel_id
+
+
+async def measure_hotels(client: AsyncClient, hotel_id: int, requests: int) -> list[float]:
+    timings = []
+    for _ in range(requests):
+        start = time.perf_counter()
+        response = await client.get(f'/api/v1/hotels/{hotel_id}', headers={'Cache-Control': 'no-cache'})
+        timings.append((time.perf_counter() - start) * 1000)
+        response.raise_for_status()
+    return sorted(timings)
+
+
+async def login(client: AsyncClient) -> int:
+    response = await client.post('/api/v1/auth/login', data={'username': USERNAME, 'password': PASSWORD})
+    return response.status_code
+
+
+def report(name: str, timings: list[float]) -> None:
+    print(
+        f'{name:<24} mean {statistics.mean(timings):8.2f} ms   '
+        f'p50 {timings[len(timings) // 2]:8.2f} ms   p95 {timings[int(len(timings) * 0.95)]:8.2f} ms',
+    )
+
+
+async def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--logins', type=int, default=50)
+    parser.add_argument('--requests', type=int, default=50)
+    args = parser.parse_args()
+
+    hotel_id = await prepare()
+    async with AsyncClient(app=app, base_url='http://bench') as client:
+        report('hotels, idle', await measure_hotels(client, hotel_id, args.requests))
+
+        logins = asyncio.gather(*(login(client) for _ in range(args.logins)))
+        report('hotels, during logins', await measure_hotels(client, hotel_id, args.requests))
+
+        statuses = await logins
+        print(f'logins: {statuses.count(200)} ok, {len(statuses) - statuses.count(200)} rejected')
+
+
+if __name__ == '__main__':
+    asyncio.run(main())
@@ -0,0 +1,76 @@
+"""Per-request latency of the auth Mongo lookups.
+
+Compares a blocking client created for every request (the way
+``get_auth_service`` used to work) with the shared asyncio client. With
+``--concurrency`` above 1 the requests run concurrently on one event loop,
+which shows the loop being stalled by the blocking driver. Requires running
+Mongo and the usual ``.env`` settings::
+
+    python -m tests.benchmarks.bench_mongo_client --requests 200 --concurrency 10
+"""
+import argparse
+import asyncio
+import statistics
+import time
+from collections.abc import Awaitable, Callable
+
+from pymongo import MongoClient
+
+from src.auth.models import CodeTypes, VerificationCode
+from src.auth.repositories import VerificationCodeRepository
+from src.config import mongo_settings
+from src.database import close_mongo_client, get_mongo_database
+
+QUERY = {'user_id': -1, 'code_type': CodeTypes.ACTIVATION.value}
+
+
+async def request_with_new_client() -> None:
+    client = MongoClient(**mongo_settings.MONGODB_AUTHPARAMS)
+    try:
+        client.get_database(mongo_settings.MONGODB_DB).get_collection(
+            VerificationCode.Meta.__collection__,
+        ).find_one(QUERY)
+    finally:
+        # the old dependency never closed it, close here to keep the run bounded
+        client.close()
+
+
+async def request_with_shared_client() -> None:
+    await VerificationCodeRepository(database=get_mongo_database()).find_one(**QUERY)
+
+
+async def measure(name: str, request: Callable[[], Awaitable[None]], requests: int, concurrency: int) -> None:
+    timings = []
+    semaphore = asyncio.Semaphore(concurrency)
+
+    async def timed_request() -> None:
+        async with semaphore:
+            start = time.perf_counter()
+            await request()
+            timings.append((time.perf_counter() - start) * 1000)
+
+    start = time.perf_counter()
+    await asyncio.gather(*(timed_request() for _ in range(requests)))
+    total = time.perf_counter() - start
+
+    timings.sort()
+    print(
+        f'{name:<20} mean {statistics.mean(timings):8.2f} ms   '
+        f'p50 {timings[len(timings) // 2]:8.2f} ms   p95 {timings[int(len(timings) * 0.95)]:8.2f} ms   '
+        f'{requests / total:8.1f} req/s',
+    )
+
+
+async def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--requests', type=int, default=200)
+    parser.add_argument('--concurrency', type=int, default=1)
+    args = parser.parse_args()
+
+    await measure('client per request', request_with_new_client, args.requests, args.concurrency)
+    await measure('shared async client', request_with_shared_client, args.requests, args.concurrency)
+    close_mongo_client()
+
+
+if __name__ == '__main__':
+    asyncio.run(main())
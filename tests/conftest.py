@@ -12,7 +12,7 @@ from typing import List, Optional
 
 import pytest
 from httpx import AsyncClient
-from sqlalchemy import delete
+from sqlalchemy import delete, text
 from sqlalchemy.ext.asyncio import AsyncSession
 
 from migrations import __models__  # noqa
@@ -21,8 +21,11 @@ from src.auth.dependencies import get_auth_service
 from src.auth.jwt import create_access_token
 from src.auth.services import AuthService, RegisterService
 from src.auth.models import EmailCodeSent, VerificationCode
+from src.bookings.models import Booking, RoomInventory
+from src.cache import redis
 from src.config import app_settings, mongo_settings
 from src.database import DatabaseModel, context_db_session, engine
+from src.hotels.models import Hotel, Room
 from src.users.dependencies import get_user_service
 from src.users.models import User
 from src.users.services import UserService
@@ -33,6 +36,10 @@ debugger = logging.getLogger('debugger')
 
 async def perform_clean_db(db_session: Optional[AsyncSession] = None, mongo_session: Optional[Database] = None):
     if db_session is not None:
+        await db_session.execute(delete(Booking))
+        await db_session.execute(delete(RoomInventory))
+        await db_session.execute(delete(Room))
+        await db_session.execute(delete(Hotel))
         await db_session.execute(delete(User))
         await db_session.commit()
 
@@ -42,6 +49,10 @@ async def perform_clean_db(db_session: Optional[AsyncSession] = None, mongo_sess
         code_collection.delete_many({})
         verification_collection.delete_many({})
 
+    auth_keys = [key async for key in redis.scan_iter('auth:*')]
+    if auth_keys:
+        await redis.delete(*auth_keys)
+
 
 @pytest.fixture(scope='session', autouse=True)
 async def prepare_database():
@@ -49,6 +60,8 @@ async def prepare_database():
     os.environ['SINGLE_CLEAN'] = '0'
 
     async with engine.begin() as conn:
+        await conn.execute(text('CREATE EXTENSION IF NOT EXISTS btree_gist'))
+        await conn.execute(text('CREATE EXTENSION IF NOT EXISTS pg_trgm'))
         await conn.run_sync(DatabaseModel.metadata.drop_all)
         await conn.run_sync(DatabaseModel.metadata.create_all)
 
@@ -113,3 +126,5 @@ def override_settings(target, attr, value):
 from tests.fixtures.users       import *    # noqa
 from tests.fixtures.auth        import *    # noqa
 from tests.fixtures.client      import *    # noqa
+from tests.fixtures.cache       import *    # noqa
+from tests.fixtures.hotels      import *    # noqa
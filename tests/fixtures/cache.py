@@ -0,0 +1,16 @@
+import pytest
+from fastapi_cache import FastAPICache
+
+from src.cache import KeyBuilderCache, TaggedRedisBackend, cache_redis, redis
+
+
+@pytest.fixture
+async def cache_backend() -> TaggedRedisBackend:
+    backend = TaggedRedisBackend(cache_redis)
+    FastAPICache.init(
+        backend=backend,
+        prefix='test-cache',
+        key_builder=KeyBuilderCache.key_builder,
+    )
+    yield backend
+    await redis.flushdb()
@@ -0,0 +1,60 @@
+import datetime
+from typing import List
+
+import pytest
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from src.base.utils import get_utcnow
+from src.bookings.dependencies import get_booking_service
+from src.bookings.services import BookingService
+from src.hotels.dependencies import get_hotel_service
+from src.hotels.models import Hotel, Room
+from src.hotels.services import HotelService
+
+
+@pytest.fixture
+async def hotels(session: AsyncSession) -> List[Hotel]:
+    hotels = [
+        Hotel(
+            name='Алтай Резорт',
+            location='Республика Алтай, Турочакский район',
+            services=['Wi-Fi', 'Парковка'],
+            image_id=1,
+        ),
+        Hotel(
+            name='Сочи Парк',
+            location='Краснодарский край, Сочи',
+            services=['Бассейн'],
+            image_id=2,
+        ),
+    ]
+    session.add_all(hotels)
+    await session.commit()
+    return hotels
+
+
+@pytest.fixture
+async def rooms(session: AsyncSession, hotels: List[Hotel]) -> List[Room]:
+    rooms = [
+        Room(hotel_id=hotels[0].id, name='Стандарт', description='', price=3000, quantity=2, image_id=1),
+        Room(hotel_id=hotels[0].id, name='Люкс', description='', price=7000, quantity=1, image_id=2),
+        Room(hotel_id=hotels[1].id, name='Стандарт', description='', price=4000, quantity=3, image_id=3),
+    ]
+    session.add_all(rooms)
+    await session.commit()
+    return rooms
+
+
+@pytest.fixture
+def tomorrow() -> datetime.date:
+    return get_utcnow().date() + datetime.timedelta(days=1)
+
+
+@pytest.fixture
+async def hotel_service(session: AsyncSession) -> HotelService:
+    return await get_hotel_service(session)
+
+
+@pytest.fixture
+async def booking_service(session: AsyncSession) -> BookingService:
+    return await get_booking_service(session)
@@ -0,0 +1,43 @@
+import asyncio
+
+from src.auth.hashing import PasswordHasher
+from src.base.exceptions import ServiceUnavailable
+
+
+class TestPasswordHasher:
+    async def test_hash_and_verify(self):
+        hasher = PasswordHasher(workers=2, queue_timeout=5)
+
+        password_hash = await hasher.hash('Password123')
+
+        assert await hasher.verify('Password123', password_hash)
+        assert not await hasher.verify('Password1234', password_hash)
+        hasher.shutdown()
+
+    async def test_does_not_block_event_loop(self):
+        hasher = PasswordHasher(workers=2, queue_timeout=5)
+        ticks = 0
+
+        async def ticker():
+            nonlocal ticks
+            while True:
+                await asyncio.sleep(0.005)
+                ticks += 1
+
+        task = asyncio.create_task(ticker())
+        await hasher.hash('Password123')
+        task.cancel()
+
+        assert ticks >= 3
+        hasher.shutdown()
+
+    async def test_queue_timeout(self):
+        hasher = PasswordHasher(workers=1, queue_timeout=0.01)
+
+        results = await asyncio.gather(
+            hasher.hash('Password123'), hasher.hash('Password123'), return_exceptions=True,
+        )
+
+        assert isinstance(results[0], str)
+        assert isinstance(results[1], ServiceUnavailable)
+        hasher.shutdown()
@@ -0,0 +1,38 @@
+import asyncio
+
+from src.auth.models import CodeTypes
+from src.auth.repositories import RedisEmailCodeSentRepository, RedisVerificationCodeRepository
+from src.cache import redis
+
+
+class TestRedisVerificationCodeRepository:
+    async def test_code_expires_natively(self):
+        repository = RedisVerificationCodeRepository(redis=redis)
+
+        code = await repository.generate_verification_code(1, CodeTypes.ACTIVATION)
+
+        assert await redis.ttl(repository.get_code_key(code.code)) > 0
+        assert await redis.ttl(repository.get_user_code_key(1, CodeTypes.ACTIVATION)) > 0
+        assert (await repository.get_valid_code(code.code)).user_id == 1
+
+    async def test_delete(self):
+        repository = RedisVerificationCodeRepository(redis=redis)
+        code = await repository.generate_verification_code(1, CodeTypes.RECOVERY)
+
+        await repository.delete(code)
+
+        assert await repository.get_valid_code(code.code) is None
+        assert await repository.check_code_exists(1, CodeTypes.RECOVERY) is None
+
+
+class TestRedisEmailCodeSentRepository:
+    async def test_concurrent_sends_are_limited(self):
+        repository = RedisEmailCodeSentRepository(redis=redis)
+
+        results = await asyncio.gather(*(
+            repository.acquire_send_slot('user@example.org', CodeTypes.ACTIVATION, 60) for _ in range(5)
+        ))
+
+        assert results.count(True) == 1
+        assert await repository.acquire_send_slot('user@example.org', CodeTypes.RECOVERY, 60)
+        assert 0 < await redis.ttl(repository.get_key('user@example.org', CodeTypes.ACTIVATION)) <= 60
@@ -3,14 +3,13 @@ from typing import List
 
 import pytest
 from jose import JWTError
-from pymongo.database import Database
 from sqlalchemy import select
 
 from src.auth.config import auth_config
 from src.auth.exceptions import (BadCredentialsException, BadTokenException, EmailRateLimit, InvalidEmailCode,
                                  UserForEmailCodeNotFound, UserNotActiveException)
 from src.auth.jwt import TokenType, create_access_token, create_refresh_token
-from src.auth.models import CodeTypes, EmailCodeSent
+from src.auth.models import CodeTypes
 from src.auth.schemas import ActivateUserData, RecoveryUserData
 from src.auth.services import AuthService
 from src.users.exceptions import PasswordValidationError
@@ -232,15 +231,12 @@ class TestVerificationCode:
         with pytest.raises(EmailRateLimit):
             await auth_service._find_or_create_code(fake_user.email, CodeTypes.ACTIVATION)
 
-        assert len(list(auth_service.verification_code_repository.find_all({'user_id': fake_user.id}))) == 1
+        existing = await auth_service.verification_code_repository.check_code_exists(fake_user.id, CodeTypes.ACTIVATION)
+        assert existing.code == code.code
 
-    async def test_verification_code_no_duplicates(
-            self, auth_service: AuthService, fake_user: User, mongo_session: Database,
-    ):
+    @override_settings(auth_config, 'EMAIL_CODE_SEND_RATE_LIMIT', 0)
+    async def test_verification_code_no_duplicates(self, auth_service: AuthService, fake_user: User):
         code = await auth_service._find_or_create_code(fake_user.email, CodeTypes.ACTIVATION)
-        mongo_session.get_collection(EmailCodeSent.Meta.__collection__).delete_many({
-            'email': fake_user.email,
-        })
         second_code = await auth_service._find_or_create_code(fake_user.email, CodeTypes.ACTIVATION)
 
         assert code.code == second_code.code
@@ -254,7 +250,9 @@ class TestVerificationCode:
         assert recovery_code.code_type == CodeTypes.RECOVERY
         assert activation_code.code != recovery_code.code
 
-        assert len(list(auth_service.email_code_repository.find_all({'email': fake_user.email}))) == 2
+        repository = auth_service.verification_code_repository
+        assert (await repository.check_code_exists(fake_user.id, CodeTypes.ACTIVATION)).code == activation_code.code
+        assert (await repository.check_code_exists(fake_user.id, CodeTypes.RECOVERY)).code == recovery_code.code
 
     async def test_activate_user_success(self, auth_service: AuthService, fake_user: User):
         activation_code = await auth_service._find_or_create_code(fake_user.email, CodeTypes.ACTIVATION)
@@ -346,7 +344,8 @@ class TestVerificationCode:
         assert await RegisterService.check_password_hash(new_pass, user.password)
         assert not await RegisterService.check_password_hash(new_pass, password_hash_before)
 
-        assert len(list(auth_service.verification_code_repository.find_all({'user_id': fake_user.id}))) == 0
+        repository = auth_service.verification_code_repository
+        assert await repository.check_code_exists(fake_user.id, CodeTypes.RECOVERY) is None
 
     async def test_recovery_user_same_password(self, auth_service: AuthService):
         new_pass = 'password'
@@ -0,0 +1,105 @@
+import datetime
+
+import pytest
+from sqlalchemy import select
+
+from src.auth.config import auth_config
+from src.auth.exceptions import InvalidEmailCode
+from src.auth.models import CodeTypes
+from src.auth.schemas import ActivateUserData, RecoveryUserData
+from src.auth.services import AuthService
+from src.users.models import User
+from src.users.services import RegisterService
+from tests.conftest import override_settings
+
+
+class TestSignedEmailCodes:
+
+    @staticmethod
+    async def deactivate(auth_service: AuthService, user: User) -> None:
+        user.is_active = False
+        await auth_service.user_service.repository.update(user, commit=True)
+
+    @override_settings(auth_config, 'EMAIL_CODE_MODE', 'signed')
+    async def test_code_not_stored(self, auth_service: AuthService, fake_user: User):
+        code = await auth_service._find_or_create_code(fake_user.email, CodeTypes.ACTIVATION)
+
+        assert code.user_id == fake_user.id
+        assert code.code_type == CodeTypes.ACTIVATION
+        assert await auth_service.verification_code_repository.check_code_exists(
+            fake_user.id, CodeTypes.ACTIVATION,
+        ) is None
+
+    @override_settings(auth_config, 'EMAIL_CODE_MODE', 'signed')
+    async def test_activate_user_success(self, auth_service: AuthService, fake_user: User):
+        await self.deactivate(auth_service, fake_user)
+        code = await auth_service._find_or_create_code(fake_user.email, CodeTypes.ACTIVATION)
+
+        await auth_service.activate_user(ActivateUserData(code=code.code))
+
+        stmt = select(User).where(User.id == fake_user.id)
+        user = await auth_service.user_service.repository.session.scalar(stmt)
+        assert user.is_active is True
+
+    @override_settings(auth_config, 'EMAIL_CODE_MODE', 'signed')
+    async def test_activate_user_code_reused(self, auth_service: AuthService, fake_user: User):
+        await self.deactivate(auth_service, fake_user)
+        code = await auth_service._find_or_create_code(fake_user.email, CodeTypes.ACTIVATION)
+
+        await auth_service.activate_user(ActivateUserData(code=code.code))
+        await self.deactivate(auth_service, fake_user)
+
+        # the user state changed since the code was issued
+        with pytest.raises(InvalidEmailCode):
+            await auth_service.activate_user(ActivateUserData(code=code.code))
+
+    @override_settings(auth_config, 'EMAIL_CODE_MODE', 'signed')
+    async def test_activate_user_code_expired(self, auth_service: AuthService, fake_user: User, mocker):
+        await self.deactivate(auth_service, fake_user)
+
+        mocker.patch('src.auth.jwt.get_utcnow', return_value=datetime.datetime(year=1970, month=1, day=1))
+        code = await auth_service._find_or_create_code(fake_user.email, CodeTypes.ACTIVATION)
+        mocker.patch('src.auth.jwt.get_utcnow', return_value=datetime.datetime.utcnow())
+
+        with pytest.raises(InvalidEmailCode):
+            await auth_service.activate_user(ActivateUserData(code=code.code))
+
+    @override_settings(auth_config, 'EMAIL_CODE_MODE', 'signed')
+    async def test_activate_user_code_wrong_type(self, auth_service: AuthService, fake_user: User):
+        await self.deactivate(auth_service, fake_user)
+        code = await auth_service._find_or_create_code(fake_user.email, CodeTypes.RECOVERY)
+
+        with pytest.raises(InvalidEmailCode):
+            await auth_service.activate_user(ActivateUserData(code=code.code))
+
+    @pytest.mark.parametrize('code', ['wrong_code', 'a.b.c'])
+    @override_settings(auth_config, 'EMAIL_CODE_MODE', 'signed')
+    async def test_activate_user_code_malformed(self, auth_service: AuthService, fake_user: User, code):
+        with pytest.raises(InvalidEmailCode):
+            await auth_service.activate_user(ActivateUserData(code=code))
+
+    @override_settings(auth_config, 'EMAIL_CODE_MODE', 'signed')
+    async def test_activate_user_code_forged(self, auth_service: AuthService, fake_user: User):
+        await self.deactivate(auth_service, fake_user)
+        code = await auth_service._find_or_create_code(fake_user.email, CodeTypes.ACTIVATION)
+
+        header, payload, signature = code.code.split('.')
+        forged = f'{header}.{payload}.{signature[::-1]}'
+
+        with pytest.raises(InvalidEmailCode):
+            await auth_service.activate_user(ActivateUserData(code=forged))
+
+    @override_settings(auth_config, 'DISABLE_PASSWORD_VALIDATOR', True)
+    @override_settings(auth_config, 'EMAIL_CODE_MODE', 'signed')
+    async def test_recovery_user_success(self, auth_service: AuthService, fake_user: User):
+        code = await auth_service._find_or_create_code(fake_user.email, CodeTypes.RECOVERY)
+
+        await auth_service.recovery_user(RecoveryUserData(code=code.code, new_password='new_pass'))
+
+        stmt = select(User).where(User.id == fake_user.id)
+        user = await auth_service.user_service.repository.session.scalar(stmt)
+        assert await RegisterService.check_password_hash('new_pass', user.password)
+
+        # the password hash is part of the code, so it cannot be used again
+        with pytest.raises(InvalidEmailCode):
+            await auth_service.recovery_user(RecoveryUserData(code=code.code, new_password='other_pass'))
@@ -0,0 +1,46 @@
+import datetime
+from typing import List
+
+import pytest
+from jose import JWTError
+
+from src.auth.jwt import TokenType, create_access_token
+from src.auth.services import AuthService, verified_tokens
+from src.base.utils import get_utcnow
+from src.users.models import User
+
+
+@pytest.fixture(autouse=True)
+def clean_verified_tokens():
+    verified_tokens.clear()
+    yield
+    verified_tokens.clear()
+
+
+class TestVerifiedTokenCache:
+    async def test_repeat_token_is_not_decoded(self, users: List[User], mocker):
+        token = create_access_token(users[0])
+        decode = mocker.spy(AuthService._parse_token.__globals__['jwt'], 'decode')
+
+        first = AuthService._parse_token(token, TokenType.ACCESS)
+        second = AuthService._parse_token(token, TokenType.ACCESS)
+
+        assert first == second
+        assert first['user_id'] == users[0].id
+        assert decode.call_count == 1
+
+    async def test_cached_token_expires(self, users: List[User], mocker):
+        token = create_access_token(users[0])
+        AuthService._parse_token(token, TokenType.ACCESS)
+
+        mocker.patch('src.auth.services.get_utcnow', return_value=get_utcnow() + datetime.timedelta(days=365))
+
+        with pytest.raises(JWTError):
+            AuthService._parse_token(token, TokenType.ACCESS)
+
+    async def test_token_type_is_part_of_key(self, users: List[User]):
+        token = create_access_token(users[0])
+        AuthService._parse_token(token, TokenType.ACCESS)
+
+        with pytest.raises(JWTError):
+            AuthService._parse_token(token, TokenType.REFRESH)
@@ -0,0 +1,45 @@
+from src.base.lru import TTLCache
+
+
+class FakeTimer:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self) -> float:
+        return self.now
+
+
+class TestTTLCache:
+    def test_evicts_least_recently_used(self):
+        cache = TTLCache(maxsize=2, ttl=10)
+        cache.set('a', 1)
+        cache.set('b', 2)
+        assert cache.get('a') == 1
+
+        cache.set('c', 3)
+
+        assert cache.get('b') is None
+        assert cache.get('a') == 1
+        assert cache.get('c') == 3
+        assert len(cache) == 2
+
+    def test_entries_expire(self):
+        timer = FakeTimer()
+        cache = TTLCache(maxsize=2, ttl=10, timer=timer)
+        cache.set('a', 1)
+        cache.set('b', 2, ttl=30)
+
+        timer.now = 10
+        assert cache.get('a') is None
+        assert cache.get('b') == 2
+
+        timer.now = 30
+        assert 'b' not in cache
+
+    def test_pop(self):
+        cache = TTLCache(maxsize=2, ttl=10)
+        cache.set('a', 1)
+
+        assert cache.pop('a') == 1
+        assert cache.pop('a') is None
+        assert len(cache) == 0
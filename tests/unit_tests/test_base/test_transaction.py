@@ -0,0 +1,91 @@
+import asyncio
+
+import pytest
+from sqlalchemy import func, select
+from sqlalchemy.exc import DBAPIError
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from src.base.repositories import Transaction
+from src.config import db_settings
+from src.database import context_db_session
+from src.hotels.models import Hotel
+from src.metrics import metrics
+from tests.conftest import override_settings
+
+
+class FakeDriverError(Exception):
+    def __init__(self, sqlstate: str):
+        super().__init__(sqlstate)
+        self.sqlstate = sqlstate
+
+
+def make_error(sqlstate: str) -> DBAPIError:
+    return DBAPIError('SELECT 1', {}, FakeDriverError(sqlstate))
+
+
+class TestTransactionRun:
+    @pytest.mark.parametrize('sqlstate', ['40001', '40P01'])
+    @override_settings(db_settings, 'TRANSACTION_RETRY_DELAY', 0)
+    async def test_retryable_error_replayed(self, session: AsyncSession, sqlstate: str):
+        attempts = []
+        retries = metrics.get('transaction.retry')
+
+        async def unit_of_work() -> str:
+            attempts.append(1)
+            if len(attempts) < 3:
+                raise make_error(sqlstate)
+            return 'done'
+
+        assert await Transaction(session=session).run(unit_of_work) == 'done'
+        assert len(attempts) == 3
+        assert metrics.get('transaction.retry') == retries + 2
+
+    @override_settings(db_settings, 'TRANSACTION_RETRY_DELAY', 0)
+    async def test_give_up(self, session: AsyncSession):
+        attempts = []
+        give_ups = metrics.get('transaction.give_up')
+
+        async def unit_of_work() -> None:
+            attempts.append(1)
+            raise make_error('40001')
+
+        with pytest.raises(DBAPIError):
+            await Transaction(session=session).run(unit_of_work, max_retries=2)
+        assert len(attempts) == 3
+        assert metrics.get('transaction.give_up') == give_ups + 1
+
+    async def test_other_errors_not_replayed(self, session: AsyncSession):
+        attempts = []
+
+        async def unit_of_work() -> None:
+            attempts.append(1)
+            raise make_error('23505')
+
+        with pytest.raises(DBAPIError):
+            await Transaction(session=session).run(unit_of_work)
+        assert len(attempts) == 1
+
+    async def test_serialization_failure_replayed(self, session: AsyncSession):
+        reads = 0
+        both_read = asyncio.Event()
+
+        async def add_hotel() -> None:
+            async with context_db_session() as own_session:
+                async def unit_of_work() -> None:
+                    nonlocal reads
+                    count = await own_session.scalar(select(func.count()).select_from(Hotel))
+                    reads += 1
+                    if reads == 2:
+                        both_read.set()
+                    # the first attempts of both transactions read before either writes
+                    await both_read.wait()
+                    own_session.add(Hotel(name=f'hotel {count}', location='', services=[], image_id=1))
+
+                await Transaction(session=own_session, isolation_level='SERIALIZABLE').run(unit_of_work)
+
+        retries = metrics.get('transaction.retry')
+        await asyncio.gather(add_hotel(), add_hotel())
+
+        names = await session.scalars(select(Hotel.name))
+        assert sorted(names) == ['hotel 0', 'hotel 1']
+        assert metrics.get('transaction.retry') > retries
@@ -0,0 +1,63 @@
+import asyncio
+import datetime
+from typing import List
+
+import pytest
+from sqlalchemy import func, select
+
+from src.bookings.dependencies import get_booking_service
+from src.bookings.exceptions import NoRoomsAvailable
+from src.bookings.models import Booking
+from src.bookings.schemas import BookingCreateData
+from src.database import context_db_session
+from src.hotels.models import Room
+from src.users.models import User
+
+PARALLEL_BOOKINGS = 8
+
+
+async def book_in_own_session(user: User, booking_data: BookingCreateData) -> Booking:
+    async with context_db_session() as session:
+        booking_service = await get_booking_service(session)
+        return await booking_service.add_booking(user, booking_data)
+
+
+@pytest.mark.usefixtures('cache_backend')
+class TestConcurrentBooking:
+    @pytest.mark.parametrize('room_index', [1, 2])
+    async def test_parallel_bookings_do_not_overbook(
+            self, session, fake_user: User, rooms: List[Room], tomorrow: datetime.date, room_index: int,
+    ):
+        room = rooms[room_index]
+        booking_data = BookingCreateData(
+            room_id=room.id, date_from=tomorrow, date_to=tomorrow + datetime.timedelta(days=2),
+        )
+
+        results = await asyncio.gather(
+            *[book_in_own_session(fake_user, booking_data) for _ in range(PARALLEL_BOOKINGS)],
+            return_exceptions=True,
+        )
+        for result in results:
+            # e.g. a locking query Postgres rejects, instead of a bare count mismatch below
+            if isinstance(result, Exception) and not isinstance(result, NoRoomsAvailable):
+                raise result
+
+        booked = [result for result in results if isinstance(result, Booking)]
+        rejected = [result for result in results if isinstance(result, NoRoomsAvailable)]
+        assert len(booked) == room.quantity
+        assert len(rejected) == PARALLEL_BOOKINGS - room.quantity
+
+        count = await session.scalar(select(func.count()).select_from(Booking).where(Booking.room_id == room.id))
+        assert count == room.quantity
+
+    async def test_parallel_bookings_of_different_rooms(
+            self, session, fake_user: User, rooms: List[Room], tomorrow: datetime.date,
+    ):
+        results = await asyncio.gather(*[
+            book_in_own_session(fake_user, BookingCreateData(
+                room_id=room.id, date_from=tomorrow, date_to=tomorrow + datetime.timedelta(days=1),
+            ))
+            for room in rooms
+        ])
+
+        assert sorted(booking.room_id for booking in results) == sorted(room.id for room in rooms)
@@ -0,0 +1,146 @@
+import dataclasses
+import datetime
+import time
+from typing import List
+
+import pytest
+from fastapi import status
+from fastapi_cache import FastAPICache
+from httpx import AsyncClient
+
+from src.bookings.exceptions import HoldNotFound, NoRoomsAvailable
+from src.bookings.holds import HoldStore, hold_store
+from src.bookings.schemas import BookingCreateData, HoldCreateData
+from src.bookings.services import BookingService
+from src.cache import LOCK_KEY_SUFFIX, RESPONSE_KEY_SUFFIX, KeyBuilderCache, redis
+from src.config import booking_hold_settings
+from src.hotels.models import Room
+from src.hotels.routers.rooms import get_rooms_for_hotel
+from src.users.models import User
+
+
+class FakeTimer:
+    def __init__(self):
+        self.now = time.time()
+
+    def __call__(self) -> float:
+        return self.now
+
+
+def make_hold_data(room: Room, date_from: datetime.date, nights: int, units: int = 1) -> HoldCreateData:
+    return HoldCreateData(
+        room_id=room.id, date_from=date_from, date_to=date_from + datetime.timedelta(days=nights), units=units,
+    )
+
+
+def make_booking_data(room: Room, date_from: datetime.date, nights: int, **kwargs) -> BookingCreateData:
+    return BookingCreateData(
+        room_id=room.id, date_from=date_from, date_to=date_from + datetime.timedelta(days=nights), **kwargs,
+    )
+
+
+async def get_rooms_entry_key() -> str:
+    pattern = f'{FastAPICache.get_prefix()}:clearable-get_rooms_for_hotel:*'
+    keys = [key async for key in redis.scan_iter(pattern)
+            if not key.endswith((RESPONSE_KEY_SUFFIX, LOCK_KEY_SUFFIX))]
+    assert len(keys) == 1
+    return keys[0]
+
+
+def with_holds(booking_service: BookingService, holds: HoldStore) -> BookingService:
+    return dataclasses.replace(booking_service, hotels_service=dataclasses.replace(
+        booking_service.hotels_service, holds=holds,
+    ))
+
+
+@pytest.mark.usefixtures('cache_backend')
+class TestRoomHolds:
+    async def test_hold_converts_into_booking(
+            self, booking_service: BookingService, fake_user: User, superuser: User, rooms: List[Room],
+            tomorrow: datetime.date,
+    ):
+        lux = rooms[1]
+        hold = await booking_service.add_hold(fake_user, make_hold_data(lux, tomorrow, 2))
+
+        with pytest.raises(NoRoomsAvailable):
+            await booking_service.add_booking(superuser, make_booking_data(lux, tomorrow, 1))
+        with pytest.raises(HoldNotFound):
+            await booking_service.add_booking(superuser, make_booking_data(lux, tomorrow, 1, hold_id=hold.id))
+
+        booking = await booking_service.add_booking(fake_user, make_booking_data(lux, tomorrow, 2, hold_id=hold.id))
+
+        assert booking.room_id == lux.id
+        assert await hold_store.get_room_holds(lux.id) == []
+
+    async def test_hold_limited_by_availability(
+            self, booking_service: BookingService, fake_user: User, rooms: List[Room], tomorrow: datetime.date,
+    ):
+        standard = rooms[0]
+        day_after = tomorrow + datetime.timedelta(days=1)
+        await booking_service.add_booking(fake_user, make_booking_data(standard, day_after, 1))
+
+        with pytest.raises(NoRoomsAvailable):
+            await booking_service.add_hold(fake_user, make_hold_data(standard, tomorrow, 2, units=2))
+
+        await booking_service.add_hold(fake_user, make_hold_data(standard, tomorrow, 2))
+        with pytest.raises(NoRoomsAvailable):
+            await booking_service.add_hold(fake_user, make_hold_data(standard, day_after, 1))
+
+        # the night before the booking still has a unit left
+        await booking_service.add_hold(fake_user, make_hold_data(standard, tomorrow, 1))
+
+    async def test_holds_counted_in_listings(
+            self, booking_service: BookingService, fake_user: User, rooms: List[Room], tomorrow: datetime.date,
+    ):
+        standard = rooms[0]
+        date_to = tomorrow + datetime.timedelta(days=2)
+        await booking_service.add_hold(fake_user, make_hold_data(standard, tomorrow, 2))
+
+        hotel_service = booking_service.hotels_service
+        room = await hotel_service.get_hotel_rooms(standard.hotel_id, tomorrow, date_to, room_id=standard.id)
+        assert room['rooms_left'] == standard.quantity - 1
+
+        hotels = await hotel_service.get_hotels_by_name('Алтай', tomorrow, date_to)
+        assert hotels[0]['rooms_left'] == sum(room.quantity for room in rooms[:2]) - 1
+
+    async def test_expired_hold_released(
+            self, booking_service: BookingService, fake_user: User, superuser: User, rooms: List[Room],
+            tomorrow: datetime.date,
+    ):
+        timer = FakeTimer()
+        booking_service = with_holds(booking_service, HoldStore(hold_store.redis, ttl=60, timer=timer))
+        lux = rooms[1]
+
+        await booking_service.add_hold(fake_user, make_hold_data(lux, tomorrow, 1))
+        with pytest.raises(NoRoomsAvailable):
+            await booking_service.add_hold(superuser, make_hold_data(lux, tomorrow, 1))
+
+        timer.now += 61
+        await booking_service.add_hold(superuser, make_hold_data(lux, tomorrow, 1))
+
+    async def test_cached_listing_stale_when_hold_expires(
+            self, ac: AsyncClient, auth_ac: AsyncClient, rooms: List[Room], tomorrow: datetime.date,
+    ):
+        date_to = tomorrow + datetime.timedelta(days=1)
+        await auth_ac.post('/api/v1/bookings/holds', json={
+            'room_id': rooms[0].id, 'date_from': tomorrow.isoformat(), 'date_to': date_to.isoformat(),
+        })
+
+        await ac.get(f'/api/v1/rooms/{rooms[0].hotel_id}?date_from={tomorrow}&date_to={date_to}')
+
+        key = await get_rooms_entry_key()
+        stale_ttl = get_rooms_for_hotel.__cache_stale_ttl__
+        # fresh only until the hold expires, then refreshed like any stale entry
+        assert 0 < await redis.ttl(key) - stale_ttl <= booking_hold_settings.BOOKING_HOLD_TTL
+        assert 0 < await redis.ttl(KeyBuilderCache.get_response_key(key)) <= booking_hold_settings.BOOKING_HOLD_TTL
+
+    async def test_create_hold_api(self, auth_ac: AsyncClient, rooms: List[Room], tomorrow: datetime.date):
+        response = await auth_ac.post('/api/v1/bookings/holds', json={
+            'room_id': rooms[1].id,
+            'date_from': tomorrow.isoformat(),
+            'date_to': (tomorrow + datetime.timedelta(days=1)).isoformat(),
+        })
+
+        assert response.status_code == status.HTTP_201_CREATED
+        assert response.json()['units'] == 1
+        assert 'user_id' not in response.json()
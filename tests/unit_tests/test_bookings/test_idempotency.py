@@ -0,0 +1,144 @@
+import asyncio
+import datetime
+import uuid
+from typing import List
+
+import pytest
+from fastapi import status
+from httpx import AsyncClient
+from redis.exceptions import RedisError
+from sqlalchemy import func, select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from src.bookings.exceptions import NoRoomsAvailable
+from src.bookings.models import Booking
+from src.config import availability_settings
+from src.hotels.availability import AvailabilityEngine
+from src.hotels.models import Room
+from src.idempotency import IdempotencyKeyReused, IdempotencyStore, IdempotentRequestInProgress, idempotency_store
+from tests.conftest import override_settings
+
+
+def make_store(**kwargs) -> IdempotencyStore:
+    settings = dict(ttl=60, lock_ttl=5, wait_timeout=1.0, poll_interval=0.01)
+    settings.update(kwargs)
+    return IdempotencyStore(idempotency_store.redis, **settings)
+
+
+class TestIdempotencyStore:
+    async def test_replay(self):
+        store = make_store()
+        key = str(uuid.uuid4())
+        calls = []
+
+        async def handler() -> dict:
+            calls.append(1)
+            return {'id': len(calls)}
+
+        assert await store.run('test', key, 'fingerprint', handler) == ({'id': 1}, False)
+        assert await store.run('test', key, 'fingerprint', handler) == ({'id': 1}, True)
+        assert len(calls) == 1
+
+    async def test_key_reused_with_other_request(self):
+        store = make_store()
+        key = str(uuid.uuid4())
+
+        async def handler() -> dict:
+            return {}
+
+        await store.run('test', key, 'fingerprint', handler)
+        with pytest.raises(IdempotencyKeyReused):
+            await store.run('test', key, 'other-fingerprint', handler)
+
+    async def test_concurrent_duplicates_wait(self):
+        store = make_store()
+        key = str(uuid.uuid4())
+        calls = []
+
+        async def handler() -> dict:
+            calls.append(1)
+            await asyncio.sleep(0.1)
+            return {'id': len(calls)}
+
+        results = await asyncio.gather(*[store.run('test', key, 'fingerprint', handler) for _ in range(5)])
+
+        assert len(calls) == 1
+        assert sorted(replayed for _, replayed in results) == [False, True, True, True, True]
+        assert all(result == {'id': 1} for result, _ in results)
+
+    async def test_wait_timeout(self):
+        store = make_store(wait_timeout=0.05)
+        key = str(uuid.uuid4())
+        started = asyncio.Event()
+
+        async def handler() -> dict:
+            started.set()
+            await asyncio.sleep(0.3)
+            return {}
+
+        first = asyncio.create_task(store.run('test', key, 'fingerprint', handler))
+        await started.wait()
+        with pytest.raises(IdempotentRequestInProgress):
+            await store.run('test', key, 'fingerprint', handler)
+        await first
+
+    async def test_failure_releases_key(self):
+        store = make_store()
+        key = str(uuid.uuid4())
+
+        async def failing_handler() -> dict:
+            raise NoRoomsAvailable
+
+        async def handler() -> dict:
+            return {'id': 1}
+
+        with pytest.raises(NoRoomsAvailable):
+            await store.run('test', key, 'fingerprint', failing_handler)
+        assert await store.run('test', key, 'fingerprint', handler) == ({'id': 1}, False)
+
+
+@pytest.mark.usefixtures('cache_backend')
+class TestIdempotentBookingApi:
+    async def test_retried_booking_created_once(
+            self, auth_ac: AsyncClient, session: AsyncSession, rooms: List[Room], tomorrow: datetime.date,
+    ):
+        payload = {
+            'room_id': rooms[0].id,
+            'date_from': tomorrow.isoformat(),
+            'date_to': (tomorrow + datetime.timedelta(days=2)).isoformat(),
+        }
+        headers = {'Idempotency-Key': str(uuid.uuid4())}
+
+        first = await auth_ac.post('/api/v1/bookings/create', json=payload, headers=headers)
+        second = await auth_ac.post('/api/v1/bookings/create', json=payload, headers=headers)
+
+        assert first.status_code == second.status_code == status.HTTP_201_CREATED
+        assert first.json() == second.json()
+        assert second.headers['Idempotent-Replayed'] == 'true'
+        assert await session.scalar(select(func.count()).select_from(Booking)) == 1
+
+        payload['date_to'] = (tomorrow + datetime.timedelta(days=3)).isoformat()
+        reused = await auth_ac.post('/api/v1/bookings/create', json=payload, headers=headers)
+        assert reused.status_code == status.HTTP_409_CONFLICT
+
+    @override_settings(availability_settings, 'AVAILABILITY_ENGINE_ENABLED', True)
+    async def test_retry_after_failed_publish_created_once(
+            self, auth_ac: AsyncClient, session: AsyncSession, rooms: List[Room], tomorrow: datetime.date, mocker,
+    ):
+        pytest.importorskip('numpy')
+        publish = mocker.patch.object(AvailabilityEngine, 'publish', side_effect=RedisError('Connection refused'))
+        payload = {
+            'room_id': rooms[0].id,
+            'date_from': tomorrow.isoformat(),
+            'date_to': (tomorrow + datetime.timedelta(days=2)).isoformat(),
+        }
+        headers = {'Idempotency-Key': str(uuid.uuid4())}
+
+        # the booking is committed before the workers are notified, a failure there must not release the key
+        first = await auth_ac.post('/api/v1/bookings/create', json=payload, headers=headers)
+        second = await auth_ac.post('/api/v1/bookings/create', json=payload, headers=headers)
+
+        assert publish.call_count == 1
+        assert first.status_code == second.status_code == status.HTTP_201_CREATED
+        assert second.headers['Idempotent-Replayed'] == 'true'
+        assert await session.scalar(select(func.count()).select_from(Booking)) == 1
@@ -0,0 +1,125 @@
+import datetime
+from typing import List
+
+import pytest
+from sqlalchemy import select
+
+from src.base.exceptions import Forbidden, NotFound
+from src.bookings.exceptions import NoRoomsAvailable
+from src.bookings.inventory import check_room_inventory
+from src.bookings.models import Booking, RoomInventory
+from src.bookings.schemas import BookingCreateData
+from src.bookings.services import BookingService
+from src.hotels.models import Room
+from src.users.models import User
+
+
+def make_booking_data(room: Room, date_from: datetime.date, nights: int) -> BookingCreateData:
+    return BookingCreateData(
+        room_id=room.id,
+        date_from=date_from,
+        date_to=date_from + datetime.timedelta(days=nights),
+    )
+
+
+async def get_inventory(booking_service: BookingService, room: Room) -> dict[datetime.date, int]:
+    result = await booking_service.repository.session.execute(
+        select(RoomInventory.day, RoomInventory.booked).where(RoomInventory.room_id == room.id),
+    )
+    return {day: booked for day, booked in result.all() if booked}
+
+
+@pytest.mark.usefixtures('cache_backend')
+class TestRoomInventory:
+    async def test_booking_fills_inventory(
+            self, booking_service: BookingService, fake_user: User, rooms: List[Room], tomorrow: datetime.date,
+    ):
+        await booking_service.add_booking(fake_user, make_booking_data(rooms[0], tomorrow, 3))
+        await booking_service.add_booking(fake_user, make_booking_data(rooms[0], tomorrow + datetime.timedelta(days=2), 2))
+
+        inventory = await get_inventory(booking_service, rooms[0])
+
+        assert inventory == {
+            tomorrow: 1,
+            tomorrow + datetime.timedelta(days=1): 1,
+            tomorrow + datetime.timedelta(days=2): 2,
+            tomorrow + datetime.timedelta(days=3): 1,
+        }
+        assert not await booking_service.repository.find_inventory_mismatches()
+
+    async def test_cancel_frees_inventory(
+            self, booking_service: BookingService, fake_user: User, rooms: List[Room], tomorrow: datetime.date,
+    ):
+        booking = await booking_service.add_booking(fake_user, make_booking_data(rooms[0], tomorrow, 3))
+
+        await booking_service.delete_booking(fake_user.id, booking.id)
+
+        assert await get_inventory(booking_service, rooms[0]) == {}
+        assert not await booking_service.repository.find_inventory_mismatches()
+
+    async def test_checkout_day_is_free(
+            self, booking_service: BookingService, fake_user: User, rooms: List[Room], tomorrow: datetime.date,
+    ):
+        lux = rooms[1]
+        await booking_service.add_booking(fake_user, make_booking_data(lux, tomorrow, 2))
+
+        with pytest.raises(NoRoomsAvailable):
+            await booking_service.add_booking(fake_user, make_booking_data(lux, tomorrow + datetime.timedelta(days=1), 2))
+
+        await booking_service.add_booking(fake_user, make_booking_data(lux, tomorrow + datetime.timedelta(days=2), 2))
+
+    async def test_partially_full_range_leaves_inventory(
+            self, booking_service: BookingService, fake_user: User, rooms: List[Room], tomorrow: datetime.date,
+    ):
+        lux = rooms[1]
+        await booking_service.add_booking(fake_user, make_booking_data(lux, tomorrow + datetime.timedelta(days=2), 1))
+
+        # the first two nights are free, the third one is not
+        with pytest.raises(NoRoomsAvailable):
+            await booking_service.add_booking(fake_user, make_booking_data(lux, tomorrow, 3))
+
+        assert await get_inventory(booking_service, lux) == {tomorrow + datetime.timedelta(days=2): 1}
+        assert not await booking_service.repository.find_inventory_mismatches()
+
+    async def test_booking_missing_room(
+            self, booking_service: BookingService, fake_user: User, rooms: List[Room], tomorrow: datetime.date,
+    ):
+        missing_room = Room(id=max(room.id for room in rooms) + 1)
+
+        with pytest.raises(NotFound):
+            await booking_service.add_booking(fake_user, make_booking_data(missing_room, tomorrow, 1))
+
+    async def test_cancel_foreign_booking(
+            self, booking_service: BookingService, fake_user: User, superuser: User, rooms: List[Room],
+            tomorrow: datetime.date,
+    ):
+        booking = await booking_service.add_booking(fake_user, make_booking_data(rooms[0], tomorrow, 2))
+
+        with pytest.raises(Forbidden):
+            await booking_service.delete_booking(superuser.id, booking.id)
+        with pytest.raises(NotFound):
+            await booking_service.delete_booking(fake_user.id, booking.id + 1)
+
+        assert await get_inventory(booking_service, rooms[0]) == {
+            tomorrow: 1,
+            tomorrow + datetime.timedelta(days=1): 1,
+        }
+
+    async def test_consistency_checker(
+            self, booking_service: BookingService, fake_user: User, rooms: List[Room], tomorrow: datetime.date,
+    ):
+        await booking_service.add_booking(fake_user, make_booking_data(rooms[0], tomorrow, 3))
+
+        session = booking_service.repository.session
+        inventory = await session.scalar(
+            select(RoomInventory).where(RoomInventory.room_id == rooms[0].id, RoomInventory.day == tomorrow),
+        )
+        inventory.booked = 5
+        await session.commit()
+
+        assert await check_room_inventory() == 1
+        assert await check_room_inventory(repair=True) == 1
+        assert await check_room_inventory() == 0
+
+        bookings = await session.scalars(select(Booking))
+        assert len(bookings.all()) == 1
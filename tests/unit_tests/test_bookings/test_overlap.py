@@ -0,0 +1,102 @@
+import datetime
+import json
+from typing import List
+
+import pytest
+from sqlalchemy import func, insert, select, text
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from src.bookings.models import Booking
+from src.bookings.repositories import BookingRepository
+from src.hotels.models import Hotel, Room
+from src.users.models import User
+
+START = datetime.date(2024, 1, 1)
+
+
+@pytest.fixture
+async def seeded_bookings(session: AsyncSession, fake_user: User, hotels: List[Hotel]) -> List[Room]:
+    rooms = [
+        Room(hotel_id=hotels[i % 2].id, name=f'Номер {i}', description='', price=1000, quantity=100, image_id=1)
+        for i in range(50)
+    ]
+    session.add_all(rooms)
+    await session.commit()
+
+    values = [
+        {
+            'room_id': rooms[i % len(rooms)].id,
+            'user_id': fake_user.id,
+            'date_from': START + datetime.timedelta(days=i % 700),
+            'date_to': START + datetime.timedelta(days=i % 700 + 1 + i % 7),
+            'price': 1000,
+        }
+        for i in range(20000)
+    ]
+    # core insert, mapper events don't maintain room_inventory here
+    await session.execute(insert(Booking), values)
+    await session.commit()
+    await session.execute(text('ANALYZE booking'))
+    return rooms
+
+
+def collect_index_names(plan: dict) -> set[str]:
+    names = {plan['Index Name']} if 'Index Name' in plan else set()
+    for child in plan.get('Plans', []):
+        names |= collect_index_names(child)
+    return names
+
+
+async def explain(session: AsyncSession, stmt) -> dict:
+    compiled = stmt.compile(dialect=session.bind.dialect, compile_kwargs={'literal_binds': True})
+    result = await session.execute(text(f'EXPLAIN (FORMAT JSON) {compiled}'))
+    plan = result.scalar()
+    if isinstance(plan, str):
+        plan = json.loads(plan)
+    return plan[0]['Plan']
+
+
+class TestBookingOverlap:
+    @pytest.mark.parametrize(
+        'date_from, date_to, expected',
+        [
+            (datetime.date(2024, 1, 3), datetime.date(2024, 1, 5), True),
+            (datetime.date(2024, 1, 1), datetime.date(2024, 1, 10), True),
+            (datetime.date(2024, 1, 4), datetime.date(2024, 1, 5), True),
+            (datetime.date(2024, 1, 5), datetime.date(2024, 1, 7), False),
+            (datetime.date(2023, 12, 30), datetime.date(2024, 1, 3), False),
+        ],
+    )
+    async def test_overlap_clause(
+            self, session: AsyncSession, fake_user: User, rooms: List[Room],
+            date_from: datetime.date, date_to: datetime.date, expected: bool,
+    ):
+        booking = Booking(
+            room_id=rooms[0].id,
+            user_id=fake_user.id,
+            date_from=datetime.date(2024, 1, 3),
+            date_to=datetime.date(2024, 1, 5),
+            price=1000,
+        )
+        session.add(booking)
+        await session.commit()
+
+        stmt = select(func.count(Booking.id)).where(BookingRepository.get_booked_rooms_clause(date_from, date_to))
+        assert bool(await session.scalar(stmt)) is expected
+
+    async def test_room_overlap_uses_gist_index(self, session: AsyncSession, seeded_bookings: List[Room]):
+        stmt = select(Booking.id).where(
+            Booking.room_id == seeded_bookings[0].id,
+            BookingRepository.get_booked_rooms_clause(datetime.date(2024, 3, 1), datetime.date(2024, 3, 5)),
+        )
+
+        plan = await explain(session, stmt)
+
+        assert 'ix_booking_room_id_stay' in collect_index_names(plan)
+
+    async def test_windowed_inventory_check_uses_gist_index(self, session: AsyncSession, seeded_bookings: List[Room]):
+        stmt = BookingRepository.get_expected_inventory_query(datetime.date(2024, 3, 1), datetime.date(2024, 3, 5))
+
+        plan = await explain(session, stmt)
+
+        assert 'ix_booking_room_id_stay' in collect_index_names(plan)
@@ -0,0 +1,51 @@
+import datetime
+
+import pytest
+from fastapi_cache import FastAPICache
+from fastapi_cache.coder import JsonCoder
+
+from src.cache import KeyBuilderCache, OrjsonCoder, TaggedRedisBackend, cache_redis
+from src.hotels.routers.hotels import get_hotel_info
+
+NAMESPACE = 'test-cache:clearable-get_hotel_info'
+HOTEL = {
+    'id': 1,
+    'name': 'Алтай Резорт',
+    'location': 'Республика Алтай, Турочакский район',
+    'services': ['Бесплатный Wi-Fi', 'Парковка'],
+    'rooms_left': 2,
+}
+
+
+class TestOrjsonCoder:
+    async def test_small_value_not_compressed(self):
+        encoded = OrjsonCoder.encode(HOTEL)
+
+        assert encoded.startswith(OrjsonCoder.RAW)
+        assert OrjsonCoder.decode(encoded) == HOTEL
+
+    async def test_large_value_compressed(self):
+        hotels = [{**HOTEL, 'id': i, 'date': datetime.date(2023, 9, 4)} for i in range(50)]
+
+        encoded = OrjsonCoder.encode(hotels)
+
+        assert encoded.startswith(OrjsonCoder.ZLIB)
+        assert len(encoded) < len(JsonCoder.encode(hotels))
+        assert OrjsonCoder.decode(encoded)[-1] == {**HOTEL, 'id': 49, 'date': '2023-09-04'}
+
+    async def test_unknown_encoding(self):
+        with pytest.raises(ValueError):
+            OrjsonCoder.decode(b'[]')
+
+    async def test_version_in_key(self):
+        FastAPICache.reset()
+        FastAPICache.init(
+            backend=TaggedRedisBackend(cache_redis), prefix='test-cache',
+            coder=OrjsonCoder, key_builder=KeyBuilderCache.key_builder,
+        )
+        try:
+            key = KeyBuilderCache.key_builder(get_hotel_info, NAMESPACE, kwargs={'hotel_id': 1})
+        finally:
+            FastAPICache.reset()
+
+        assert key.startswith(f'{NAMESPACE}:src.hotels.routers.hotels:get_hotel_info:{OrjsonCoder.version}:')
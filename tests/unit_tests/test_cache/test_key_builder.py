@@ -0,0 +1,105 @@
+import datetime
+
+import pytest
+
+from src.base.repositories import Transaction
+from src.cache import KeyBuilderCache
+from src.database import async_session_maker
+from src.hotels.repositories import HotelRepository
+from src.hotels.routers.hotels import get_hotel_info, search_available_hotels
+from src.hotels.routers.rooms import get_room_info
+from src.hotels.schemas import DateRangeModel
+from src.hotels.services import HotelService
+
+NAMESPACE = 'fastapi-cache:clearable-search_available_hotels'
+
+
+def make_hotel_service() -> HotelService:
+    session = async_session_maker()
+    return HotelService(repository=HotelRepository(session=session), transaction=Transaction(session=session))
+
+
+def make_filters(date_from: str = '2023-09-04', date_to: str = '2023-09-10') -> DateRangeModel:
+    return DateRangeModel(date_from=date_from, date_to=date_to)
+
+
+class TestKeyBuilder:
+    async def test_identical_requests_share_key(self):
+        first = KeyBuilderCache.key_builder(
+            search_available_hotels, NAMESPACE,
+            kwargs={'name': 'Алтай', 'filters': make_filters(), 'hotel_service': make_hotel_service()},
+        )
+        second = KeyBuilderCache.key_builder(
+            search_available_hotels, NAMESPACE,
+            kwargs={'name': 'Алтай', 'filters': make_filters(), 'hotel_service': make_hotel_service()},
+        )
+
+        assert first == second
+
+    @pytest.mark.parametrize(
+        'name',
+        [
+            'алтай',
+            'АЛТАЙ',
+            '  Алтай ',
+        ],
+    )
+    async def test_search_name_normalized(self, name: str):
+        expected = KeyBuilderCache.key_builder(
+            search_available_hotels, NAMESPACE,
+            kwargs={'name': 'алтай', 'filters': make_filters(), 'hotel_service': make_hotel_service()},
+        )
+        result = KeyBuilderCache.key_builder(
+            search_available_hotels, NAMESPACE,
+            kwargs={'name': name, 'filters': make_filters(), 'hotel_service': make_hotel_service()},
+        )
+
+        assert result == expected
+
+    async def test_param_order_ignored(self):
+        service = make_hotel_service()
+        first = KeyBuilderCache.key_builder(
+            get_room_info, NAMESPACE,
+            kwargs={'hotel_id': 1, 'room_id': 2, 'settings': make_filters(), 'hotel_service': service},
+        )
+        second = KeyBuilderCache.key_builder(
+            get_room_info, NAMESPACE,
+            kwargs={'hotel_service': service, 'settings': make_filters(), 'room_id': 2, 'hotel_id': 1},
+        )
+
+        assert first == second
+
+    @pytest.mark.parametrize(
+        'first_kwargs, second_kwargs',
+        [
+            ({'name': 'алтай', 'filters': make_filters()}, {'name': 'сочи', 'filters': make_filters()}),
+            ({'name': 'алтай', 'filters': make_filters()}, {'name': 'алтай', 'filters': make_filters('2023-09-05')}),
+            ({'name': 'алтай', 'filters': make_filters()}, {'name': 'алтай', 'filters': DateRangeModel()}),
+        ],
+    )
+    async def test_different_requests_differ(self, first_kwargs: dict, second_kwargs: dict):
+        first = KeyBuilderCache.key_builder(search_available_hotels, NAMESPACE, kwargs=first_kwargs)
+        second = KeyBuilderCache.key_builder(search_available_hotels, NAMESPACE, kwargs=second_kwargs)
+
+        assert first != second
+
+    async def test_canonical_params(self):
+        params = KeyBuilderCache.canonical_params({
+            'name': ' Алтай ',
+            'filters': make_filters(),
+            'hotel_service': make_hotel_service(),
+        })
+
+        assert params == {
+            'date_from': datetime.date(2023, 9, 4).isoformat(),
+            'date_to': datetime.date(2023, 9, 10).isoformat(),
+            'name': 'алтай',
+        }
+        assert list(params) == sorted(params)
+
+    async def test_key_depends_on_function(self):
+        kwargs = {'hotel_id': 1, 'hotel_service': make_hotel_service()}
+
+        assert KeyBuilderCache.key_builder(get_hotel_info, NAMESPACE, kwargs=kwargs) != KeyBuilderCache.key_builder(
+            search_available_hotels, NAMESPACE, kwargs=kwargs,
+        )
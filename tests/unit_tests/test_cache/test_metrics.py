@@ -0,0 +1,94 @@
+import datetime
+from typing import List
+
+import pytest
+from httpx import AsyncClient
+
+from src.auth.jwt import create_access_token
+from src.bookings.schemas import BookingCreateData
+from src.bookings.services import BookingService
+from src.cache import NamespaceMetrics, TaggedRedisBackend, get_namespace_metrics, namespace_metrics, redis
+from src.hotels.models import Room
+from src.metrics import Metrics, metrics
+from src.users.models import User
+
+
+@pytest.fixture(autouse=True)
+async def reset_metrics():
+    metrics.reset()
+    await namespace_metrics.reset()
+
+
+class TestCacheMetrics:
+    async def test_histogram_buckets(self):
+        worker_metrics = Metrics()
+
+        for value in (0.0001, 0.003, 0.003, 5):
+            worker_metrics.observe('cache.redis.get', value)
+
+        histogram = worker_metrics.histograms()['cache.redis.get']
+        assert histogram['count'] == 4
+        assert histogram['sum'] == pytest.approx(5.0061)
+        assert histogram['buckets']['0.0005'] == 1
+        assert histogram['buckets']['0.0025'] == 1
+        assert histogram['buckets']['0.005'] == 3
+        assert histogram['buckets']['1.0'] == 3
+        assert histogram['buckets']['+Inf'] == 4
+
+    async def test_namespace_counters(
+            self, cache_backend: TaggedRedisBackend, ac: AsyncClient, booking_service: BookingService,
+            fake_user: User, rooms: List[Room], tomorrow: datetime.date,
+    ):
+        date_to = tomorrow + datetime.timedelta(days=2)
+        url = f'/api/v1/rooms/{rooms[0].hotel_id}?date_from={tomorrow}&date_to={date_to}'
+
+        await ac.get(url)
+        await ac.get(url)
+        await booking_service.add_booking(
+            fake_user, BookingCreateData(room_id=rooms[0].id, date_from=tomorrow, date_to=date_to),
+        )
+
+        assert (await get_namespace_metrics())['clearable-get_rooms_for_hotel'] == {
+            'response_miss': 1,
+            'miss': 1,
+            'set': 1,
+            'response_hit': 1,
+            'invalidation': 1,
+            'keys_removed': 1,
+        }
+        assert metrics.histograms()['cache.redis.get']['count'] >= 2
+        assert metrics.histograms()['cache.redis.invalidate']['count'] >= 1
+
+    async def test_namespace_counters_summed_over_workers(self):
+        worker, other_worker = NamespaceMetrics(redis, flush_interval=60), NamespaceMetrics(redis, flush_interval=60)
+
+        worker.incr('clearable-get_hotel_info', 'hit')
+        worker.incr('clearable-get_hotel_info', 'miss')
+        other_worker.incr('clearable-get_hotel_info', 'hit', 2)
+        other_worker.incr('clearable-get_room_info', 'miss')
+        await other_worker.flush()
+
+        assert await worker.get_all() == {
+            'clearable-get_hotel_info': {'hit': 3, 'miss': 1},
+            'clearable-get_room_info': {'miss': 1},
+        }
+        # counters not flushed by a worker yet are left out
+        other_worker.incr('clearable-get_room_info', 'miss')
+        assert (await worker.get_all())['clearable-get_room_info'] == {'miss': 1}
+
+    async def test_metrics_endpoint(self, cache_backend: TaggedRedisBackend, auth_ac: AsyncClient):
+        await auth_ac.get('/api/v1/hotels/1')
+
+        response = await auth_ac.get('/api/v1/metrics')
+
+        assert response.status_code == 200
+        assert response.json()['cache_namespaces']['clearable-get_hotel_info']['miss'] == 1
+        assert 'cache.redis.get' in response.json()['histograms']
+
+    async def test_metrics_endpoint_requires_staff(self, ac: AsyncClient, fake_user: User):
+        response = await ac.get('/api/v1/metrics')
+        assert response.status_code == 401
+
+        token = create_access_token(fake_user)
+        response = await ac.get('/api/v1/metrics', headers={'Authorization': f'Bearer {token}'})
+        assert response.status_code == 403
@@ -0,0 +1,83 @@
+import datetime
+from typing import List
+
+from httpx import AsyncClient
+
+from src.app import app
+from src.bookings.schemas import BookingCreateData
+from src.bookings.services import BookingService
+from src.cache import KeyBuilderCache, TaggedRedisBackend, redis
+from src.hotels.models import Room
+from src.hotels.routers.rooms import get_rooms_for_hotel
+from src.hotels.schemas import DateRangeModel
+from src.middlewares import ResponseCacheMiddleware
+from src.users.models import User
+
+
+def make_scope(path: str, query_string: bytes) -> dict:
+    return {
+        'type': 'http',
+        'method': 'GET',
+        'path': path,
+        'root_path': '',
+        'query_string': query_string,
+        'headers': [],
+    }
+
+
+def get_middleware() -> ResponseCacheMiddleware:
+    return ResponseCacheMiddleware(app, router=app.router, paths=('/api/v1/hotels', '/api/v1/rooms'))
+
+
+class TestResponseCacheKey:
+    async def test_matches_key_builder(self, cache_backend: TaggedRedisBackend):
+        scope = make_scope('/api/v1/rooms/1', b'date_to=2023-09-10&utm_source=mail&date_from=2023-09-04')
+
+        expected = KeyBuilderCache.key_builder(
+            get_rooms_for_hotel, 'test-cache:clearable-get_rooms_for_hotel',
+            kwargs={
+                'hotel_id': 1,
+                'settings': DateRangeModel(date_from='2023-09-04', date_to='2023-09-10'),
+                'hotel_service': object(),
+            },
+        )
+
+        assert get_middleware().get_cache_key(scope) == expected
+
+    async def test_skips_uncached_and_invalid(self, cache_backend: TaggedRedisBackend):
+        middleware = get_middleware()
+
+        assert middleware.get_cache_key(make_scope('/api/v1/hotels/my/favourites', b'')) is None
+        assert middleware.get_cache_key(make_scope('/api/v1/rooms/1', b'date_from=yesterday')) is None
+
+
+class TestResponseCache:
+    async def test_hit_and_invalidation(
+            self, cache_backend: TaggedRedisBackend, ac: AsyncClient, booking_service: BookingService,
+            fake_user: User, rooms: List[Room], tomorrow: datetime.date,
+    ):
+        date_to = tomorrow + datetime.timedelta(days=2)
+        url = f'/api/v1/rooms/{rooms[0].hotel_id}?date_from={tomorrow}&date_to={date_to}'
+        key = get_middleware().get_cache_key(make_scope(
+            f'/api/v1/rooms/{rooms[0].hotel_id}', f'date_from={tomorrow}&date_to={date_to}'.encode(),
+        ))
+
+        response = await ac.get(url)
+        assert response.status_code == 200
+        cached = await redis.get(KeyBuilderCache.get_response_key(key))
+        assert cached is not None
+
+        # a hit is served from the stored response without calling the endpoint
+        headers, _ = cached.split('\n', 1)
+        await redis.set(KeyBuilderCache.get_response_key(key), headers + '\n[]', ex=60)
+        response = await ac.get(url)
+        assert response.json() == []
+
+        await booking_service.add_booking(
+            fake_user, BookingCreateData(room_id=rooms[0].id, date_from=tomorrow, date_to=date_to),
+        )
+        assert await redis.get(KeyBuilderCache.get_response_key(key)) is None
+
+        response = await ac.get(url)
+        rooms_left = {room['id']: room['rooms_left'] for room in response.json()}
+        assert rooms_left[rooms[0].id] == rooms[0].quantity - 1
@@ -0,0 +1,73 @@
+import asyncio
+import datetime
+from typing import List
+
+from httpx import AsyncClient
+
+from src.app import app
+from src.cache import LOCK_KEY_SUFFIX, TaggedRedisBackend, redis
+from src.config import cache_settings
+from src.hotels.models import Room
+from src.hotels.repositories import HotelRepository
+from src.middlewares import ResponseCacheMiddleware
+from tests.conftest import override_settings
+
+
+def get_rooms_url(room: Room, date_from: datetime.date) -> tuple[str, str]:
+    path = f'/api/v1/rooms/{room.hotel_id}'
+    query = f'date_from={date_from}&date_to={date_from + datetime.timedelta(days=2)}'
+    return path, query
+
+
+def get_entry_key(path: str, query: str) -> str:
+    middleware = ResponseCacheMiddleware(app, router=app.router, paths=('/api/v1/rooms',))
+    return middleware.get_cache_key({
+        'type': 'http', 'method': 'GET', 'path': path, 'root_path': '', 'query_string': query.encode(), 'headers': [],
+    })
+
+
+class TestMissCoalescing:
+    async def test_concurrent_misses_run_one_query(
+            self, cache_backend: TaggedRedisBackend, ac: AsyncClient, rooms: List[Room], tomorrow: datetime.date,
+            mocker,
+    ):
+        spy = mocker.spy(HotelRepository, 'get_hotel_rooms_info')
+        path, query = get_rooms_url(rooms[0], tomorrow)
+
+        responses = await asyncio.gather(*[ac.get(f'{path}?{query}') for _ in range(200)])
+
+        assert {response.status_code for response in responses} == {200}
+        assert len({response.text for response in responses}) == 1
+        assert spy.call_count == 1
+
+    async def test_waits_for_other_worker(
+            self, cache_backend: TaggedRedisBackend, ac: AsyncClient, rooms: List[Room], tomorrow: datetime.date,
+            mocker,
+    ):
+        spy = mocker.spy(HotelRepository, 'get_hotel_rooms_info')
+        path, query = get_rooms_url(rooms[0], tomorrow)
+        key = get_entry_key(path, query)
+        await redis.set(key + LOCK_KEY_SUFFIX, 'other-worker', ex=5)
+
+        async def compute_in_other_worker():
+            await asyncio.sleep(0.2)
+            await redis.set(key, '[]', ex=60)
+
+        response, _ = await asyncio.gather(ac.get(f'{path}?{query}'), compute_in_other_worker())
+
+        assert response.json() == []
+        assert spy.call_count == 0
+
+    @override_settings(cache_settings, 'CACHE_LOCK_WAIT', 0.1)
+    async def test_computes_when_other_worker_is_late(
+            self, cache_backend: TaggedRedisBackend, ac: AsyncClient, rooms: List[Room], tomorrow: datetime.date,
+            mocker,
+    ):
+        spy = mocker.spy(HotelRepository, 'get_hotel_rooms_info')
+        path, query = get_rooms_url(rooms[0], tomorrow)
+        await redis.set(get_entry_key(path, query) + LOCK_KEY_SUFFIX, 'other-worker', ex=5)
+
+        response = await ac.get(f'{path}?{query}')
+
+        assert response.status_code == 200
+        assert spy.call_count == 1
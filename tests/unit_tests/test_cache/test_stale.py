@@ -0,0 +1,97 @@
+import datetime
+from typing import List
+
+from httpx import AsyncClient
+from sqlalchemy.exc import TimeoutError as PoolTimeoutError
+
+from src.app import app
+from src.cache import STALE_HEADER, KeyBuilderCache, TaggedRedisBackend, redis
+from src.hotels.models import Room
+from src.hotels.repositories import HotelRepository
+from src.hotels.routers.rooms import get_rooms_for_hotel
+from src.metrics import metrics
+from src.middlewares import ResponseCacheMiddleware
+
+STALE_TTL = get_rooms_for_hotel.__cache_stale_ttl__
+
+
+def get_rooms_request(room: Room, date_from: datetime.date) -> tuple[str, str]:
+    """Get the url of the hotel rooms listing and the key of its cache entry."""
+    path = f'/api/v1/rooms/{room.hotel_id}'
+    query = f'date_from={date_from}&date_to={date_from + datetime.timedelta(days=2)}'
+    middleware = ResponseCacheMiddleware(app, router=app.router, paths=('/api/v1/rooms',))
+    key = middleware.get_cache_key({
+        'type': 'http', 'method': 'GET', 'path': path, 'root_path': '', 'query_string': query.encode(), 'headers': [],
+    })
+    return f'{path}?{query}', key
+
+
+async def make_stale(key: str) -> None:
+    await redis.expire(key, STALE_TTL - 60)
+    await redis.delete(KeyBuilderCache.get_response_key(key))
+
+
+class TestStaleWhileRevalidate:
+    async def test_response_served_until_stale(
+            self, cache_backend: TaggedRedisBackend, ac: AsyncClient, rooms: List[Room], tomorrow: datetime.date,
+    ):
+        url, key = get_rooms_request(rooms[0], tomorrow)
+
+        await ac.get(url)
+
+        assert 0 < await redis.ttl(KeyBuilderCache.get_response_key(key)) <= await redis.ttl(key) - STALE_TTL
+
+    async def test_stale_entry_refreshed_in_background(
+            self, cache_backend: TaggedRedisBackend, ac: AsyncClient, rooms: List[Room], tomorrow: datetime.date,
+            mocker,
+    ):
+        url, key = get_rooms_request(rooms[0], tomorrow)
+        fresh = await ac.get(url)
+        await make_stale(key)
+        spy = mocker.spy(HotelRepository, 'get_hotel_rooms_info')
+
+        stale = await ac.get(url)
+
+        assert stale.json() == fresh.json()
+        assert stale.headers[STALE_HEADER] == '1'
+        assert spy.call_count == 1
+        assert await redis.ttl(key) > STALE_TTL
+        # the stale response is not stored, the next one is
+        assert await redis.get(KeyBuilderCache.get_response_key(key)) is None
+        assert STALE_HEADER not in (await ac.get(url)).headers
+        assert await redis.get(KeyBuilderCache.get_response_key(key)) is not None
+
+    async def test_stale_entry_served_while_database_fails(
+            self, cache_backend: TaggedRedisBackend, ac: AsyncClient, rooms: List[Room], tomorrow: datetime.date,
+            mocker,
+    ):
+        url, key = get_rooms_request(rooms[0], tomorrow)
+        fresh = await ac.get(url)
+        await make_stale(key)
+        mocker.patch.object(HotelRepository, 'get_hotel_rooms_info', side_effect=PoolTimeoutError)
+        metrics.reset()
+
+        for _ in range(2):
+            response = await ac.get(url)
+            assert response.status_code == 200
+            assert response.json() == fresh.json()
+
+        assert metrics.get('cache.refresh_failed') == 2
+        assert 0 < await redis.ttl(key) <= STALE_TTL
+
+    async def test_entry_without_expiry_not_refreshed(
+            self, cache_backend: TaggedRedisBackend, ac: AsyncClient, rooms: List[Room], tomorrow: datetime.date,
+            mocker,
+    ):
+        url, key = get_rooms_request(rooms[0], tomorrow)
+        await ac.get(url)
+        # TTL -1, not a TTL below the stale one
+        await redis.persist(key)
+        await redis.delete(KeyBuilderCache.get_response_key(key))
+        spy = mocker.spy(HotelRepository, 'get_hotel_rooms_info')
+
+        response = await ac.get(url)
+
+        assert STALE_HEADER not in response.headers
+        assert spy.call_count == 0
+        assert await redis.ttl(key) == -1
@@ -0,0 +1,88 @@
+import datetime
+from typing import List
+
+from httpx import AsyncClient
+
+from src.bookings.schemas import BookingCreateData
+from src.bookings.services import BookingService
+from src.cache import CacheTag, KeyBuilderCache, TaggedRedisBackend, redis
+from src.hotels.models import Room
+from src.hotels.routers.hotels import search_available_hotels
+from src.hotels.routers.rooms import get_room_info, get_rooms_for_hotel
+from src.hotels.schemas import DateRangeModel
+from src.users.models import User
+
+FILTERS = DateRangeModel(date_from='2023-09-04', date_to='2023-09-10')
+
+
+async def store_entry(backend: TaggedRedisBackend, func, namespace: str, *extra_tags: str, **kwargs) -> str:
+    key = KeyBuilderCache.key_builder(func, f'test-cache:{namespace}', kwargs=kwargs)
+    KeyBuilderCache.tag_entry(*extra_tags)
+    await backend.set(key, '[]', 60)
+    return key
+
+
+class TestTagInvalidation:
+    async def test_room_invalidation_is_scoped(self, cache_backend: TaggedRedisBackend):
+        room_key = await store_entry(
+            cache_backend, get_room_info, 'clearable-get_room_info', hotel_id=1, room_id=1, settings=FILTERS,
+        )
+        rooms_key = await store_entry(
+            cache_backend, get_rooms_for_hotel, 'clearable-get_rooms_for_hotel', hotel_id=1, settings=FILTERS,
+        )
+        search_key = await store_entry(
+            cache_backend, search_available_hotels, 'clearable-search_available_hotels',
+            CacheTag.hotel(1), CacheTag.hotel(2), name='алтай', filters=FILTERS,
+        )
+        other_hotel_key = await store_entry(
+            cache_backend, get_rooms_for_hotel, 'clearable-get_rooms_for_hotel', hotel_id=2, settings=FILTERS,
+        )
+        other_search_key = await store_entry(
+            cache_backend, search_available_hotels, 'clearable-search_available_hotels',
+            CacheTag.hotel(2), name='сочи', filters=FILTERS,
+        )
+
+        removed = await KeyBuilderCache.clear_cache_for_room(room_id=1, hotel_id=1)
+
+        assert removed == 3
+        assert await redis.get(room_key) is None
+        assert await redis.get(rooms_key) is None
+        assert await redis.get(search_key) is None
+        assert await redis.get(other_hotel_key) is not None
+        assert await redis.get(other_search_key) is not None
+
+    async def test_clear_cache_for_func(self, cache_backend: TaggedRedisBackend):
+        room_key = await store_entry(
+            cache_backend, get_room_info, 'clearable-get_room_info', hotel_id=1, room_id=1, settings=FILTERS,
+        )
+        rooms_key = await store_entry(
+            cache_backend, get_rooms_for_hotel, 'clearable-get_rooms_for_hotel', hotel_id=1, settings=FILTERS,
+        )
+
+        await KeyBuilderCache.clear_cache_for_func('get_room_info')
+
+        assert await redis.get(room_key) is None
+        assert await redis.get(rooms_key) is not None
+
+    async def test_tag_sets_expire_with_entries(self, cache_backend: TaggedRedisBackend):
+        await store_entry(
+            cache_backend, get_room_info, 'clearable-get_room_info', hotel_id=1, room_id=1, settings=FILTERS,
+        )
+
+        ttl = await redis.ttl(CacheTag.get_tag_key(CacheTag.room(1)))
+        assert 0 < ttl <= 60
+
+    async def test_search_leaving_full_hotel_out(
+            self, cache_backend: TaggedRedisBackend, ac: AsyncClient, booking_service: BookingService,
+            fake_user: User, rooms: List[Room], tomorrow: datetime.date,
+    ):
+        date_to = tomorrow + datetime.timedelta(days=1)
+        url = f'/api/v1/hotels/search/сочи?date_from={tomorrow}&date_to={date_to}'
+        booking_data = BookingCreateData(room_id=rooms[2].id, date_from=tomorrow, date_to=date_to)
+        bookings = [await booking_service.add_booking(fake_user, booking_data) for _ in range(rooms[2].quantity)]
+
+        assert (await ac.get(url)).json() == []
+
+        await booking_service.delete_booking(fake_user.id, bookings[0].id)
+
+        assert [hotel['id'] for hotel in (await ac.get(url)).json()] == [rooms[2].hotel_id]
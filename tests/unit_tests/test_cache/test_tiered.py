@@ -0,0 +1,97 @@
+import asyncio
+
+import pytest
+from fastapi_cache import FastAPICache
+
+from src.cache import CacheTag, KeyBuilderCache, TieredRedisBackend, redis
+from src.hotels.routers.rooms import get_rooms_for_hotel
+from src.hotels.schemas import DateRangeModel
+from src.metrics import metrics
+
+FILTERS = DateRangeModel(date_from='2023-09-04', date_to='2023-09-10')
+CHANNEL = 'test-cache-invalidation'
+
+
+async def start_worker() -> TieredRedisBackend:
+    backend = TieredRedisBackend(redis, local_size=16, local_ttl=30, channel=CHANNEL)
+    await backend.start()
+    async with asyncio.timeout(5):
+        while not backend.subscribed:
+            await asyncio.sleep(0.01)
+    return backend
+
+
+async def wait_dropped(backend: TieredRedisBackend, key: str) -> None:
+    async with asyncio.timeout(5):
+        while backend.local.get(key) is not None:
+            await asyncio.sleep(0.01)
+
+
+@pytest.fixture
+async def workers() -> tuple[TieredRedisBackend, TieredRedisBackend]:
+    first, second = await start_worker(), await start_worker()
+    FastAPICache.reset()
+    FastAPICache.init(backend=first, prefix='test-cache', key_builder=KeyBuilderCache.key_builder)
+    metrics.reset()
+    yield first, second
+    await first.stop()
+    await second.stop()
+    FastAPICache.reset()
+    await redis.flushdb()
+
+
+async def store_rooms_entry(backend: TieredRedisBackend, hotel_id: int) -> str:
+    key = KeyBuilderCache.key_builder(
+        get_rooms_for_hotel, 'test-cache:clearable-get_rooms_for_hotel',
+        kwargs={'hotel_id': hotel_id, 'settings': FILTERS},
+    )
+    await backend.set(key, '[]', 60)
+    return key
+
+
+class TestTieredCache:
+    async def test_hits_are_served_locally(self, workers: tuple[TieredRedisBackend, TieredRedisBackend]):
+        first, second = workers
+        key = await store_rooms_entry(first, hotel_id=1)
+
+        assert await second.get(key) == '[]'
+        ttl, value = await second.get_with_ttl(key)
+        await redis.delete(key)
+
+        assert value == '[]' and 0 < ttl <= 60
+        assert await first.get(key) == '[]'
+        assert metrics.get('cache.l2_hit') == 1
+        assert metrics.get('cache.l1_hit') == 2
+
+    async def test_invalidation_reaches_other_workers(
+            self, workers: tuple[TieredRedisBackend, TieredRedisBackend],
+    ):
+        first, second = workers
+        key = await store_rooms_entry(first, hotel_id=1)
+        other_key = await store_rooms_entry(first, hotel_id=2)
+        await second.get(key)
+        await second.get(other_key)
+
+        await KeyBuilderCache.invalidate_tags(CacheTag.hotel(1))
+        await wait_dropped(second, key)
+
+        assert first.local.get(key) is None
+        assert await second.get(key) is None
+        assert await second.get(other_key) == '[]'
+        assert metrics.get('cache.miss') == 1
+
+    async def test_stale_read_not_copied(self, workers: tuple[TieredRedisBackend, TieredRedisBackend]):
+        first, _ = workers
+        generation = first.generation
+
+        first.drop_local(['another-key'])
+        first.set_local('key', '[]', 60, generation)
+
+        assert first.local.get('key') is None
+
+    async def test_unsubscribed_worker_keeps_no_copies(self):
+        backend = TieredRedisBackend(redis, local_size=16, local_ttl=30, channel=CHANNEL)
+
+        backend.set_local('key', '[]', 60)
+
+        assert backend.local.get('key') is None
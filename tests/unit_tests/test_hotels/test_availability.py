@@ -0,0 +1,171 @@
+import asyncio
+import datetime
+from typing import Awaitable, Callable, List
+
+import pytest
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from src.bookings.schemas import BookingCreateData
+from src.bookings.services import BookingService
+from src.cache import redis
+from src.hotels.availability import SEQUENCE_KEY, AvailabilityEngine
+from src.hotels.models import Room
+from src.hotels.repositories import HotelRepository
+from src.hotels.services import HotelService
+from src.users.models import User
+
+pytest.importorskip('numpy')
+
+CHANNEL = 'test-availability'
+
+
+def sorted_by_id(rows) -> list[dict]:
+    return sorted((dict(row) for row in rows), key=lambda row: row['id'])
+
+
+async def wait_current(engine: AvailabilityEngine) -> None:
+    async with asyncio.timeout(5):
+        while not await engine.is_current():
+            await asyncio.sleep(0.01)
+
+
+async def assert_parity(
+        hotel_service: HotelService, engine: AvailabilityEngine, hotel_id: int,
+        date_from: datetime.date, date_to: datetime.date,
+):
+    sql_service = HotelService(repository=hotel_service.repository, transaction=hotel_service.transaction)
+    engine_service = HotelService(
+        repository=hotel_service.repository, transaction=hotel_service.transaction, availability=engine,
+    )
+
+    assert engine.covers(date_from, date_to)
+    assert await engine.is_current()
+    assert sorted_by_id(await engine_service.get_hotels_by_name('алтай', date_from, date_to)) == \
+        sorted_by_id(await sql_service.get_hotels_by_name('алтай', date_from, date_to))
+    assert sorted_by_id(await engine_service.get_hotel_rooms(hotel_id, date_from, date_to)) == \
+        sorted_by_id(await sql_service.get_hotel_rooms(hotel_id, date_from, date_to))
+
+
+@pytest.fixture
+async def start_engine() -> Callable[[], Awaitable[AvailabilityEngine]]:
+    engines = []
+
+    async def start() -> AvailabilityEngine:
+        engine = AvailabilityEngine(redis, horizon_days=30, channel=CHANNEL)
+        await engine.start_engine(resync_interval=60)
+        engines.append(engine)
+        return engine
+
+    yield start
+    for engine in engines:
+        await engine.stop_engine()
+
+
+@pytest.mark.usefixtures('cache_backend')
+class TestAvailabilityEngine:
+    async def test_matches_sql(
+            self, hotel_service: HotelService, booking_service: BookingService, start_engine,
+            fake_user: User, rooms: List[Room], tomorrow: datetime.date,
+    ):
+        day = datetime.timedelta(days=1)
+        for room, date_from, nights in (
+                (rooms[0], tomorrow, 3),
+                (rooms[0], tomorrow + 2 * day, 2),
+                (rooms[1], tomorrow + day, 1),
+        ):
+            await booking_service.add_booking(
+                fake_user, BookingCreateData(room_id=room.id, date_from=date_from, date_to=date_from + nights * day),
+            )
+
+        engine = await start_engine()
+
+        hotel_id = rooms[0].hotel_id
+        for date_from, date_to in ((tomorrow, tomorrow + day), (tomorrow, tomorrow + 5 * day),
+                                   (tomorrow + 2 * day, tomorrow + 3 * day), (tomorrow + 4 * day, tomorrow + 9 * day)):
+            await assert_parity(hotel_service, engine, hotel_id, date_from, date_to)
+
+    async def test_workers_follow_bookings(
+            self, hotel_service: HotelService, booking_service: BookingService, start_engine,
+            fake_user: User, rooms: List[Room], tomorrow: datetime.date,
+    ):
+        engine, other_engine = await start_engine(), await start_engine()
+        booking_service.hotels_service.availability = engine
+
+        date_to = tomorrow + datetime.timedelta(days=2)
+        booking = await booking_service.add_booking(
+            fake_user, BookingCreateData(room_id=rooms[1].id, date_from=tomorrow, date_to=date_to),
+        )
+        for worker_engine in (engine, other_engine):
+            await wait_current(worker_engine)
+            assert worker_engine.rooms_booked([rooms[1].id], tomorrow, date_to) == {rooms[1].id: 1}
+            await assert_parity(hotel_service, worker_engine, rooms[1].hotel_id, tomorrow, date_to)
+
+        await booking_service.delete_booking(fake_user.id, booking.id)
+        for worker_engine in (engine, other_engine):
+            await wait_current(worker_engine)
+            assert worker_engine.rooms_booked([rooms[1].id], tomorrow, date_to) == {rooms[1].id: 0}
+            await assert_parity(hotel_service, worker_engine, rooms[1].hotel_id, tomorrow, date_to)
+
+    async def test_booking_during_load_counted_once(
+            self, booking_service: BookingService, start_engine,
+            fake_user: User, rooms: List[Room], tomorrow: datetime.date,
+    ):
+        engine = await start_engine()
+        booking_service.hotels_service.availability = engine
+        date_to = tomorrow + datetime.timedelta(days=2)
+
+        # the booking lands in the loaded bookings, in the changes received during the load, or both
+        load = asyncio.create_task(engine.load())
+        await asyncio.sleep(0)
+        await booking_service.add_booking(
+            fake_user, BookingCreateData(room_id=rooms[1].id, date_from=tomorrow, date_to=date_to),
+        )
+        await load
+        await wait_current(engine)
+
+        assert engine.rooms_booked([rooms[1].id], tomorrow, date_to) == {rooms[1].id: 1}
+
+    async def test_room_created_after_load(
+            self, session: AsyncSession, hotel_service: HotelService, booking_service: BookingService, start_engine,
+            fake_user: User, rooms: List[Room], tomorrow: datetime.date,
+    ):
+        engine = await start_engine()
+        hotel_service.availability = booking_service.hotels_service.availability = engine
+        room = Room(hotel_id=rooms[0].hotel_id, name='Апартаменты', description='', price=9000, quantity=1, image_id=4)
+        session.add(room)
+        await session.commit()
+        date_to = tomorrow + datetime.timedelta(days=2)
+
+        await booking_service.add_booking(
+            fake_user, BookingCreateData(room_id=room.id, date_from=tomorrow, date_to=date_to),
+        )
+
+        # the matrix doesn't know the room until reloaded, the listings must not report it free meanwhile
+        hotels = await hotel_service.get_hotels_by_name('алтай', tomorrow, date_to)
+        assert hotels[0]['rooms_left'] == sum(existing.quantity for existing in rooms[:2])
+        room_info = await hotel_service.get_hotel_rooms(room.hotel_id, tomorrow, date_to, room_id=room.id)
+        assert room_info['rooms_left'] == 0
+
+        await wait_current(engine)
+        assert engine.rooms_booked([room.id], tomorrow, date_to) == {room.id: 1}
+
+    async def test_behind_engine_not_used(
+            self, hotel_service: HotelService, start_engine, rooms: List[Room], tomorrow: datetime.date, mocker,
+    ):
+        engine = await start_engine()
+        hotel_service.availability = engine
+        spy = mocker.spy(HotelRepository, 'get_hotel_rooms_info')
+
+        # a change published to the workers but not received yet
+        await redis.incr(SEQUENCE_KEY)
+        await hotel_service.get_hotel_rooms(rooms[0].hotel_id, tomorrow, tomorrow + datetime.timedelta(days=1))
+
+        assert not await engine.is_current()
+        assert spy.call_count == 1
+
+    async def test_outside_horizon(self, tomorrow: datetime.date):
+        engine = AvailabilityEngine(redis, horizon_days=30, channel=CHANNEL)
+        await engine.load()
+
+        assert not engine.covers(tomorrow, tomorrow + datetime.timedelta(days=60))
+        assert not engine.covers(tomorrow - datetime.timedelta(days=2), tomorrow)
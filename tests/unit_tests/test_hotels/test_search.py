@@ -0,0 +1,31 @@
+import datetime
+from typing import List
+
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from src.hotels.models import Hotel, Room
+from src.hotels.services import HotelService
+
+
+class TestHotelSearch:
+    async def test_ranked_by_relevance(
+            self, session: AsyncSession, hotel_service: HotelService, rooms: List[Room], tomorrow: datetime.date,
+    ):
+        partial_match = Hotel(name='Алтайская усадьба', location='Алтайский край, Белокуриха', image_id=3)
+        session.add(partial_match)
+        await session.commit()
+        session.add(Room(hotel_id=partial_match.id, name='Стандарт', description='', price=2500, quantity=1))
+        await session.commit()
+
+        hotels = await hotel_service.get_hotels_by_name(' Алтай ', tomorrow, tomorrow + datetime.timedelta(days=2))
+
+        assert [hotel['id'] for hotel in hotels] == [rooms[0].hotel_id, partial_match.id]
+
+    async def test_matches_location(
+            self, hotel_service: HotelService, rooms: List[Room], tomorrow: datetime.date,
+    ):
+        date_to = tomorrow + datetime.timedelta(days=1)
+        hotels = await hotel_service.get_hotels_by_name('краснодарский', tomorrow, date_to)
+
+        assert [hotel['id'] for hotel in hotels] == [rooms[2].hotel_id]
+        assert hotels[0]['rooms_left'] == 3
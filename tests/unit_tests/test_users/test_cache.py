@@ -0,0 +1,62 @@
+import pytest
+
+from src.auth.config import auth_config
+from src.cache import TaggedRedisBackend
+from src.metrics import metrics
+from src.users.cache import user_cache
+from src.users.models import User
+from src.users.schemas import UserUpdate
+from src.users.services import RegisterService, UserService
+from tests.conftest import override_settings
+
+
+@pytest.fixture
+def clean_user_cache(cache_backend: TaggedRedisBackend):
+    user_cache.local.clear()
+    metrics.reset()
+    yield
+    user_cache.local.clear()
+
+
+@pytest.mark.usefixtures('clean_user_cache')
+class TestUserCache:
+    async def test_authenticated_user_is_cached(self, user_service: UserService, fake_user: User):
+        user = await user_service.get_authenticated_user(fake_user.id)
+        assert user.id == fake_user.id
+        assert metrics.get('user_cache.miss') == 1
+
+        user = await user_service.get_authenticated_user(fake_user.id)
+        assert user.username == fake_user.username
+        assert metrics.get('user_cache.local_hit') == 1
+
+        user_cache.local.clear()
+        user = await user_service.get_authenticated_user(fake_user.id)
+        assert user.email == fake_user.email
+        assert metrics.get('user_cache.redis_hit') == 1
+
+    async def test_update_invalidates(self, user_service: UserService, fake_user: User):
+        user = await user_service.get_authenticated_user(fake_user.id)
+
+        await user_service.update_user(user, UserUpdate(username='renamed_user'))
+
+        assert user_cache.local.get(fake_user.id) is None
+        assert await user_cache.redis.get(user_cache.get_key(fake_user.id)) is None
+        user = await user_service.get_authenticated_user(fake_user.id)
+        assert user.username == 'renamed_user'
+
+    @override_settings(auth_config, 'DISABLE_PASSWORD_VALIDATOR', True)
+    async def test_password_not_cached(self, user_service: UserService, fake_user: User):
+        password_hash = fake_user.password
+        await user_service.get_authenticated_user(fake_user.id)
+        # a user rebuilt from the cache in another session, without the loaded fixture user
+        user_service.repository.session.expunge_all()
+        user = await user_service.get_authenticated_user(fake_user.id)
+
+        assert 'password' not in await user_cache.get(fake_user.id)
+        assert password_hash not in await user_cache.redis.get(user_cache.get_key(fake_user.id))
+
+        # the password change of a cached user loads the hash from the database
+        new_password = 'new_password'
+        await user_service.update_user(user, UserUpdate(password=new_password, old_password='fake_password'))
+        updated_user = await user_service.get_user_by_id(fake_user.id)
+        assert await RegisterService.check_password_hash(new_password, updated_user.password)
@@ -112,6 +112,44 @@ class TestUserCreateUpdate:
                 bypass_validation=False,
             )
 
+    @pytest.mark.parametrize(
+        'username, email, detail',
+        [
+            ('Taken_User', 'other@example.org', 'username already taken'),
+            ('other_user', 'taken_user@example.org', 'email already taken'),
+        ],
+    )
+    async def test_create_user_credentials_taken(
+            self, user_service: UserService, username: str, email: str, detail: str,
+    ):
+        await user_service.create_user(
+            username='taken_user',
+            email='taken_user@example.org',
+            password=Faker().password(),
+            bypass_validation=True,
+        )
+
+        with pytest.raises(UsernameOrEmailAlreadyExists) as exc_info:
+            await user_service.create_user(
+                username=username,
+                email=email,
+                password=Faker().password(),
+                bypass_validation=True,
+            )
+        assert exc_info.value.detail == detail
+
+    async def test_find_for_login_case_insensitive(self, user_service: UserService):
+        user = await user_service.create_user(
+            username='login_user',
+            email='login_user@example.org',
+            password=Faker().password(),
+            bypass_validation=True,
+        )
+
+        assert (await user_service.repository.find_for_login('LOGIN_User')).id == user.id
+        # '_' is matched literally, not as a LIKE wildcard
+        assert await user_service.repository.find_for_login('login-user') is None
+
     @pytest.mark.parametrize(
         'username, email, password',
         [